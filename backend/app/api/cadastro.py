@@ -1,32 +1,43 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db, insert_com_conflito
 from app.models import login as login_model, endereco as endereco_model, dados_usuarios as usuario_model
-from app.schemas.cadastro import UsuarioCreate, EnderecoCreate
+from app.schemas.cadastro import UsuarioCreate, EnderecoCreate, UsuarioResponse, EnderecoAtualizadoResponse
+from app.schemas.login import TokenResponse
 from app.schemas.update_usuario import NomeUpdate, EmailUpdate, NascimentoUpdate
-from app.utils import security, token
+from app.utils import security, token, limite_taxa
+from app.utils.cache_tokens import cache_tokens
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/cadastro")
-def cadastrar_usuario(dados: UsuarioCreate, db: Session = Depends(get_db)):
-    if db.query(login_model.Login).filter_by(email=dados.email).first():
+@router.post(
+    "/cadastro", response_model=TokenResponse,
+    dependencies=[Depends(limite_taxa.por_ip_e_email(lambda corpo: corpo.get("email")))]
+)
+async def cadastrar_usuario(dados: UsuarioCreate, db: AsyncSession = Depends(get_db)):
+    # Consulta barata antes do bcrypt: e-mail repetido não paga o hash. O
+    # rollback devolve a conexão ao pool enquanto o hash roda
+    ja_cadastrado = await db.scalar(select(login_model.Login.id).filter_by(email=dados.email))
+    await db.rollback()
+    if ja_cadastrado is not None:
         raise HTTPException(status_code=400, detail="E-mail já cadastrado.")
 
-    login = login_model.Login(
-        email=dados.email,
-        senha=security.hash_senha(dados.senha)
-    )
-    db.add(login)
-    db.commit()
-    db.refresh(login)
+    senha_hash = await security.hash_senha_async(dados.senha)
+
+    # Login, endereço e dados pessoais na mesma transação: ou grava tudo ou nada.
+    # O ON CONFLICT cobre a corrida entre dois cadastros simultâneos que
+    # passaram juntos pela consulta acima.
+    inserido = (await db.execute(
+        insert_com_conflito(login_model.Login)
+        .values(email=dados.email, senha=senha_hash)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(login_model.Login.id, login_model.Login.versao_senha)
+    )).first()
+    if inserido is None:
+        raise HTTPException(status_code=400, detail="E-mail já cadastrado.")
+    id_login, versao_senha = inserido
 
     endereco = endereco_model.Endereco(
         cep=dados.endereco.cep,
@@ -37,53 +48,62 @@ def cadastrar_usuario(dados: UsuarioCreate, db: Session = Depends(get_db)):
         complemento=dados.endereco.complemento
     )
     db.add(endereco)
-    db.commit()
-    db.refresh(endereco)
-
-    usuario = usuario_model.DadosUsuarios(
-        id_login=login.id,
-        nome=dados.nome,
-        sobrenome=dados.sobrenome,
-        data_nascimento=dados.data_nascimento,
-        id_endereco=endereco.id
-    )
-    db.add(usuario)
-    db.commit()
-
-    access_token = token.gerar_token_acesso(dados.email)
+    try:
+        await db.flush()
+
+        db.add(usuario_model.DadosUsuarios(
+            id_login=id_login,
+            nome=dados.nome,
+            sobrenome=dados.sobrenome,
+            data_nascimento=dados.data_nascimento,
+            id_endereco=endereco.id
+        ))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Dados de cadastro inválidos.")
+
+    access_token = token.gerar_token_acesso(dados.email, id_login, versao_senha)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/get-usuario")
-def obter_dados_usuario(id_login: int , db: Session = Depends(get_db)):
-    usuario = db.query(usuario_model.DadosUsuarios).filter_by(id_login=id_login).first()
-
-    if not usuario:
+@router.get("/get-usuario", response_model=UsuarioResponse)
+async def obter_dados_usuario(id_login: int , db: AsyncSession = Depends(get_db)):
+    Usuario, Login, Endereco = usuario_model.DadosUsuarios, login_model.Login, endereco_model.Endereco
+    linha = (await db.execute(
+        select(
+            Usuario.id_login, Usuario.nome, Usuario.sobrenome, Usuario.data_nascimento, Login.email,
+            Endereco.id, Endereco.rua, Endereco.numero, Endereco.bairro, Endereco.complemento,
+            Endereco.cep, Endereco.id_estado,
+        )
+        .outerjoin(Login, Login.id == Usuario.id_login)
+        .outerjoin(Endereco, Endereco.id == Usuario.id_endereco)
+        .where(Usuario.id_login == id_login)
+    )).first()
+
+    if not linha:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
-    login = db.query(login_model.Login).filter_by(id=usuario.id_login).first()
-    endereco = db.query(endereco_model.Endereco).filter_by(id=usuario.id_endereco).first()
-
     return {
-        "id_login": usuario.id_login,
-        "nome": usuario.nome,
-        "sobrenome": usuario.sobrenome,
-        "data_nascimento": usuario.data_nascimento,
-        "email": login.email if login else None,
+        "id_login": linha.id_login,
+        "nome": linha.nome,
+        "sobrenome": linha.sobrenome,
+        "data_nascimento": linha.data_nascimento,
+        "email": linha.email,
         "endereco": {
-            "id": endereco.id,
-            "rua": endereco.rua if endereco else None,
-            "numero": endereco.numero if endereco else None,
-            "bairro": endereco.bairro if endereco else None,
-            "complemento": endereco.complemento if endereco else None,
-            "cep": endereco.cep if endereco else None,
-            "id_estado": endereco.id_estado if endereco else None,
+            "id": linha.id,
+            "rua": linha.rua,
+            "numero": linha.numero,
+            "bairro": linha.bairro,
+            "complemento": linha.complemento,
+            "cep": linha.cep,
+            "id_estado": linha.id_estado,
         }
     }
 
-@router.put("/atualizar-endereco/{id_endereco}")
-def atualizar_endereco(id_endereco: int, dados: EnderecoCreate, db: Session = Depends(get_db)):
-    endereco = db.query(endereco_model.Endereco).filter_by(id=id_endereco).first()
+@router.put("/atualizar-endereco/{id_endereco}", response_model=EnderecoAtualizadoResponse)
+async def atualizar_endereco(id_endereco: int, dados: EnderecoCreate, db: AsyncSession = Depends(get_db)):
+    endereco = await db.scalar(select(endereco_model.Endereco).filter_by(id=id_endereco))
 
     if not endereco:
         raise HTTPException(status_code=404, detail="Endereço não encontrado.")
@@ -91,8 +111,8 @@ def atualizar_endereco(id_endereco: int, dados: EnderecoCreate, db: Session = De
     for campo, valor in dados.dict(exclude_unset=True).items():
         setattr(endereco, campo, valor)
 
-    db.commit()
-    db.refresh(endereco)
+    await db.commit()
+    await db.refresh(endereco)
 
     return {"mensagem": "Endereço atualizado com sucesso", "endereco": {
         "id": endereco.id,
@@ -104,9 +124,9 @@ def atualizar_endereco(id_endereco: int, dados: EnderecoCreate, db: Session = De
         "id_estado": endereco.id_estado,
     }}
 
-@router.put("/atualizar-nome/{id_login}")
-def atualizar_nome(id_login: int, dados: NomeUpdate, db: Session = Depends(get_db)):
-    usuario = db.query(usuario_model.DadosUsuarios).filter_by(id_login=id_login).first()
+@router.put("/atualizar-nome/{id_login}", response_model=str)
+async def atualizar_nome(id_login: int, dados: NomeUpdate, db: AsyncSession = Depends(get_db)):
+    usuario = await db.scalar(select(usuario_model.DadosUsuarios).filter_by(id_login=id_login))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
@@ -115,32 +135,37 @@ def atualizar_nome(id_login: int, dados: NomeUpdate, db: Session = Depends(get_d
     if dados.sobrenome:
         usuario.sobrenome = dados.sobrenome
 
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    await db.refresh(usuario)
     return "Nome atualizado com sucesso"
 
-@router.put("/atualizar-email/{id}")
-def atualizar_email(id: int, dados: EmailUpdate, db: Session = Depends(get_db)):
-    usuario = db.query(login_model.Login).filter_by(id=id).first()
+@router.put("/atualizar-email/{id}", response_model=str)
+async def atualizar_email(id: int, dados: EmailUpdate, db: AsyncSession = Depends(get_db)):
+    usuario = await db.scalar(select(login_model.Login).filter_by(id=id))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
+    email_antigo = usuario.email
     if dados.email:
         usuario.email = dados.email
 
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    # Depois do commit: antes dele, uma requisição concorrente ainda leria o
+    # e-mail antigo do banco e o guardaria de novo no cache
+    if dados.email:
+        cache_tokens.invalidar_email(email_antigo)
+    await db.refresh(usuario)
     return "Email atualizado com sucesso"
 
-@router.put("/atualizar-nascimento/{id_login}")
-def atualizar_nascimento(id_login: int, dados: NascimentoUpdate, db: Session = Depends(get_db)):
-    usuario = db.query(usuario_model.DadosUsuarios).filter_by(id_login=id_login).first()
+@router.put("/atualizar-nascimento/{id_login}", response_model=str)
+async def atualizar_nascimento(id_login: int, dados: NascimentoUpdate, db: AsyncSession = Depends(get_db)):
+    usuario = await db.scalar(select(usuario_model.DadosUsuarios).filter_by(id_login=id_login))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     if dados.data_nascimento:
-        usuario.data_nascimento = dados.data_nascimento
+        usuario.data_nascimento = dados.data_nascimento.isoformat()
 
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    await db.refresh(usuario)
     return "Data de nascimento atualizado com sucesso"
\ No newline at end of file
@@ -1,20 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.models import categoria as categoria_model
+from fastapi import APIRouter, Depends, Request
 from app.schemas.categoria import CategoriaSchema
-from app.db import SessionLocal
+from app.utils.dados_referencia import cache_referencia, responder
+from app.utils.cache_respostas import cache_respostas
+from app.api.ler_token import get_current_user
 from typing import List
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/categoria", response_model=List[CategoriaSchema])
-def listar_categorias(db: Session = Depends(get_db)):
-    categorias = db.query(categoria_model.Categoria).all()
-    return categorias
\ No newline at end of file
+async def listar_categorias(request: Request):
+    return responder(request, await cache_referencia.categorias())
+
+# Recarrega estados e categorias do banco (ex.: depois de uma migration alterar os dados)
+@router.post("/recarregar-referencia", response_model=str)
+async def recarregar_referencia(current_user = Depends(get_current_user)):
+    cache_referencia.invalidar()
+    await cache_referencia.carregar()
+    # Contagens por categoria guardadas com os nomes antigos
+    cache_respostas.limpar()
+    return "Dados de referência recarregados"
@@ -1,197 +1,227 @@
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
-from app.db import SessionLocal
-from app.models.despesas import Despesas
-from app.models.categoria import Categoria
-from app.models.receitas import Receitas
-from app.models.despesas import Despesas
-from app.schemas import categoria
+from app.db import get_db
+from app.schemas.comum import ValorMesResponse, ContagemRecorrenciaResponse
+from app.schemas.dashboard import (
+    ContagemDiaResponse, ContagemCategoriaResponse, ResumoDashboardResponse, ProjecaoSaldoResponse,
+)
+from typing import List
 from collections import defaultdict
 from dateutil.relativedelta import relativedelta
+from app.utils import recorrencia
+from app.utils.dados_referencia import cache_referencia
+from app.utils.snapshot import cache_snapshots
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+def _deslocar(data_referencia: date, meses: int) -> date:
     try:
-        yield db
-    finally:
-        db.close()
-
-@router.get("/contagem-despesas-por-dia-vencimento")
-def contagem_despesas_por_dia(
-    id_login: str = Query(...),
-    mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
-):
-    data_consulta = date(ano, mes, 1)
-    despesas = db.query(Despesas).filter(Despesas.id_login == id_login).all()
-
-    contagem_por_dia = {}
-
-    for r in despesas:
-        data_base = r.data_vencimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-        if not r.recorrencia and data_base == data_consulta:
-            dia = r.data_vencimento.day
-            contagem_por_dia[dia] = contagem_por_dia.get(dia, 0) + 1
-        elif r.recorrencia and (data_consulta >= data_base and (fim is None or data_consulta <= fim)):
-            dia = r.data_vencimento.day
-            contagem_por_dia[dia] = contagem_por_dia.get(dia, 0) + 1
-
-    resultado = [{"dia": dia, "quantidade": quantidade} for dia, quantidade in sorted(contagem_por_dia.items())]
-    return resultado
-
-@router.get("/contagem-despesas-por-categoria")
-def contagem_despesas_por_categoria(id_login: str, mes: int, ano: int, db: Session = Depends(get_db)):
-    data_consulta = date(ano, mes, 1)
-    despesas = db.query(Despesas).filter(Despesas.id_login == id_login).all()
-
-    despesas_filtradas = []
-    for r in despesas:
-        data_base = r.data_vencimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-        if not r.recorrencia and data_base == data_consulta:
-            despesas_filtradas.append(r)
-        elif r.recorrencia and (data_consulta >= data_base and (fim is None or data_consulta <= fim)):
-            despesas_filtradas.append(r)
-
-    categorias = db.query(Categoria).all()
-    categorias_dict = {c.id: c.nome for c in categorias}
+        return data_referencia + relativedelta(months=meses)
+    except ValueError:
+        # Passou do ano 9999 (ou antes do ano 1)
+        raise HTTPException(status_code=400, detail="Intervalo fora das datas suportadas")
+
+def _serie(colunas, inicio: date, fim: date) -> list:
+    primeiro, ultimo = recorrencia.indice_mes(inicio), recorrencia.indice_mes(fim)
+    return [
+        {"mes": data_mes.month, "ano": data_mes.year, "valor": total}
+        for data_mes, total in zip(
+            (recorrencia.data_do_indice(i) for i in range(primeiro, ultimo + 1)), colunas.serie(primeiro, ultimo)
+        )
+    ]
+
+async def _contagem_por_categoria(colunas, mes: int) -> list:
+    categorias_dict = await cache_referencia.nomes_categorias()
 
     contagem = defaultdict(int)
-    for despesa in despesas_filtradas:
-        nome_categoria = categorias_dict.get(despesa.id_categoria, "Outros")
-        contagem[nome_categoria] += 1
+    for id_categoria, qtd in colunas.contagem_por_categoria(mes):
+        contagem[categorias_dict.get(id_categoria, "Outros")] += qtd
 
     return [{"categoria": nome, "quantidade": qtd} for nome, qtd in contagem.items()]
 
-@router.get("/total-receitas-periodo")
-def total_receitas_periodo(
-    id_login: str = Query(...),
+@router.get("/contagem-despesas-por-dia-vencimento", response_model=List[ContagemDiaResponse])
+async def contagem_despesas_por_dia(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
 ):
-    data_referencia = date(ano, mes, 1)
-    receitas = db.query(Receitas).filter(Receitas.id_login == id_login).all()
-
-    resultados = []
-
-    for i in range(-3, 3):
-        data_mes = data_referencia + relativedelta(months=i)
-        total_mes = 0.0
-
-        for r in receitas:
-            data_base = r.data_recebimento.replace(day=1)
-            fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-            if not r.recorrencia and data_base == data_mes:
-                total_mes += r.valor
-            elif r.recorrencia and (data_mes >= data_base and (fim is None or data_mes <= fim)):
-                total_mes += r.valor
-
-        resultados.append({
-            "mes": data_mes.month,
-            "ano": data_mes.year,
-            "valor": total_mes
-        })
-
-    resultados.sort(key=lambda x: (x["ano"], x["mes"]))
-    return resultados
+    despesas = (await cache_snapshots.obter(db, id_login)).despesas
+    return [
+        {"dia": dia, "quantidade": quantidade}
+        for dia, quantidade in despesas.contagem_por_dia(recorrencia.indice_mes(date(ano, mes, 1)))
+    ]
+
+@router.get("/contagem-despesas-por-categoria", response_model=List[ContagemCategoriaResponse])
+async def contagem_despesas_por_categoria(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    despesas = (await cache_snapshots.obter(db, id_login)).despesas
+    return await _contagem_por_categoria(despesas, recorrencia.indice_mes(date(ano, mes, 1)))
 
-@router.get("/total-despesas-periodo")
-def total_despesas_periodo(
-    id_login: str = Query(...),
+@router.get("/total-receitas-periodo", response_model=List[ValorMesResponse])
+async def total_receitas_periodo(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
 ):
     data_referencia = date(ano, mes, 1)
-    despesas = db.query(Despesas).filter(Despesas.id_login == id_login).all()
-
-    resultados = []
-
-    for i in range(-3, 3):
-        data_mes = data_referencia + relativedelta(months=i)
-        total_mes = 0.0
-
-        for r in despesas:
-            data_base = r.data_vencimento.replace(day=1)
-            fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
+    return _serie(
+        (await cache_snapshots.obter(db, id_login)).receitas,
+        _deslocar(data_referencia, -3),
+        _deslocar(data_referencia, 2)
+    )
+
+@router.get("/total-despesas-periodo", response_model=List[ValorMesResponse])
+async def total_despesas_periodo(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    data_referencia = date(ano, mes, 1)
+    return _serie(
+        (await cache_snapshots.obter(db, id_login)).despesas,
+        _deslocar(data_referencia, -3),
+        _deslocar(data_referencia, 2)
+    )
+
+@router.get("/total-receitas-recorrencia", response_model=ContagemRecorrenciaResponse)
+async def total_receitas_recorrencia(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    receitas = (await cache_snapshots.obter(db, id_login)).receitas
+    contagem = receitas.contagem_recorrencia(recorrencia.indice_mes(date(ano, mes, 1)))
 
-            if not r.recorrencia and data_base == data_mes:
-                total_mes += r.valor
-            elif r.recorrencia and (data_mes >= data_base and (fim is None or data_mes <= fim)):
-                total_mes += r.valor
+    return {
+        "mes": mes,
+        "ano": ano,
+        "recorrentes": contagem["recorrentes"],
+        "nao_recorrentes": contagem["nao_recorrentes"]
+    }
 
-        resultados.append({
-            "mes": data_mes.month,
-            "ano": data_mes.year,
-            "valor": total_mes
-        })
+@router.get("/total-despesas-recorrencia", response_model=ContagemRecorrenciaResponse)
+async def total_despesas_recorrencia(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    despesas = (await cache_snapshots.obter(db, id_login)).despesas
+    contagem = despesas.contagem_recorrencia(recorrencia.indice_mes(date(ano, mes, 1)))
 
-    resultados.sort(key=lambda x: (x["ano"], x["mes"]))
-    return resultados
+    return {
+        "mes": mes,
+        "ano": ano,
+        "recorrentes": contagem["recorrentes"],
+        "nao_recorrentes": contagem["nao_recorrentes"]
+    }
 
-@router.get("/total-receitas-recorrencia")
-def total_receitas_recorrencia(
-    id_login: str = Query(...),
+@router.get("/dashboard/resumo", response_model=ResumoDashboardResponse)
+async def resumo_dashboard(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
 ):
+    # Um único snapshot atende todos os blocos; sem escritas no meio, nem vai ao banco
+    snapshot = await cache_snapshots.obter(db, id_login)
     data_referencia = date(ano, mes, 1)
-    receitas = db.query(Receitas).filter(Receitas.id_login == id_login).all()
+    indice = recorrencia.indice_mes(data_referencia)
+    inicio, fim = _deslocar(data_referencia, -3), _deslocar(data_referencia, 2)
 
-    recorrentes = 0
-    nao_recorrentes = 0
+    return {
+        "despesas_por_dia_vencimento": [
+            {"dia": dia, "quantidade": quantidade} for dia, quantidade in snapshot.despesas.contagem_por_dia(indice)
+        ],
+        "despesas_por_categoria": await _contagem_por_categoria(snapshot.despesas, indice),
+        "receitas_periodo": _serie(snapshot.receitas, inicio, fim),
+        "despesas_periodo": _serie(snapshot.despesas, inicio, fim),
+        "receitas_recorrencia": {"mes": mes, "ano": ano, **snapshot.receitas.contagem_recorrencia(indice)},
+        "despesas_recorrencia": {"mes": mes, "ano": ano, **snapshot.despesas.contagem_recorrencia(indice)},
+    }
 
-    for r in receitas:
-        data_base = r.data_recebimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
+# Séries de tamanho arbitrário: inicio/fim são deslocamentos em meses a partir de mes/ano
+MAX_MESES_SERIE = 240
+MAX_DESLOCAMENTO_SERIE = 1200
 
-        if not r.recorrencia and data_base == data_referencia:
-            nao_recorrentes += 1
-        elif r.recorrencia and (data_referencia >= data_base and (fim is None or data_referencia <= fim)):
-            recorrentes += 1
+def _intervalo_serie(mes: int, ano: int, inicio: int, fim: int):
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="fim deve ser maior ou igual a inicio")
+    if fim - inicio + 1 > MAX_MESES_SERIE:
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_MESES_SERIE} meses")
 
-    return {
-        "mes": data_referencia.month,
-        "ano": data_referencia.year,
-        "recorrentes": recorrentes,
-        "nao_recorrentes": nao_recorrentes
-    }
+    data_referencia = date(ano, mes, 1)
+    return _deslocar(data_referencia, inicio), _deslocar(data_referencia, fim)
 
-@router.get("/total-despesas-recorrencia")
-def total_despesas_recorrencia(
-    id_login: str = Query(...),
+@router.get("/serie-receitas", response_model=List[ValorMesResponse])
+async def serie_receitas(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    inicio: int = Query(-3, ge=-MAX_DESLOCAMENTO_SERIE, le=MAX_DESLOCAMENTO_SERIE),
+    fim: int = Query(2, ge=-MAX_DESLOCAMENTO_SERIE, le=MAX_DESLOCAMENTO_SERIE),
+    db: AsyncSession = Depends(get_db)
 ):
-    data_referencia = date(ano, mes, 1)
-    despesas = db.query(Despesas).filter(Despesas.id_login == id_login).all()
-
-    recorrentes = 0
-    nao_recorrentes = 0
+    data_inicio, data_fim = _intervalo_serie(mes, ano, inicio, fim)
+    return _serie((await cache_snapshots.obter(db, id_login)).receitas, data_inicio, data_fim)
 
-    for r in despesas:
-        data_base = r.data_vencimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
+@router.get("/serie-despesas", response_model=List[ValorMesResponse])
+async def serie_despesas(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    inicio: int = Query(-3, ge=-MAX_DESLOCAMENTO_SERIE, le=MAX_DESLOCAMENTO_SERIE),
+    fim: int = Query(2, ge=-MAX_DESLOCAMENTO_SERIE, le=MAX_DESLOCAMENTO_SERIE),
+    db: AsyncSession = Depends(get_db)
+):
+    data_inicio, data_fim = _intervalo_serie(mes, ano, inicio, fim)
+    return _serie((await cache_snapshots.obter(db, id_login)).despesas, data_inicio, data_fim)
+
+# Projeção de saldo: receitas menos despesas (com as recorrências) mês a mês a
+# partir de mes/ano, somadas a saldo_inicial
+MAX_MESES_PROJECAO = 120
+# 1e14 centavos: o saldo acumulado é somado em float64 no snapshot e fica exato
+# até 2**53 (~9e15) centavos; cada lançamento é NUMERIC(10, 2), menos de 1e10
+# centavos, e sobram quase 9e15 para as somas dos lançamentos na projeção
+MAX_SALDO_INICIAL = 1e12
+
+@router.get("/projecao-saldo", response_model=ProjecaoSaldoResponse)
+async def projecao_saldo(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    meses: int = Query(12, ge=1, le=MAX_MESES_PROJECAO),
+    saldo_inicial: float = Query(0, ge=-MAX_SALDO_INICIAL, le=MAX_SALDO_INICIAL, allow_inf_nan=False),
+    db: AsyncSession = Depends(get_db)
+):
+    primeiro = recorrencia.indice_mes(date(ano, mes, 1))
+    ultimo = primeiro + meses - 1
+    if ultimo > recorrencia.indice_mes(date.max):
+        raise HTTPException(status_code=400, detail="Projeção passa do ano 9999")
 
-        if not r.recorrencia and data_base == data_referencia:
-            nao_recorrentes += 1
-        elif r.recorrencia and (data_referencia >= data_base and (fim is None or data_referencia <= fim)):
-            recorrentes += 1
+    snapshot = await cache_snapshots.obter(db, id_login)
+    receitas, despesas, saldo, acumulado = snapshot.projecao(primeiro, ultimo, round(saldo_inicial * 100))
 
     return {
-        "mes": data_referencia.month,
-        "ano": data_referencia.year,
-        "recorrentes": recorrentes,
-        "nao_recorrentes": nao_recorrentes
-    }
\ No newline at end of file
+        "saldo_inicial": saldo_inicial,
+        "meses": [
+            {
+                "mes": data_mes.month,
+                "ano": data_mes.year,
+                "receitas": receitas[i],
+                "despesas": despesas[i],
+                "saldo": saldo[i],
+                "saldo_acumulado": acumulado[i],
+            }
+            for i, data_mes in enumerate(recorrencia.data_do_indice(indice) for indice in range(primeiro, ultimo + 1))
+        ]
+    }
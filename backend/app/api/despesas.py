@@ -1,24 +1,28 @@
 from datetime import date
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import extract
-from app.db import SessionLocal
+from typing import Any, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db
 from app.models.despesas import Despesas
-from app.schemas.despesas import DespesasCreate
+from app.models.login import Login
+from app.models.categoria import Categoria
+from app.schemas.despesas import (
+    DespesasCreate, DespesaResponse, PaginaDespesasResponse, DespesaInseridaResponse,
+    DespesasLoteResponse, DespesaAlteradaResponse,
+)
+from app.schemas.comum import TotalMesResponse
 from app.schemas.update_despesas import DespesasUpdate
 from app.schemas.update_fimRecorrencia import FimRecorrenciaUpdate
+from app.utils import recorrencia, paginacao, lote
+from app.utils.snapshot import cache_snapshots, marcar_alterados
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/inserir-despesa")
-def inserir_despesa(dados: DespesasCreate, db: Session = Depends(get_db)):
+@router.post("/inserir-despesa", response_model=DespesaInseridaResponse)
+async def inserir_despesa(dados: DespesasCreate, db: AsyncSession = Depends(get_db)):
     nova_despesa = Despesas(
         id_login=dados.id_login,
         descricao=dados.descricao,
@@ -26,41 +30,53 @@ def inserir_despesa(dados: DespesasCreate, db: Session = Depends(get_db)):
         data_vencimento=dados.data_vencimento,
         recorrencia=dados.recorrencia,
         fim_recorrencia=dados.fim_recorrencia,
-        id_categoria = dados.id_categoria
+        id_categoria = dados.id_categoria,
+        frequencia=dados.frequencia,
+        intervalo=dados.intervalo
     )
     db.add(nova_despesa)
-    db.commit()
-    db.refresh(nova_despesa)
+    marcar_alterados(db.sync_session, [nova_despesa.id_login])
+    await db.commit()
+    await db.refresh(nova_despesa)
     return {"mensagem": "Despesa inserida com sucesso", "despesa_id": nova_despesa.id}
 
-@router.get("/total-despesas")
-def total_despesas(
-    id_login: str = Query(...),
+@router.post("/inserir-despesas/lote", response_model=DespesasLoteResponse)
+async def inserir_despesas_lote(itens: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    if not itens:
+        raise HTTPException(status_code=422, detail="Lote vazio")
+    if len(itens) > lote.LOTE_MAXIMO:
+        raise HTTPException(status_code=413, detail=f"Lote acima do limite de {lote.LOTE_MAXIMO} itens")
+
+    dados, erros = lote.validar(itens, DespesasCreate)
+    if not erros:
+        erros = await lote.verificar_referencias(db, dados, {"id_login": Login, "id_categoria": Categoria})
+    if erros:
+        # Nada é gravado se algum item for inválido
+        raise HTTPException(status_code=422, detail=erros)
+
+    # Um único INSERT de várias linhas; os ids voltam na ordem do lote
+    try:
+        ids = (await db.scalars(
+            insert(Despesas).returning(Despesas.id, sort_by_parameter_order=True),
+            [d.model_dump() for d in dados]
+        )).all()
+        marcar_alterados(db.sync_session, {d.id_login for d in dados})
+        await db.commit()
+    except IntegrityError:
+        # Referência apagada entre a verificação e o INSERT
+        await db.rollback()
+        raise HTTPException(status_code=422, detail="Lote referencia registros inexistentes")
+    return {"mensagem": f"{len(ids)} despesas inseridas com sucesso", "despesa_ids": ids}
+
+@router.get("/total-despesas", response_model=TotalMesResponse)
+async def total_despesas(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
 ):
-    data_consulta = date(ano, mes, 1)
-    despesas = (
-        db.query(Despesas)
-        .filter(Despesas.id_login == id_login)
-        .all()
-    )
-
-    total = 0.0
-
-    for r in despesas:
-        data_base = r.data_vencimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-        if not r.recorrencia:
-            # Receita normal
-            if data_base == data_consulta:
-                total += r.valor
-        else:
-            # Receita recorrente
-            if data_consulta >= data_base and (fim is None or data_consulta <= fim):
-                total += r.valor
+    snapshot = await cache_snapshots.obter(db, id_login)
+    total = snapshot.despesas.total(recorrencia.indice_mes(date(ano, mes, 1)))
 
     return {
         "id_login": id_login,
@@ -69,79 +85,113 @@ def total_despesas(
         "total": total
     }
 
-@router.get("/detalhes-despesas")
-def despesas_detalhadas(id_login: str, mes: int, ano: int, db: Session = Depends(get_db)):
+def _formatar_despesa(r: Despesas, ocorrencias: int = 1) -> dict:
+    # Uma linha por lançamento; regras semanais ou com intervalo podem ocorrer
+    # mais de uma vez no mês, e total_no_mes é o que entra nos totais
+    return {
+        "id": r.id,
+        "descricao": r.descricao,
+        "valor": r.valor,
+        "data_vencimento": r.data_vencimento,
+        "recorrencia": r.recorrencia,
+        "fim_recorrencia": r.fim_recorrencia if r.recorrencia else None,
+        "frequencia": r.frequencia,
+        "intervalo": r.intervalo,
+        "ocorrencias": ocorrencias,
+        "total_no_mes": round(r.valor * ocorrencias, 2),
+        "id_categoria": r.id_categoria
+    }
+
+async def _consulta_detalhes(db: AsyncSession, id_login: int, mes: int, ano: int):
+    # Regras semanais ou com intervalo podem não ocorrer em um mês em que estão ativas;
+    # o snapshot diz quais delas ocorrem
     data_consulta = date(ano, mes, 1)
-    despesas = db.query(Despesas).filter(Despesas.id_login == id_login).all()
-
-    resultado = []
-    for r in despesas:
-        data_base = r.data_vencimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-        if not r.recorrencia and data_base == data_consulta:
-            resultado.append({
-                "id": r.id,
-                "descricao": r.descricao,
-                "valor": r.valor,
-                "data_vencimento": r.data_vencimento,
-                "recorrencia": r.recorrencia,
-                "fim_recorrencia": None,
-                "id_categoria": r.id_categoria
-            })
-        elif r.recorrencia and (data_consulta >= data_base and (fim is None or data_consulta <= fim)):
-            resultado.append({
-                "id": r.id,
-                "descricao": r.descricao,
-                "valor": r.valor,
-                "data_vencimento": r.data_vencimento,
-                "recorrencia": r.recorrencia,
-                "fim_recorrencia": r.fim_recorrencia,
-                "id_categoria": r.id_categoria
-            })
-
-    return resultado
-
-@router.delete("/delete-despesa/{id}")
-def deletar_despesa(id: int, db: Session = Depends(get_db)):
-    despesa = db.query(Despesas).filter(Despesas.id == id).first()
+    snapshot = await cache_snapshots.obter(db, id_login)
+    contagens = snapshot.despesas.ocorrencias_outras_regras(recorrencia.indice_mes(data_consulta))
+    consulta = select(Despesas).where(recorrencia.filtro_usuario_mes(Despesas, id_login, data_consulta, list(contagens)))
+    return consulta, lambda r: _formatar_despesa(r, contagens.get(r.id, 1))
+
+@router.get("/detalhes-despesas", response_model=List[DespesaResponse])
+async def despesas_detalhadas(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    despesas = (await db.scalars(consulta.order_by(Despesas.id))).all()
+    return [formatar(r) for r in despesas]
+
+@router.get("/detalhes-despesas/pagina", response_model=PaginaDespesasResponse)
+async def despesas_detalhadas_pagina(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    limit: int = Query(paginacao.LIMITE_PADRAO, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    consulta = consulta.order_by(Despesas.data_vencimento, Despesas.id)
+    try:
+        posicao = paginacao.decodificar_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await paginacao.pagina(db, consulta, Despesas.data_vencimento, posicao, limit, formatar)
+
+@router.get("/detalhes-despesas/stream")
+async def despesas_detalhadas_stream(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    consulta = consulta.order_by(Despesas.data_vencimento, Despesas.id)
+    return StreamingResponse(paginacao.ndjson(consulta, formatar), media_type="application/x-ndjson")
+
+@router.delete("/delete-despesa/{id}", response_model=DespesaAlteradaResponse)
+async def deletar_despesa(id: int, db: AsyncSession = Depends(get_db)):
+    despesa = await db.get(Despesas, id)
 
     if not despesa:
         raise HTTPException(status_code=404, detail="Despesa não encontrada")
 
-    db.delete(despesa)
-    db.commit()
+    marcar_alterados(db.sync_session, [despesa.id_login])
+    await db.delete(despesa)
+    await db.commit()
 
     return {"mensagem": "Despesa excluída com sucesso", "id_despesa": id}
 
-@router.put("/fim-recorrencia-despesa/{id}")
-def encerrar_recorrencia_despesa(
+@router.put("/fim-recorrencia-despesa/{id}", response_model=DespesaAlteradaResponse)
+async def encerrar_recorrencia_despesa(
     id: int,
     dados: FimRecorrenciaUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    despesa = db.query(Despesas).filter(Despesas.id == id).first()
+    despesa = await db.get(Despesas, id)
 
     if not despesa:
         raise HTTPException(status_code=404, detail="Despesa não encontrada")
 
     despesa.fim_recorrencia = dados.fim_recorrencia
+    marcar_alterados(db.sync_session, [despesa.id_login])
 
-    db.commit()
-    db.refresh(despesa)
+    await db.commit()
+    await db.refresh(despesa)
 
     return {
         "mensagem": "Fim da recorrência atualizado com sucesso",
         "id_despesa": despesa.id
     }
 
-@router.put("/update-despesa/{id}")
-def atualizar_despesa(
+@router.put("/update-despesa/{id}", response_model=DespesaAlteradaResponse)
+async def atualizar_despesa(
     id: int,
     dados: DespesasUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    despesa = db.query(Despesas).filter(Despesas.id == id).first()
+    despesa = await db.get(Despesas, id)
 
     if not despesa:
         raise HTTPException(status_code=404, detail="Despesa não encontrada")
@@ -151,20 +201,25 @@ def atualizar_despesa(
     despesa.data_vencimento = dados.data_vencimento
     despesa.recorrencia = dados.recorrencia
     despesa.fim_recorrencia = dados.fim_recorrencia
+    if dados.frequencia is not None:
+        despesa.frequencia = dados.frequencia
+    if dados.intervalo is not None:
+        despesa.intervalo = dados.intervalo
     despesa.id_categoria = dados.id_categoria
+    marcar_alterados(db.sync_session, [despesa.id_login])
 
-    db.commit()
-    db.refresh(despesa)
+    await db.commit()
+    await db.refresh(despesa)
 
     return {"mensagem": "Despesa atualizada com sucesso", "id_despesa": despesa.id}
 
-@router.get("/unica-despesa/{id}")
-def obter_despesa(
+@router.get("/unica-despesa/{id}", response_model=DespesaResponse)
+async def obter_despesa(
     id: int ,
-    id_login: str ,
-    db: Session = Depends(get_db)
+    id_login: int ,
+    db: AsyncSession = Depends(get_db)
 ):
-    despesa = db.query(Despesas).filter(Despesas.id == id).first()
+    despesa = await db.get(Despesas, id)
 
     if not despesa:
         raise HTTPException(status_code=404, detail="Despesa não encontrada")
@@ -179,5 +234,7 @@ def obter_despesa(
         "data_vencimento": despesa.data_vencimento,
         "recorrencia": despesa.recorrencia,
         "fim_recorrencia": despesa.fim_recorrencia,
+        "frequencia": despesa.frequencia,
+        "intervalo": despesa.intervalo,
         "id_categoria": despesa.id_categoria,
     }
\ No newline at end of file
@@ -1,32 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db
 from app.schemas.esqueceu_senha import EsqueciSenhaRequest, RedefinirSenhaRequest
+from app.schemas.comum import MensagemResponse
 from app.models.login import Login
-from app.utils import email, security
+from app.utils import security, limite_taxa
 from app.utils.token import gerar_token_reset, validar_token_reset
-from dotenv import load_dotenv
-import os
-
-load_dotenv()  # Carrega o .env
-
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT"))
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+from app.utils.cache_tokens import cache_tokens
 
+# A caixa de saída (com a configuração SMTP) é criada em app.main.criar_app e fica em app.state
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/esqueci-senha")
-def esqueci_senha(dados: EsqueciSenhaRequest, db: Session = Depends(get_db)):
-    usuario = db.query(Login).filter_by(email=dados.email).first()
+@router.post("/esqueci-senha", response_model=MensagemResponse)
+async def esqueci_senha(dados: EsqueciSenhaRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    usuario = await db.scalar(select(Login).filter_by(email=dados.email))
     if not usuario:
         # Retorna a mesma mensagem para evitar confirmação de e-mails existentes
         return {"mensagem": "Se o e-mail estiver cadastrado, você receberá um link para redefinir a senha."}
@@ -48,29 +36,31 @@ def esqueci_senha(dados: EsqueciSenhaRequest, db: Session = Depends(get_db)):
     Se você não fez essa solicitação, ignore este e-mail.
     """
 
-    email.enviar_email(
-        dados.email,
-        "Redefinição de Senha",
-        corpo_email,
-        SMTP_HOST,
-        SMTP_PORT,
-        SMTP_USER,
-        SMTP_PASSWORD
-    )
+    # O envio acontece em segundo plano; a resposta não espera o SMTP
+    request.app.state.caixa_saida.enfileirar(dados.email, "Redefinição de Senha", corpo_email)
 
     return {"mensagem": "Se o e-mail estiver cadastrado, você receberá um link para redefinir a senha."}
 
-@router.post("/resetar-senha")
-def resetar_senha(dados: RedefinirSenhaRequest, db: Session = Depends(get_db)):
+def _email_do_token(corpo: dict):
+    token = corpo.get("token")
+    return validar_token_reset(token) if isinstance(token, str) else None
+
+@router.post(
+    "/resetar-senha", response_model=MensagemResponse,
+    dependencies=[Depends(limite_taxa.por_ip_e_email(_email_do_token))]
+)
+async def resetar_senha(dados: RedefinirSenhaRequest, db: AsyncSession = Depends(get_db)):
     email = validar_token_reset(dados.token)
     if not email:
         raise HTTPException(status_code=400, detail="Token inválido ou expirado.")
 
-    usuario = db.query(Login).filter_by(email=email).first()
+    usuario = await db.scalar(select(Login).filter_by(email=email))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
-    usuario.senha = security.hash_senha(dados.nova_senha)
-    db.commit()
+    usuario.senha = await security.hash_senha_async(dados.nova_senha)
+    usuario.versao_senha = Login.versao_senha + 1
+    await db.commit()
+    cache_tokens.invalidar_email(usuario.email)
 
     return {"mensagem": "Senha redefinida com sucesso"}
@@ -0,0 +1,44 @@
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.utils import exportacao, recorrencia
+
+router = APIRouter()
+
+# Limita a expansão de recorrentes sem fim
+MAX_MESES_EXPORTACAO = 1200
+
+# Mesmo limite inferior do `ano` das rotas mensais; o superior é o de date (9999-12-31)
+DATA_MINIMA = date(1900, 1, 1)
+
+@router.get("/exportar")
+async def exportar(
+    id_login: int = Query(...),
+    inicio: date = Query(...),
+    fim: date = Query(...),
+    formato: str = Query("csv", pattern="^(csv|parquet)$")
+):
+    # Tudo que pode falhar é validado aqui: depois do StreamingResponse o 200
+    # já foi enviado e um erro só truncaria o arquivo
+    if inicio < DATA_MINIMA:
+        raise HTTPException(status_code=400, detail=f"inicio deve ser a partir de {DATA_MINIMA.isoformat()}")
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="fim deve ser posterior a inicio")
+    if recorrencia.indice_mes(fim) - recorrencia.indice_mes(inicio) >= MAX_MESES_EXPORTACAO:
+        raise HTTPException(status_code=400, detail=f"Período acima de {MAX_MESES_EXPORTACAO} meses")
+
+    nome_arquivo = f"mywallet_{id_login}_{inicio.isoformat()}_{fim.isoformat()}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+
+    if formato == "parquet":
+        if not exportacao.PARQUET_DISPONIVEL:
+            raise HTTPException(status_code=501, detail="Exportação Parquet requer o pacote pyarrow")
+        return StreamingResponse(
+            exportacao.parquet_stream(id_login, inicio, fim),
+            media_type="application/vnd.apache.parquet", headers=headers
+        )
+
+    return StreamingResponse(
+        exportacao.csv_stream(id_login, inicio, fim),
+        media_type="text/csv; charset=utf-8", headers=headers
+    )
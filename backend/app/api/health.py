@@ -0,0 +1,37 @@
+import time
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db, estado_pool
+from app.utils import metricas
+
+router = APIRouter()
+
+@router.get("/health/db")
+async def saude_banco(db: AsyncSession = Depends(get_db)):
+    inicio = time.perf_counter()
+    try:
+        await db.execute(text("SELECT 1"))
+        status_banco = "ok"
+    except Exception as e:
+        status_banco = f"erro: {e.__class__.__name__}"
+    latencia_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+    corpo = {"status": status_banco, "latencia_ms": latencia_ms, "pool": estado_pool()}
+    return JSONResponse(corpo, status_code=200 if status_banco == "ok" else 503)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metricas_prometheus():
+    # Métricas do processo atual; com vários workers, cada um expõe as suas
+    pool = estado_pool()
+    extras = []
+    for nome, chave in (("db_pool_tamanho", "tamanho"), ("db_pool_em_uso", "em_uso"), ("db_pool_ociosas", "ociosas")):
+        if chave in pool:
+            extras += [f"# TYPE {nome} gauge", f"{nome} {pool[chave]}"]
+    extras += [
+        "# TYPE db_pool_espera_segundos_max gauge",
+        f"db_pool_espera_segundos_max {pool['espera']['maximo_ms'] / 1000}",
+    ]
+    return PlainTextResponse(metricas.exportar(extras), media_type="text/plain; version=0.0.4; charset=utf-8")
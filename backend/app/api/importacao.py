@@ -0,0 +1,47 @@
+import os
+import codecs
+import tempfile
+import aiofiles
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.schemas.importacao import JobImportacaoResponse
+from app.utils import importacao
+
+router = APIRouter()
+
+@router.post("/importar-extrato", status_code=202, response_model=JobImportacaoResponse)
+async def importar_extrato(
+    request: Request,
+    id_login: int = Query(...),
+    formato: str = Query(..., pattern="^(csv|ofx)$"),
+    encoding: str = Query("utf-8")
+):
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail="Encoding desconhecido")
+
+    # O corpo é o próprio arquivo; vai para o disco em blocos, sem ficar inteiro na memória
+    descritor, caminho = tempfile.mkstemp(suffix=f".{formato}")
+    os.close(descritor)
+    tamanho = 0
+    try:
+        async with aiofiles.open(caminho, "wb") as arquivo:
+            async for bloco in request.stream():
+                tamanho += len(bloco)
+                if tamanho > importacao.IMPORTACAO_TAMANHO_MAX:
+                    raise HTTPException(status_code=413, detail="Arquivo acima do tamanho máximo")
+                await arquivo.write(bloco)
+    except BaseException:
+        os.remove(caminho)
+        raise
+
+    job = importacao.criar_job(id_login, formato)
+    importacao.iniciar(job, caminho, encoding)
+    return job.como_dict()
+
+@router.get("/importar-extrato/{job_id}", response_model=JobImportacaoResponse)
+async def status_importacao(job_id: str):
+    job = importacao.obter_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job.como_dict()
@@ -1,36 +1,44 @@
 from fastapi import Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from app.models import login as login_model
+from app.schemas.login import UsuarioAutenticadoResponse
 from app.utils import token
-from app.db import SessionLocal
+from app.utils.cache_tokens import cache_tokens, UsuarioAutenticado
+from app.db import AsyncSessionLocal
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_current_user(token_str: str = Depends(oauth2_scheme)):
+    # Caminho comum: token já validado, sem verificar assinatura nem ir ao banco
+    usuario = cache_tokens.obter(token_str)
+    if usuario is not None:
+        return usuario
 
-def get_current_user(token_str: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    email = token.validar_token_acesso(token_str)
-    if email is None:
+    payload = token.decodificar_token_acesso(token_str)
+    if payload is None:
         raise HTTPException(status_code=401, detail="Token inválido ou expirado")
 
-    user = db.query(login_model.Login).filter_by(email=email).first()
+    email = payload["sub"]
+    async with AsyncSessionLocal() as db:
+        user = await db.get(login_model.Login, payload["id"])
+
     if user is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    return user
+    # E-mail trocado ou senha redefinida depois da emissão do token
+    if user.email != email or payload["sv"] != user.versao_senha:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+
+    usuario = UsuarioAutenticado(id=user.id, email=user.email)
+    cache_tokens.guardar(token_str, usuario, payload["exp"])
+    return usuario
 
 # Endpoint protegido
-@router.get("/me")
-def get_user_data(current_user = Depends(get_current_user)):
+@router.get("/me", response_model=UsuarioAutenticadoResponse)
+async def get_user_data(current_user = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "email": current_user.email
-    }
\ No newline at end of file
+    }
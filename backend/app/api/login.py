@@ -1,26 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.schemas.login import LoginRequest
-from app.utils import security, token
-from app.db import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.login import LoginRequest, TokenResponse
+from app.utils import security, token, limite_taxa
+from app.db import get_db
 from app.models import login as login_model
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post(
+    "/login", response_model=TokenResponse,
+    dependencies=[Depends(limite_taxa.por_ip_e_email(lambda corpo: corpo.get("email")))]
+)
+async def login(dados: LoginRequest, db: AsyncSession = Depends(get_db)):
+    usuario = await db.scalar(select(login_model.Login).filter_by(email=dados.email))
 
-@router.post("/login")
-def login(dados: LoginRequest, db: Session = Depends(get_db)):
-    usuario = db.query(login_model.Login).filter_by(email=dados.email).first()
+    if not usuario:
+        raise HTTPException(status_code=401, detail="Email ou senha inválidos")
 
-    if not usuario or not security.verificar_senha(dados.senha, usuario.senha):
+    senha_confere, novo_hash = await security.verificar_e_atualizar_async(dados.senha, usuario.senha)
+    if not senha_confere:
         raise HTTPException(status_code=401, detail="Email ou senha inválidos")
 
-    access_token = token.gerar_token_acesso(dados.email)
+    if novo_hash:
+        # Hash gravado com outro custo de bcrypt: aproveita a senha em claro para refazê-lo
+        usuario.senha = novo_hash
+        await db.commit()
+
+    access_token = token.gerar_token_acesso(usuario.email, usuario.id, usuario.versao_senha)
 
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,67 +1,81 @@
 from datetime import date
-from http.client import HTTPException
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import extract
-from app.db import SessionLocal
+from typing import Any, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db
 from app.models.receitas import Receitas
-from app.schemas.receitas import ReceitaCreate
+from app.models.login import Login
+from app.schemas.receitas import (
+    ReceitaCreate, ReceitaResponse, PaginaReceitasResponse, ReceitaInseridaResponse,
+    ReceitasLoteResponse, ReceitaAlteradaResponse,
+)
+from app.schemas.comum import TotalMesResponse
 from app.schemas.update_receitas import ReceitaUpdate
 from app.schemas.update_fimRecorrencia import FimRecorrenciaUpdate
+from app.utils import recorrencia, paginacao, lote
+from app.utils.snapshot import cache_snapshots, marcar_alterados
 
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/inserir-receita")
-def inserir_receita(dados: ReceitaCreate, db: Session = Depends(get_db)):
+@router.post("/inserir-receita", response_model=ReceitaInseridaResponse)
+async def inserir_receita(dados: ReceitaCreate, db: AsyncSession = Depends(get_db)):
     nova_receita = Receitas(
         id_login=dados.id_login,
         descricao=dados.descricao,
         valor=dados.valor,
         data_recebimento=dados.data_recebimento,
         recorrencia=dados.recorrencia,
-        fim_recorrencia=dados.fim_recorrencia
+        fim_recorrencia=dados.fim_recorrencia,
+        frequencia=dados.frequencia,
+        intervalo=dados.intervalo
     )
     db.add(nova_receita)
-    db.commit()
-    db.refresh(nova_receita)
+    marcar_alterados(db.sync_session, [nova_receita.id_login])
+    await db.commit()
+    await db.refresh(nova_receita)
     return {"mensagem": "Receita inserida com sucesso", "receita_id": nova_receita.id}
 
-@router.get("/total-receitas")
-def total_receitas(
-    id_login: str = Query(...),
+@router.post("/inserir-receitas/lote", response_model=ReceitasLoteResponse)
+async def inserir_receitas_lote(itens: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    if not itens:
+        raise HTTPException(status_code=422, detail="Lote vazio")
+    if len(itens) > lote.LOTE_MAXIMO:
+        raise HTTPException(status_code=413, detail=f"Lote acima do limite de {lote.LOTE_MAXIMO} itens")
+
+    dados, erros = lote.validar(itens, ReceitaCreate)
+    if not erros:
+        erros = await lote.verificar_referencias(db, dados, {"id_login": Login})
+    if erros:
+        # Nada é gravado se algum item for inválido
+        raise HTTPException(status_code=422, detail=erros)
+
+    # Um único INSERT de várias linhas; os ids voltam na ordem do lote
+    try:
+        ids = (await db.scalars(
+            insert(Receitas).returning(Receitas.id, sort_by_parameter_order=True),
+            [d.model_dump() for d in dados]
+        )).all()
+        marcar_alterados(db.sync_session, {d.id_login for d in dados})
+        await db.commit()
+    except IntegrityError:
+        # Referência apagada entre a verificação e o INSERT
+        await db.rollback()
+        raise HTTPException(status_code=422, detail="Lote referencia registros inexistentes")
+    return {"mensagem": f"{len(ids)} receitas inseridas com sucesso", "receita_ids": ids}
+
+@router.get("/total-receitas", response_model=TotalMesResponse)
+async def total_receitas(
+    id_login: int = Query(...),
     mes: int = Query(..., ge=1, le=12),
-    ano: int = Query(..., ge=1900),
-    db: Session = Depends(get_db)
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
 ):
-    data_consulta = date(ano, mes, 1)
-    receitas = (
-        db.query(Receitas)
-        .filter(Receitas.id_login == id_login)
-        .all()
-    )
-
-    total = 0.0
-
-    for r in receitas:
-            data_base = r.data_recebimento.replace(day=1)
-            fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-            if not r.recorrencia:
-                # Receita normal
-                if data_base == data_consulta:
-                    total += r.valor
-            else:
-                # Receita recorrente
-                if data_consulta >= data_base and (fim is None or data_consulta <= fim):
-                    total += r.valor
+    snapshot = await cache_snapshots.obter(db, id_login)
+    total = snapshot.receitas.total(recorrencia.indice_mes(date(ano, mes, 1)))
 
     return {
         "id_login": id_login,
@@ -70,77 +84,112 @@ def total_receitas(
         "total": total
     }
 
-@router.get("/detalhes-receitas")
-def receitas_detalhadas(id_login: str, mes: int, ano: int, db: Session = Depends(get_db)):
+def _formatar_receita(r: Receitas, ocorrencias: int = 1) -> dict:
+    # Uma linha por lançamento; regras semanais ou com intervalo podem ocorrer
+    # mais de uma vez no mês, e total_no_mes é o que entra nos totais
+    return {
+        "id": r.id,
+        "descricao": r.descricao,
+        "valor": r.valor,
+        "data_recebimento": r.data_recebimento,
+        "recorrencia": r.recorrencia,
+        "fim_recorrencia": r.fim_recorrencia if r.recorrencia else None,
+        "frequencia": r.frequencia,
+        "intervalo": r.intervalo,
+        "ocorrencias": ocorrencias,
+        "total_no_mes": round(r.valor * ocorrencias, 2)
+    }
+
+async def _consulta_detalhes(db: AsyncSession, id_login: int, mes: int, ano: int):
+    # Regras semanais ou com intervalo podem não ocorrer em um mês em que estão ativas;
+    # o snapshot diz quais delas ocorrem
     data_consulta = date(ano, mes, 1)
-    receitas = db.query(Receitas).filter(Receitas.id_login == id_login).all()
-
-    resultado = []
-    for r in receitas:
-        data_base = r.data_recebimento.replace(day=1)
-        fim = r.fim_recorrencia.replace(day=1) if r.fim_recorrencia else None
-
-        if not r.recorrencia and data_base == data_consulta:
-            resultado.append({
-                "id": r.id,
-                "descricao": r.descricao,
-                "valor": r.valor,
-                "data_recebimento": r.data_recebimento,
-                "recorrencia": r.recorrencia,
-                "fim_recorrencia": None
-            })
-        elif r.recorrencia and (data_consulta >= data_base and (fim is None or data_consulta <= fim)):
-            resultado.append({
-                "id": r.id,
-                "descricao": r.descricao,
-                "valor": r.valor,
-                "data_recebimento": r.data_recebimento,
-                "recorrencia": r.recorrencia,
-                "fim_recorrencia": r.fim_recorrencia
-            })
-
-    return resultado
-
-@router.delete("/delete-receita/{id}")
-def deletar_receita(id: int, db: Session = Depends(get_db)):
-    receita = db.query(Receitas).filter(Receitas.id == id).first()
+    snapshot = await cache_snapshots.obter(db, id_login)
+    contagens = snapshot.receitas.ocorrencias_outras_regras(recorrencia.indice_mes(data_consulta))
+    consulta = select(Receitas).where(recorrencia.filtro_usuario_mes(Receitas, id_login, data_consulta, list(contagens)))
+    return consulta, lambda r: _formatar_receita(r, contagens.get(r.id, 1))
+
+@router.get("/detalhes-receitas", response_model=List[ReceitaResponse])
+async def receitas_detalhadas(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    receitas = (await db.scalars(consulta.order_by(Receitas.id))).all()
+    return [formatar(r) for r in receitas]
+
+@router.get("/detalhes-receitas/pagina", response_model=PaginaReceitasResponse)
+async def receitas_detalhadas_pagina(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    limit: int = Query(paginacao.LIMITE_PADRAO, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    consulta = consulta.order_by(Receitas.data_recebimento, Receitas.id)
+    try:
+        posicao = paginacao.decodificar_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await paginacao.pagina(db, consulta, Receitas.data_recebimento, posicao, limit, formatar)
+
+@router.get("/detalhes-receitas/stream")
+async def receitas_detalhadas_stream(
+    id_login: int = Query(...),
+    mes: int = Query(..., ge=1, le=12),
+    ano: int = Query(..., ge=1900, le=9999),
+    db: AsyncSession = Depends(get_db)
+):
+    consulta, formatar = await _consulta_detalhes(db, id_login, mes, ano)
+    consulta = consulta.order_by(Receitas.data_recebimento, Receitas.id)
+    return StreamingResponse(paginacao.ndjson(consulta, formatar), media_type="application/x-ndjson")
+
+@router.delete("/delete-receita/{id}", response_model=ReceitaAlteradaResponse)
+async def deletar_receita(id: int, db: AsyncSession = Depends(get_db)):
+    receita = await db.get(Receitas, id)
 
     if not receita:
         raise HTTPException(status_code=404, detail="receita não encontrada")
 
-    db.delete(receita)
-    db.commit()
+    marcar_alterados(db.sync_session, [receita.id_login])
+    await db.delete(receita)
+    await db.commit()
 
     return {"mensagem": "receita excluída com sucesso", "id_receita": id}
 
-@router.put("/fim-recorrencia-receita/{id}")
-def encerrar_recorrencia_receita(
+@router.put("/fim-recorrencia-receita/{id}", response_model=ReceitaAlteradaResponse)
+async def encerrar_recorrencia_receita(
     id: int,
     dados: FimRecorrenciaUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    receita = db.query(Receitas).filter(Receitas.id == id).first()
+    receita = await db.get(Receitas, id)
 
     if not receita:
         raise HTTPException(status_code=404, detail="Receita não encontrada")
 
     receita.fim_recorrencia = dados.fim_recorrencia
+    marcar_alterados(db.sync_session, [receita.id_login])
 
-    db.commit()
-    db.refresh(receita)
+    await db.commit()
+    await db.refresh(receita)
 
     return {
         "mensagem": "Fim da recorrência atualizado com sucesso",
         "id_receita": receita.id
     }
 
-@router.put("/update-receita/{id}")
-def atualizar_receita(
+@router.put("/update-receita/{id}", response_model=ReceitaAlteradaResponse)
+async def atualizar_receita(
     id: int,
     dados: ReceitaUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    receita = db.query(Receitas).filter(Receitas.id == id).first()
+    receita = await db.get(Receitas, id)
 
     if not receita:
         raise HTTPException(status_code=404, detail="receita não encontrada")
@@ -150,20 +199,24 @@ def atualizar_receita(
     receita.data_recebimento = dados.data_recebimento
     receita.recorrencia = dados.recorrencia
     receita.fim_recorrencia = dados.fim_recorrencia
+    if dados.frequencia is not None:
+        receita.frequencia = dados.frequencia
+    if dados.intervalo is not None:
+        receita.intervalo = dados.intervalo
+    marcar_alterados(db.sync_session, [receita.id_login])
 
-
-    db.commit()
-    db.refresh(receita)
+    await db.commit()
+    await db.refresh(receita)
 
     return {"mensagem": "receita atualizada com sucesso", "id_receita": receita.id}
 
-@router.get("/unica-receita/{id}")
-def obter_receita(
+@router.get("/unica-receita/{id}", response_model=ReceitaResponse)
+async def obter_receita(
     id: int ,
-    id_login: str ,
-    db: Session = Depends(get_db)
+    id_login: int ,
+    db: AsyncSession = Depends(get_db)
 ):
-    receita = db.query(Receitas).filter(Receitas.id == id).first()
+    receita = await db.get(Receitas, id)
 
     if not receita:
         raise HTTPException(status_code=404, detail="receita não encontrada")
@@ -177,5 +230,7 @@ def obter_receita(
         "valor": receita.valor,
         "data_recebimento": receita.data_recebimento,
         "recorrencia": receita.recorrencia,
-        "fim_recorrencia": receita.fim_recorrencia
+        "fim_recorrencia": receita.fim_recorrencia,
+        "frequencia": receita.frequencia,
+        "intervalo": receita.intervalo
     }
\ No newline at end of file
@@ -0,0 +1,38 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+
+_env_carregado = False
+
+
+def carregar_env():
+    # Lê o .env uma única vez por processo (db.py precisa do DATABASE_URL já no import)
+    global _env_carregado
+    if not _env_carregado:
+        load_dotenv()
+        _env_carregado = True
+
+
+@dataclass(frozen=True)
+class Config:
+    """Configuração lida quando o app é criado (app.main.criar_app), não no import."""
+    smtp_host: Optional[str] = None
+    smtp_port: int = 587
+    smtp_user: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_starttls: bool = True
+    # Abre o pool, carrega os dados de referência e consulta as tabelas quentes no startup
+    aquecer: bool = True
+
+    @classmethod
+    def do_ambiente(cls) -> "Config":
+        carregar_env()
+        return cls(
+            smtp_host=os.getenv("SMTP_HOST"),
+            smtp_port=int(os.getenv("SMTP_PORT", "587")),
+            smtp_user=os.getenv("SMTP_USER"),
+            smtp_password=os.getenv("SMTP_PASSWORD"),
+            smtp_starttls=os.getenv("SMTP_STARTTLS", "1") == "1",
+            aquecer=os.getenv("AQUECER_STARTUP", "1") == "1",
+        )
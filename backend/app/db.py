@@ -1,18 +1,235 @@
 import os
-from sqlalchemy import create_engine
+import time
+import importlib.util
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.config import carregar_env
 
 # Carrega as variáveis de ambiente do .env
-load_dotenv()
+carregar_env()
 
 # Pega a variável DATABASE_URL do ambiente
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Cria o engine de conexão
-engine = create_engine(DATABASE_URL)
+
+
+class EstatisticasEspera:
+    """Tempo que as requisições esperam para obter uma conexão do pool."""
+
+    def __init__(self):
+        self.quantidade = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.ultima = 0.0
+
+    def registrar(self, segundos: float):
+        self.quantidade += 1
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.ultima = segundos
+
+    def como_dict(self) -> dict:
+        return {
+            "quantidade": self.quantidade,
+            "media_ms": round(self.total / self.quantidade * 1000, 3) if self.quantidade else 0.0,
+            "maximo_ms": round(self.maximo * 1000, 3),
+            "ultima_ms": round(self.ultima * 1000, 3),
+        }
+
+
+espera_pool = EstatisticasEspera()
+
+
+class _EsperaMedida:
+    # Cronometra a retirada de uma conexão do pool: a espera por uma conexão
+    # livre e, com o pool abaixo do tamanho, a abertura de uma nova. Os eventos
+    # do pool (checkout/connect) só disparam depois de a conexão ser entregue
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera_pool.registrar(time.perf_counter() - inicio)
+
+
+class PoolMedido(_EsperaMedida, QueuePool):
+    pass
+
+
+class PoolAssincronoMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    pass
+
+
+def _config_pool(url: str, poolclass=PoolMedido) -> dict:
+    # SQLite usa pools próprios (SingletonThreadPool/StaticPool) que não aceitam esses parâmetros
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+
+
+# Cria o engine de conexão (usado por scripts e pelo fallback síncrono)
+engine = create_engine(DATABASE_URL, **_config_pool(DATABASE_URL))
 
 # Cria uma sessão para interagir com o banco
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+
+def insert_com_conflito(modelo):
+    # INSERT do dialeto configurado, que aceita on_conflict_do_nothing/do_update
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(modelo)
+    return sqlite.insert(modelo)
+
+Base = declarative_base()
+
+# Drivers assíncronos por banco; sem o driver instalado (ou com DB_SYNC=1)
+# os routers continuam funcionando sobre a sessão síncrona acima.
+DRIVERS_ASYNC = {
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+}
+
+
+def _url_assincrona(url: str):
+    if os.getenv("DB_SYNC", "0") == "1":
+        return None
+
+    url = make_url(url)
+    driver = DRIVERS_ASYNC.get(url.get_backend_name())
+    if driver is None or importlib.util.find_spec(driver[1]) is None:
+        return None
+    return url.set(drivername=driver[0])
+
+
+async def _iterar(resultado):
+    for linha in resultado:
+        yield linha
+
+
+class SessaoSincrona:
+    """Expõe a interface usada de AsyncSession sobre uma Session síncrona.
+
+    Usada quando não há driver assíncrono (ex.: testes com SQLite puro); as
+    chamadas bloqueiam, mas os routers não precisam saber disso.
+    """
+
+    def __init__(self):
+        self.sync_session = SessionLocal()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def add(self, instancia):
+        self.sync_session.add(instancia)
+
+    def add_all(self, instancias):
+        self.sync_session.add_all(instancias)
+
+    async def execute(self, *args, **kwargs):
+        return self.sync_session.execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return self.sync_session.scalar(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return self.sync_session.scalars(*args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return self.sync_session.get(*args, **kwargs)
+
+    async def stream(self, *args, **kwargs):
+        return _iterar(self.sync_session.execute(*args, **kwargs))
+
+    async def stream_scalars(self, *args, **kwargs):
+        return _iterar(self.sync_session.scalars(*args, **kwargs))
+
+    async def delete(self, instancia):
+        self.sync_session.delete(instancia)
+
+    async def flush(self, *args, **kwargs):
+        self.sync_session.flush(*args, **kwargs)
+
+    async def refresh(self, *args, **kwargs):
+        self.sync_session.refresh(*args, **kwargs)
+
+    async def commit(self):
+        self.sync_session.commit()
+
+    async def rollback(self):
+        self.sync_session.rollback()
+
+    async def close(self):
+        self.sync_session.close()
+
+    async def connection(self):
+        return self.sync_session.connection()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync_session, *args, **kwargs)
+
+
+ASYNC_DATABASE_URL = _url_assincrona(DATABASE_URL)
+
+if ASYNC_DATABASE_URL is not None:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_config_pool(DATABASE_URL, PoolAssincronoMedido))
+    # expire_on_commit=False: atributos expirados exigiriam I/O implícito, que não existe em async
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+else:
+    async_engine = None
+    AsyncSessionLocal = SessaoSincrona
+
+
+
+
+async def get_db():
+    # A conexão só sai do pool na primeira consulta: acertos de cache não a usam
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def aquecer_pool():
+    """Abre as conexões do pool de uma vez e as devolve, para que as primeiras
+    requisições depois de um deploy não paguem o connect (e o TLS/auth do Postgres)."""
+    if async_engine is not None:
+        pool = async_engine.pool
+        conexoes = [await async_engine.connect() for _ in range(getattr(pool, "size", lambda: 1)())]
+        try:
+            for conexao in conexoes:
+                await conexao.execute(text("SELECT 1"))
+        finally:
+            for conexao in conexoes:
+                await conexao.close()
+    else:
+        with engine.connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+
+
+def estado_pool() -> dict:
+    pool = (async_engine or engine).pool
+    estado = {"tipo": type(pool).__name__}
+    for nome, metodo in (
+        ("tamanho", "size"),
+        ("em_uso", "checkedout"),
+        ("ociosas", "checkedin"),
+        ("overflow", "overflow"),
+    ):
+        if hasattr(pool, metodo):
+            estado[nome] = getattr(pool, metodo)()
+    estado["espera"] = espera_pool.como_dict()
+    return estado
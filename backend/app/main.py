@@ -1,27 +1,121 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from app.db import SessionLocal
-from app.api import cadastro, login, esqueceu_senha, ler_token, receitas, despesas, categoria, dashboard, estados
+from sqlalchemy import select
+from app.config import Config
+from app.db import SessionLocal, AsyncSessionLocal, engine, async_engine, aquecer_pool
+from app.models.login import Login
+from app.utils import security, metricas, cache_respostas, email, snapshot
+from app.utils.dados_referencia import cache_referencia
+from app.api import cadastro, login, esqueceu_senha, ler_token, receitas, despesas, categoria, dashboard, estados, health, importacao, exportacao
 import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rodar com: uvicorn --factory app.main:criar_app
+
+async def _aquecer_rotas(app: FastAPI):
+    # O FastAPI monta o estado das rotas (dependências, modelos de resposta) no
+    # primeiro roteamento; um caminho inexistente passa por todas elas. Vai
+    # direto ao router, sem middlewares, para não aparecer nas métricas
+    escopo = {
+        "type": "http", "method": "GET", "path": "/__aquecimento__", "root_path": "",
+        "query_string": b"", "headers": [],
+    }
+
+    async def receber():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensagem):
+        pass
+
+    await app.router(escopo, receber, enviar)
+
+
+async def aquecer(app: FastAPI):
+    """Deixa o worker pronto antes da primeira requisição.
+
+    Abre as conexões do pool, carrega estados/categorias, consulta as tabelas
+    quentes (snapshot do dashboard e login), o que compila o SQL no SQLAlchemy
+    e o planejamento no banco, e monta o estado das rotas.
+    """
+    await _aquecer_rotas(app)
+    await aquecer_pool()
+    await cache_referencia.carregar()
+    async with AsyncSessionLocal() as db:
+        await snapshot.aquecer(db)
+        await db.scalar(select(Login).filter_by(email=""))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inicio = time.perf_counter()
+    if app.state.config.aquecer:
+        try:
+            await aquecer(app)
+        except Exception as e:
+            # Banco ainda subindo (docker-compose não espera o Postgres): carrega no primeiro acesso
+            logger.warning("Aquecimento do startup incompleto: %s", e)
+    app.state.caixa_saida.iniciar()
+    logger.info("Worker pronto em %.1f ms", (time.perf_counter() - inicio) * 1000)
+    yield
+    await app.state.caixa_saida.encerrar()
+    security.encerrar_executor()
+
+
+async def fila_hash_cheia(request: Request, exc: security.FilaHashCheia):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, tente novamente em instantes"},
+        headers={"Retry-After": "1"},
+    )
+
 
-app = FastAPI()
-static_dir = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
-
-app.include_router(cadastro.router)
-app.include_router(login.router)
-app.include_router(esqueceu_senha.router)
-app.include_router(ler_token.router)
-app.include_router(receitas.router)
-app.include_router(despesas.router)
-app.include_router(categoria.router)
-app.include_router(dashboard.router)
-app.include_router(estados.router)
-
-@app.get("/hello")
 def read_hello():
     db = SessionLocal()
     try:
         return {"message": "Hello! Banco conectado!"}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def criar_app(config: Optional[Config] = None) -> FastAPI:
+    config = config or Config.do_ambiente()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.config = config
+    app.state.caixa_saida = email.CaixaSaida(
+        config.smtp_host, config.smtp_port, config.smtp_user, config.smtp_password, starttls=config.smtp_starttls
+    )
+
+    # O cache fica dentro das métricas, para que os acertos também sejam medidos
+    app.add_middleware(cache_respostas.MiddlewareCacheRespostas)
+    app.add_middleware(metricas.MiddlewareMetricas)
+
+    metricas.instrumentar_engine(engine)
+    if async_engine is not None:
+        metricas.instrumentar_engine(async_engine)
+
+    static_dir = os.path.join(os.path.dirname(__file__), "static")
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+
+    app.include_router(cadastro.router)
+    app.include_router(login.router)
+    app.include_router(esqueceu_senha.router)
+    app.include_router(ler_token.router)
+    app.include_router(receitas.router)
+    app.include_router(despesas.router)
+    app.include_router(categoria.router)
+    app.include_router(dashboard.router)
+    app.include_router(estados.router)
+    app.include_router(health.router)
+    app.include_router(importacao.router)
+    app.include_router(exportacao.router)
+
+    app.add_exception_handler(security.FilaHashCheia, fila_hash_cheia)
+    app.add_api_route("/hello", read_hello, methods=["GET"])
+    return app
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String
 from app.db import Base
 
 class DadosUsuarios(Base):
@@ -8,5 +8,6 @@ class DadosUsuarios(Base):
     id_login = Column(Integer, unique=True, index=True, nullable=False)
     nome = Column(String, nullable=False)
     sobrenome = Column(String, nullable=False)
-    data_nascimento = Column(Date)
+    # varchar em migrations/001_create_tables.sql
+    data_nascimento = Column(String)
     id_endereco = Column(Integer)
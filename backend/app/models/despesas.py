@@ -1,14 +1,26 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean
+from sqlalchemy import Column, Integer, String, Date, Float, Boolean, Index
 from app.db import Base
 
 class Despesas(Base):
     __tablename__ = "despesas"
 
     id = Column(Integer, primary_key=True, index=True)
-    id_login = Column(Integer, unique=True, index=True, nullable=False)
+    id_login = Column(Integer, nullable=False)
     descricao = Column(String, nullable=False)
     valor = Column(Float, nullable=False)
     data_vencimento = Column(Date, nullable=False)
     recorrencia = Column(Boolean, nullable=False)
     id_categoria = Column(Integer, nullable=False)
     fim_recorrencia = Column(Date, nullable=True)
+    # Regra da recorrência (ver app.utils.recorrencia); ignorada quando recorrencia é falso
+    frequencia = Column(String, nullable=False, default="mensal", server_default="mensal")
+    intervalo = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Espelham migrations/005_create_indices.sql
+    __table_args__ = (
+        Index("ix_despesas_login_vencimento", "id_login", "data_vencimento"),
+        Index(
+            "ix_despesas_login_fim_recorrente", "id_login", "fim_recorrencia",
+            postgresql_where=recorrencia, sqlite_where=recorrencia
+        ),
+    )
@@ -9,5 +9,5 @@ class Endereco(Base):
     id_estado = Column(Integer, nullable=False)
     bairro = Column(String, nullable=False)
     rua = Column(String, nullable=False)
-    numero = Column(Integer, nullable=True)
+    numero = Column(String, nullable=True)  # varchar na migration 001
     complemento = Column(String, nullable=False)
\ No newline at end of file
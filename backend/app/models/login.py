@@ -7,3 +7,5 @@ class Login(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     senha = Column(String, nullable=False)
+    # Incrementada a cada redefinição de senha; invalida os tokens emitidos antes
+    versao_senha = Column(Integer, nullable=False, default=0, server_default="0")
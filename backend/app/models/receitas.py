@@ -1,13 +1,25 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean
+from sqlalchemy import Column, Integer, String, Date, Float, Boolean, Index
 from app.db import Base
 
 class Receitas(Base):
     __tablename__ = "receitas"
 
     id = Column(Integer, primary_key=True, index=True)
-    id_login = Column(Integer, unique=True, index=True, nullable=False)
+    id_login = Column(Integer, nullable=False)
     descricao = Column(String, nullable=False)
     valor = Column(Float, nullable=False)
     data_recebimento = Column(Date, nullable=False)
     recorrencia = Column(Boolean, nullable=False)
     fim_recorrencia = Column(Date, nullable=True)
+    # Regra da recorrência (ver app.utils.recorrencia); ignorada quando recorrencia é falso
+    frequencia = Column(String, nullable=False, default="mensal", server_default="mensal")
+    intervalo = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Espelham migrations/005_create_indices.sql
+    __table_args__ = (
+        Index("ix_receitas_login_recebimento", "id_login", "data_recebimento"),
+        Index(
+            "ix_receitas_login_fim_recorrente", "id_login", "fim_recorrencia",
+            postgresql_where=recorrencia, sqlite_where=recorrencia
+        ),
+    )
@@ -23,3 +23,25 @@ class UsuarioCreate(BaseModel):
         if 'senha' in values and v != values['senha']:
             raise ValueError("As senhas não coincidem")
         return v
+
+
+class EnderecoResponse(BaseModel):
+    id: Optional[int] = None
+    rua: Optional[str] = None
+    numero: Optional[str] = None
+    bairro: Optional[str] = None
+    complemento: Optional[str] = None
+    cep: Optional[str] = None
+    id_estado: Optional[int] = None
+
+class UsuarioResponse(BaseModel):
+    id_login: int
+    nome: str
+    sobrenome: str
+    data_nascimento: Optional[str] = None
+    email: Optional[str] = None
+    endereco: EnderecoResponse
+
+class EnderecoAtualizadoResponse(BaseModel):
+    mensagem: str
+    endereco: EnderecoResponse
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Literal
+
+# Frequências aceitas em lançamentos recorrentes (ver app.utils.recorrencia)
+Frequencia = Literal["semanal", "mensal", "anual"]
+
+class MensagemResponse(BaseModel):
+    mensagem: str
+
+class TotalMesResponse(BaseModel):
+    id_login: int
+    mes: int
+    ano: int
+    total: float
+
+class ValorMesResponse(BaseModel):
+    mes: int
+    ano: int
+    valor: float
+
+class ContagemRecorrenciaResponse(BaseModel):
+    mes: int
+    ano: int
+    recorrentes: int
+    nao_recorrentes: int
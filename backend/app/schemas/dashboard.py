@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.comum import ValorMesResponse, ContagemRecorrenciaResponse
+
+class ContagemDiaResponse(BaseModel):
+    dia: int
+    quantidade: int
+
+class ContagemCategoriaResponse(BaseModel):
+    categoria: str
+    quantidade: int
+
+class ResumoDashboardResponse(BaseModel):
+    despesas_por_dia_vencimento: List[ContagemDiaResponse]
+    despesas_por_categoria: List[ContagemCategoriaResponse]
+    receitas_periodo: List[ValorMesResponse]
+    despesas_periodo: List[ValorMesResponse]
+    receitas_recorrencia: ContagemRecorrenciaResponse
+    despesas_recorrencia: ContagemRecorrenciaResponse
+
+class ProjecaoMesResponse(BaseModel):
+    mes: int
+    ano: int
+    receitas: float
+    despesas: float
+    saldo: float
+    saldo_acumulado: float
+
+class ProjecaoSaldoResponse(BaseModel):
+    saldo_inicial: float
+    meses: List[ProjecaoMesResponse]
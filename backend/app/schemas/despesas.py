@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date
+from app.schemas.comum import Frequencia
 
 class DespesasCreate(BaseModel):
     id_login: int
@@ -9,4 +10,36 @@ class DespesasCreate(BaseModel):
     data_vencimento: date
     recorrencia: bool
     id_categoria: int
-    fim_recorrencia: Optional[date] = None
\ No newline at end of file
+    fim_recorrencia: Optional[date] = None
+    frequencia: Frequencia = "mensal"
+    intervalo: int = Field(1, ge=1)
+
+class DespesaResponse(BaseModel):
+    id: int
+    descricao: str
+    valor: float
+    data_vencimento: date
+    recorrencia: bool
+    fim_recorrencia: Optional[date] = None
+    frequencia: Frequencia = "mensal"
+    intervalo: int = 1
+    id_categoria: int
+    # Só nos detalhes do mês: ocorrências da regra no mês e valor * ocorrências
+    ocorrencias: int = 1
+    total_no_mes: Optional[float] = None
+
+class PaginaDespesasResponse(BaseModel):
+    itens: List[DespesaResponse]
+    proximo_cursor: Optional[str] = None
+
+class DespesaInseridaResponse(BaseModel):
+    mensagem: str
+    despesa_id: int
+
+class DespesasLoteResponse(BaseModel):
+    mensagem: str
+    despesa_ids: List[int]
+
+class DespesaAlteradaResponse(BaseModel):
+    mensagem: str
+    id_despesa: int
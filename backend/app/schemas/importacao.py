@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class ErroImportacao(BaseModel):
+    linha: int
+    erro: str
+
+class JobImportacaoResponse(BaseModel):
+    job_id: str
+    id_login: int
+    formato: str
+    status: str
+    linhas_lidas: int
+    receitas: int
+    despesas: int
+    ignoradas: int
+    erros: List[ErroImportacao]
+    mensagem: Optional[str] = None
+    duracao_s: float
+    linhas_por_segundo: Optional[int] = None
@@ -2,4 +2,12 @@ from pydantic import BaseModel, EmailStr
 
 class LoginRequest(BaseModel):
     email: EmailStr
-    senha: str
\ No newline at end of file
+    senha: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
+
+class UsuarioAutenticadoResponse(BaseModel):
+    id: int
+    email: str
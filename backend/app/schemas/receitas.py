@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date
+from app.schemas.comum import Frequencia
 
 class ReceitaCreate(BaseModel):
     id_login: int
@@ -8,4 +9,35 @@ class ReceitaCreate(BaseModel):
     valor: float
     data_recebimento: date
     recorrencia: bool
-    fim_recorrencia: Optional[date] = None
\ No newline at end of file
+    fim_recorrencia: Optional[date] = None
+    frequencia: Frequencia = "mensal"
+    intervalo: int = Field(1, ge=1)
+
+class ReceitaResponse(BaseModel):
+    id: int
+    descricao: str
+    valor: float
+    data_recebimento: date
+    recorrencia: bool
+    fim_recorrencia: Optional[date] = None
+    frequencia: Frequencia = "mensal"
+    intervalo: int = 1
+    # Só nos detalhes do mês: ocorrências da regra no mês e valor * ocorrências
+    ocorrencias: int = 1
+    total_no_mes: Optional[float] = None
+
+class PaginaReceitasResponse(BaseModel):
+    itens: List[ReceitaResponse]
+    proximo_cursor: Optional[str] = None
+
+class ReceitaInseridaResponse(BaseModel):
+    mensagem: str
+    receita_id: int
+
+class ReceitasLoteResponse(BaseModel):
+    mensagem: str
+    receita_ids: List[int]
+
+class ReceitaAlteradaResponse(BaseModel):
+    mensagem: str
+    id_receita: int
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date
+from app.schemas.comum import Frequencia
 
 class DespesasUpdate(BaseModel):
     descricao: str
@@ -8,4 +9,7 @@ class DespesasUpdate(BaseModel):
     data_vencimento: date
     recorrencia: bool
     id_categoria: int
-    fim_recorrencia: Optional[date] = None
\ No newline at end of file
+    fim_recorrencia: Optional[date] = None
+    # Ausentes mantêm a regra atual
+    frequencia: Optional[Frequencia] = None
+    intervalo: Optional[int] = Field(None, ge=1)
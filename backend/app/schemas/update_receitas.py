@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date
+from app.schemas.comum import Frequencia
 
 class ReceitaUpdate(BaseModel):
     descricao: str
     valor: float
     data_recebimento: date
     recorrencia: bool
-    fim_recorrencia: Optional[date] = None
\ No newline at end of file
+    fim_recorrencia: Optional[date] = None
+    # Ausentes mantêm a regra atual
+    frequencia: Optional[Frequencia] = None
+    intervalo: Optional[int] = Field(None, ge=1)
@@ -0,0 +1,242 @@
+import os
+import time
+import logging
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+from app.utils import metricas
+
+logger = logging.getLogger(__name__)
+
+# Respostas das rotas de leitura por mês, guardadas já serializadas e indexadas
+# por caminho + parâmetros + versão dos dados do usuário. A versão muda no
+# commit de qualquer escrita do usuário (ver snapshot._apos_commit), então uma
+# entrada nunca é servida depois de uma escrita que a afete; o TTL limita o
+# tempo em memória e, com o armazenamento padrão (por worker), quanto uma
+# escrita feita em outro worker do uvicorn pode demorar a aparecer. O snapshot
+# do dashboard usa a mesma versão, para que os dois sejam invalidados juntos.
+CACHE_RESPOSTAS_TAMANHO = int(os.getenv("CACHE_RESPOSTAS_TAMANHO", "5000"))
+CACHE_RESPOSTAS_TTL = float(os.getenv("CACHE_RESPOSTAS_TTL", "60"))
+
+# "modulo:Classe" de um Armazenamento compartilhado entre workers; vazio usa a memória do worker
+CACHE_RESPOSTAS_ARMAZENAMENTO = os.getenv("CACHE_RESPOSTAS_ARMAZENAMENTO", "")
+
+# Rotas GET cujo resultado depende só dos parâmetros e dos lançamentos de id_login
+ROTAS_CACHEADAS = frozenset((
+    "/total-receitas",
+    "/total-despesas",
+    "/detalhes-receitas",
+    "/detalhes-despesas",
+    "/detalhes-receitas/pagina",
+    "/detalhes-despesas/pagina",
+    "/contagem-despesas-por-dia-vencimento",
+    "/contagem-despesas-por-categoria",
+    "/total-receitas-periodo",
+    "/total-despesas-periodo",
+    "/total-receitas-recorrencia",
+    "/total-despesas-recorrencia",
+    "/dashboard/resumo",
+    "/serie-receitas",
+    "/serie-despesas",
+    "/projecao-saldo",
+))
+
+
+class Armazenamento(ABC):
+    """Onde ficam as respostas e a versão de cada usuário.
+
+    Os métodos são síncronos: são chamados no loop de eventos e no after_commit
+    das escritas (que pode rodar em thread, como na importação de extratos).
+    Uma implementação compartilhada entre workers (ex.: Redis, com GET/SET EX
+    para as respostas e INCR para as versões) deve usar timeouts curtos; erros
+    dela só fazem a requisição ser respondida sem cache.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def guardar(self, chave: str, corpo: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    def versao(self, id_login: int) -> int:
+        ...
+
+    @abstractmethod
+    def incrementar(self, id_login: int):
+        ...
+
+    @abstractmethod
+    def limpar(self):
+        ...
+
+
+class ArmazenamentoMemoria(Armazenamento):
+    """LRU com TTL na memória do worker (padrão, e o usado nos testes)."""
+
+    def __init__(self, tamanho_max: int = CACHE_RESPOSTAS_TAMANHO):
+        self.tamanho_max = tamanho_max
+        self._entradas = OrderedDict()
+        self._versoes = {}
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+
+        corpo, expira_em = entrada
+        if expira_em <= time.monotonic():
+            self._entradas.pop(chave, None)
+            return None
+
+        self._entradas.move_to_end(chave)
+        return corpo
+
+    def guardar(self, chave: str, corpo: bytes, ttl: float):
+        self._entradas[chave] = (corpo, time.monotonic() + ttl)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.tamanho_max:
+            self._entradas.popitem(last=False)
+
+    def versao(self, id_login: int) -> int:
+        return self._versoes.get(id_login, 0)
+
+    def incrementar(self, id_login: int):
+        # Entradas da versão anterior não são mais lidas e saem pelo LRU/TTL
+        self._versoes[id_login] = self.versao(id_login) + 1
+
+    def limpar(self):
+        self._entradas.clear()
+
+
+class CacheRespostas:
+    def __init__(self, armazenamento: Armazenamento, ttl: float = CACHE_RESPOSTAS_TTL, ativo: bool = True):
+        self.armazenamento = armazenamento
+        self.ttl = ttl
+        self.ativo = ativo
+
+    def versao(self, id_login: int) -> Optional[int]:
+        """Versão dos dados do usuário; também é a do snapshot (ver snapshot.CacheSnapshots)."""
+        try:
+            return self.armazenamento.versao(id_login)
+        except Exception:
+            logger.exception("Falha ao ler a versão do cache de respostas")
+            return None
+
+    def chave(self, caminho: str, parametros: list, id_login: int) -> Optional[str]:
+        # A versão é lida antes de gerar a resposta: se um commit acontecer no
+        # meio, a entrada já nasce com a versão antiga e nunca é servida
+        versao = self.versao(id_login)
+        if versao is None:
+            return None
+        return f"{id_login}:{versao}:{caminho}?{urlencode(sorted(parametros))}"
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        try:
+            return self.armazenamento.obter(chave)
+        except Exception:
+            logger.exception("Falha ao ler o cache de respostas")
+            return None
+
+    def guardar(self, chave: str, corpo: bytes):
+        try:
+            self.armazenamento.guardar(chave, corpo, self.ttl)
+        except Exception:
+            logger.exception("Falha ao gravar no cache de respostas")
+
+    def incrementar(self, ids_login):
+        for id_login in ids_login:
+            try:
+                self.armazenamento.incrementar(id_login)
+            except Exception:
+                logger.exception("Falha ao incrementar a versão do usuário %s no cache de respostas", id_login)
+
+    def limpar(self):
+        try:
+            self.armazenamento.limpar()
+        except Exception:
+            logger.exception("Falha ao limpar o cache de respostas")
+
+
+def _criar_armazenamento() -> Armazenamento:
+    if CACHE_RESPOSTAS_ARMAZENAMENTO:
+        modulo, _, nome = CACHE_RESPOSTAS_ARMAZENAMENTO.partition(":")
+        return getattr(importlib.import_module(modulo), nome)()
+    return ArmazenamentoMemoria()
+
+
+cache_respostas = CacheRespostas(_criar_armazenamento(), ativo=CACHE_RESPOSTAS_TAMANHO > 0)
+
+
+class MiddlewareCacheRespostas:
+    """Middleware ASGI que responde as ROTAS_CACHEADAS a partir do cache.
+
+    Só GETs com id_login na query e respostas 200 em JSON entram no cache. Um
+    acerto não passa pelo roteamento: o template da rota, guardado no primeiro
+    acesso, é posto no scope para as métricas continuarem agrupando por rota.
+    """
+
+    def __init__(self, app, cache: CacheRespostas = cache_respostas, caminhos=ROTAS_CACHEADAS):
+        self.app = app
+        self.cache = cache
+        self.caminhos = caminhos
+        self._rotas = {}
+
+    async def __call__(self, scope, receive, send):
+        caminho = scope.get("path")
+        if (
+            scope["type"] != "http" or scope["method"] != "GET"
+            or caminho not in self.caminhos or not self.cache.ativo
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        parametros = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        try:
+            id_login = int(dict(parametros)["id_login"])
+        except (KeyError, ValueError):
+            # Deixa a validação do FastAPI responder o 422
+            await self.app(scope, receive, send)
+            return
+
+        chave = self.cache.chave(caminho, parametros, id_login)
+        corpo = self.cache.obter(chave) if chave is not None else None
+        if corpo is not None:
+            metricas.cache_respostas.inc(caminho, "acerto")
+            if caminho in self._rotas:
+                scope["route"] = self._rotas[caminho]
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(corpo)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": corpo})
+            return
+
+        metricas.cache_respostas.inc(caminho, "falta")
+        status, e_json, partes = None, False, []
+
+        async def enviar(mensagem):
+            nonlocal status, e_json
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                e_json = any(
+                    nome.lower() == b"content-type" and valor.startswith(b"application/json")
+                    for nome, valor in mensagem.get("headers", ())
+                )
+            elif mensagem["type"] == "http.response.body":
+                partes.append(mensagem.get("body", b""))
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+        if "route" in scope:
+            self._rotas[caminho] = scope["route"]
+        if status == 200 and e_json and chave is not None:
+            self.cache.guardar(chave, b"".join(partes))
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# Entradas vivem até o exp do token, limitadas a TOKEN_CACHE_TTL segundos para que
+# invalidações feitas em outro worker do uvicorn também passem a valer logo
+TOKEN_CACHE_TAMANHO = int(os.getenv("TOKEN_CACHE_TAMANHO", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    id: int
+    email: str
+
+
+class CacheTokens:
+    """LRU de tokens já validados, indexado pelo hash do token."""
+
+    def __init__(self, tamanho_max: int = TOKEN_CACHE_TAMANHO, ttl: float = TOKEN_CACHE_TTL):
+        self.tamanho_max = tamanho_max
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._por_email = {}
+
+    @staticmethod
+    def chave(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def obter(self, token: str) -> Optional[UsuarioAutenticado]:
+        chave = self.chave(token)
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+
+        usuario, expira_em = entrada
+        if expira_em <= time.time():
+            self._remover(chave)
+            return None
+
+        self._entradas.move_to_end(chave)
+        return usuario
+
+    def guardar(self, token: str, usuario: UsuarioAutenticado, exp: float):
+        chave = self.chave(token)
+        self._remover(chave)
+        self._entradas[chave] = (usuario, min(exp, time.time() + self.ttl))
+        self._por_email.setdefault(usuario.email, set()).add(chave)
+
+        while len(self._entradas) > self.tamanho_max:
+            self._remover(next(iter(self._entradas)))
+
+    def invalidar_email(self, email: str):
+        for chave in list(self._por_email.get(email, ())):
+            self._remover(chave)
+
+    def limpar(self):
+        self._entradas.clear()
+        self._por_email.clear()
+
+    def _remover(self, chave: str):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        email = entrada[0].email
+        chaves = self._por_email.get(email)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_email[email]
+
+
+cache_tokens = CacheTokens()
@@ -0,0 +1,96 @@
+import os
+import asyncio
+import hashlib
+import json
+from fastapi import Request, Response
+from dataclasses import dataclass
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db import AsyncSessionLocal
+from app.models.categoria import Categoria
+from app.models.estados import Estados
+
+# Tempo que clientes/proxies podem reutilizar a resposta antes de revalidar com If-None-Match
+REFERENCIA_MAX_AGE = int(os.getenv("REFERENCIA_MAX_AGE", "3600"))
+
+
+@dataclass(frozen=True)
+class Tabela:
+    linhas: list
+    corpo: bytes
+    etag: str
+
+
+def _montar_tabela(linhas: list) -> Tabela:
+    corpo = json.dumps(linhas, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"'
+    return Tabela(linhas, corpo, etag)
+
+
+def _carregar(db: Session) -> dict:
+    estados = db.scalars(select(Estados).order_by(Estados.id)).all()
+    categorias = db.scalars(select(Categoria).order_by(Categoria.id)).all()
+    return {
+        "estados": _montar_tabela([{"id": e.id, "nome": e.nome, "sigla": e.sigla} for e in estados]),
+        "categorias": _montar_tabela([{"id": c.id, "nome": c.nome} for c in categorias]),
+    }
+
+
+class CacheReferencia:
+    """Tabelas estáticas (estados, categorias) mantidas em memória no worker.
+
+    Carregadas no startup (ou no primeiro acesso) e servidas já serializadas,
+    com ETag calculado sobre o corpo. `invalidar` descarta o conteúdo e a
+    próxima leitura recarrega do banco.
+    """
+
+    def __init__(self):
+        self._tabelas = None
+        self._nomes_categorias = {}
+        self._lock = asyncio.Lock()
+
+    async def carregar(self):
+        async with AsyncSessionLocal() as db:
+            tabelas = await db.run_sync(_carregar)
+        self._tabelas = tabelas
+        self._nomes_categorias = {c["id"]: c["nome"] for c in tabelas["categorias"].linhas}
+
+    def invalidar(self):
+        self._tabelas = None
+        self._nomes_categorias = {}
+
+    async def _garantir(self):
+        # Requisições simultâneas após invalidar aguardam uma única recarga
+        if self._tabelas is None:
+            async with self._lock:
+                if self._tabelas is None:
+                    await self.carregar()
+
+    async def _obter(self, nome: str) -> Tabela:
+        await self._garantir()
+        return self._tabelas[nome]
+
+    async def estados(self) -> Tabela:
+        return await self._obter("estados")
+
+    async def categorias(self) -> Tabela:
+        return await self._obter("categorias")
+
+    async def nomes_categorias(self) -> dict:
+        # {id_categoria: nome}, usado pelas contagens do dashboard
+        await self._garantir()
+        return self._nomes_categorias
+
+
+cache_referencia = CacheReferencia()
+
+
+def responder(request: Request, tabela: Tabela) -> Response:
+    headers = {
+        "ETag": tabela.etag,
+        "Cache-Control": f"public, max-age={REFERENCIA_MAX_AGE}",
+    }
+    etags_cliente = [e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")]
+    if tabela.etag in etags_cliente or "*" in etags_cliente:
+        return Response(status_code=304, headers=headers)
+    return Response(content=tabela.corpo, media_type="application/json", headers=headers)
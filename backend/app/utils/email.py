@@ -1,30 +1,160 @@
+import asyncio
+import logging
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email_validator import validate_email, EmailNotValidError
 from typing import Optional
 
-def enviar_email(destinatario: str, assunto: str, corpo: str, smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str):
-    try:
-        validate_email(destinatario)
+logger = logging.getLogger(__name__)
 
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
 
-        server.login(smtp_user, smtp_password)
+def montar_mensagem(remetente: str, destinatario: str, assunto: str, corpo: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = remetente
+    msg['To'] = destinatario
+    msg['Subject'] = assunto
+    msg.attach(MIMEText(corpo, 'plain'))
+    return msg
 
-        msg = MIMEMultipart()
-        msg['From'] = smtp_user
-        msg['To'] = destinatario
-        msg['Subject'] = assunto
 
-        msg.attach(MIMEText(corpo, 'plain'))
+class CaixaSaida:
+    """Fila de e-mails enviada em segundo plano por uma única conexão SMTP.
 
-        server.sendmail(smtp_user, destinatario, msg.as_string())
-        server.quit()
+    Os endpoints só chamam `enfileirar`; o worker iniciado em `iniciar` agrupa
+    as mensagens em lotes, reaproveita a conexão autenticada entre lotes e
+    refaz a conexão com backoff exponencial quando o envio falha.
+    """
 
-        print(f"E-mail enviado para {destinatario}")
-    except EmailNotValidError as e:
-        print(f"Erro na validação do e-mail: {e}")
-    except Exception as e:
-        print(f"Erro ao enviar o e-mail: {e}")
\ No newline at end of file
+    def __init__(
+        self,
+        smtp_host: str,
+        smtp_port: int,
+        smtp_user: Optional[str],
+        smtp_password: Optional[str],
+        starttls: bool = True,
+        tamanho_lote: int = 20,
+        max_tentativas: int = 5,
+        backoff_inicial: float = 1.0,
+        ocioso_max: float = 60.0,
+        tamanho_fila: int = 1000,
+    ):
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.smtp_user = smtp_user
+        self.smtp_password = smtp_password
+        self.starttls = starttls
+        self.tamanho_lote = tamanho_lote
+        self.max_tentativas = max_tentativas
+        self.backoff_inicial = backoff_inicial
+        self.ocioso_max = ocioso_max
+
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self._smtp = None
+        self._ultimo_uso = 0.0
+        self._tarefa = None
+
+    def enfileirar(self, destinatario: str, assunto: str, corpo: str) -> bool:
+        try:
+            validate_email(destinatario, check_deliverability=False)
+        except EmailNotValidError as e:
+            logger.warning("E-mail inválido não enfileirado (%s): %s", destinatario, e)
+            return False
+
+        try:
+            self.fila.put_nowait((destinatario, assunto, corpo))
+        except asyncio.QueueFull:
+            logger.error("Caixa de saída cheia; e-mail para %s descartado", destinatario)
+            return False
+        return True
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._trabalhar())
+
+    async def encerrar(self, prazo: float = 5.0):
+        # Tenta esvaziar a fila antes de parar o worker
+        if self._tarefa is not None:
+            try:
+                await asyncio.wait_for(self.fila.join(), timeout=prazo)
+            except asyncio.TimeoutError:
+                logger.warning("Encerrando com %d e-mail(s) na fila", self.fila.qsize())
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await asyncio.to_thread(self._desconectar)
+
+    async def _trabalhar(self):
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < self.tamanho_lote and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+
+            try:
+                await self._enviar_lote(lote)
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+
+    async def _enviar_lote(self, lote):
+        pendentes = list(lote)
+        for tentativa in range(self.max_tentativas):
+            try:
+                # smtplib é bloqueante: roda em thread para não travar o event loop
+                await asyncio.to_thread(self._enviar_sync, pendentes)
+                return
+            except Exception as e:
+                await asyncio.to_thread(self._desconectar)
+                logger.warning(
+                    "Falha ao enviar %d e-mail(s) (tentativa %d/%d): %s",
+                    len(pendentes), tentativa + 1, self.max_tentativas, e,
+                )
+                if tentativa + 1 < self.max_tentativas:
+                    await asyncio.sleep(self.backoff_inicial * (2 ** tentativa))
+
+        logger.error("Descartando %d e-mail(s) após %d tentativas", len(pendentes), self.max_tentativas)
+
+    def _conectar(self):
+        smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.smtp_user:
+            smtp.login(self.smtp_user, self.smtp_password)
+        return smtp
+
+    def _conexao(self):
+        # Conexões ociosas por muito tempo costumam ser derrubadas pelo servidor
+        if self._smtp is not None and time.monotonic() - self._ultimo_uso > self.ocioso_max:
+            try:
+                self._smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self._desconectar()
+
+        if self._smtp is None:
+            self._smtp = self._conectar()
+        return self._smtp
+
+    def _desconectar(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
+
+    def _enviar_sync(self, pendentes: list):
+        smtp = self._conexao()
+        remetente = self.smtp_user or ""
+        # Remove cada mensagem da lista ao enviar, assim a nova tentativa só reenvia o que faltou
+        while pendentes:
+            destinatario, assunto, corpo = pendentes[0]
+            msg = montar_mensagem(remetente, destinatario, assunto, corpo)
+            smtp.sendmail(remetente, destinatario, msg.as_string())
+            pendentes.pop(0)
+            self._ultimo_uso = time.monotonic()
+            logger.info("E-mail enviado para %s", destinatario)
@@ -0,0 +1,132 @@
+import io
+import os
+import csv
+import importlib.util
+from datetime import date
+from sqlalchemy import select, literal, null
+from app.db import AsyncSessionLocal
+from app.models.despesas import Despesas
+from app.models.receitas import Receitas
+from app.utils import recorrencia
+from app.utils.dados_referencia import cache_referencia
+
+# Ocorrências por bloco enviado (uma escrita do CSV / um row group do Parquet)
+EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "5000"))
+
+# Linhas buscadas por ida ao banco
+EXPORTACAO_YIELD_PER = int(os.getenv("EXPORTACAO_YIELD_PER", "1000"))
+
+PARQUET_DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+COLUNAS = ("tipo", "id", "descricao", "valor", "data", "recorrencia", "id_categoria", "categoria")
+
+
+def _consulta(modelo, tipo: str, id_login: int, inicio: date, fim: date):
+    data = recorrencia.coluna_data(modelo)
+    id_categoria = modelo.id_categoria if modelo is Despesas else null()
+    return (
+        select(
+            literal(tipo), modelo.id, modelo.descricao, modelo.valor, data,
+            modelo.recorrencia, modelo.fim_recorrencia, modelo.frequencia, modelo.intervalo, id_categoria,
+        )
+        .where(
+            modelo.id_login == id_login,
+            recorrencia.ativo_entre(modelo, inicio.replace(day=1), fim.replace(day=1)),
+        )
+        .order_by(data, modelo.id)
+    )
+
+
+async def ocorrencias(id_login: int, inicio: date, fim: date):
+    """Produz uma tupla (COLUNAS) por ocorrência entre inicio e fim.
+
+    Receitas primeiro, depois despesas; dentro de cada tabela na ordem
+    (data, id) do lançamento, com as ocorrências de um recorrente em sequência.
+    """
+    nomes_categorias = await cache_referencia.nomes_categorias()
+    async with AsyncSessionLocal() as db:
+        for modelo, tipo in ((Receitas, "receita"), (Despesas, "despesa")):
+            consulta = _consulta(modelo, tipo, id_login, inicio, fim)
+            linhas = await db.stream(consulta.execution_options(yield_per=EXPORTACAO_YIELD_PER))
+            async for (
+                tipo_linha, id, descricao, valor, data, recorrente, fim_recorrencia, frequencia, intervalo, id_categoria
+            ) in linhas:
+                categoria = nomes_categorias.get(id_categoria, "Outros") if id_categoria is not None else None
+                regra = recorrencia.Regra.da_linha(data, recorrente, fim_recorrencia, frequencia, intervalo)
+                for ocorrencia in regra.ocorrencias(inicio, fim):
+                    yield (tipo_linha, id, descricao, valor, ocorrencia, recorrente, id_categoria, categoria)
+
+
+async def _em_blocos(linhas):
+    bloco = []
+    async for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= EXPORTACAO_LOTE:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+async def csv_stream(id_login: int, inicio: date, fim: date):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS)
+    async for bloco in _em_blocos(ocorrencias(id_login, inicio, fim)):
+        escritor.writerows(bloco)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Só o cabeçalho: nenhum lançamento no período
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Saida(io.RawIOBase):
+    # Arquivo só de escrita que acumula os bytes até serem enviados
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self.partes)
+        self.partes = []
+        return dados
+
+
+async def parquet_stream(id_login: int, inicio: date, fim: date):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ("tipo", pa.string()),
+        ("id", pa.int64()),
+        ("descricao", pa.string()),
+        ("valor", pa.float64()),
+        ("data", pa.date32()),
+        ("recorrencia", pa.bool_()),
+        ("id_categoria", pa.int32()),
+        ("categoria", pa.string()),
+    ])
+    saida = _Saida()
+    # Cada bloco vira um row group; o rodapé com os metadados sai no close()
+    escritor = pq.ParquetWriter(saida, esquema, compression="snappy")
+    async for bloco in _em_blocos(ocorrencias(id_login, inicio, fim)):
+        colunas = list(zip(*bloco))
+        escritor.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)], schema=esquema
+        ))
+        yield saida.esvaziar()
+    escritor.close()
+    yield saida.esvaziar()
@@ -0,0 +1,198 @@
+import csv
+import html
+import re
+import unicodedata
+from datetime import date
+from typing import Iterator, NamedTuple, Optional
+
+# Leitores de extrato bancário. Ambos consomem o arquivo aos poucos e produzem
+# um Lancamento por linha/transação; valores negativos são despesas.
+
+
+class Lancamento(NamedTuple):
+    linha: int
+    data: date
+    descricao: str
+    valor: float
+    categoria: Optional[str]
+
+
+class ErroExtrato(ValueError):
+    """Arquivo que não pode ser lido (ex.: cabeçalho CSV sem as colunas obrigatórias)."""
+
+
+class ErroLinha(ValueError):
+    """Linha ou transação inválida; a importação segue com as demais."""
+
+    def __init__(self, linha: int, mensagem: str):
+        super().__init__(mensagem)
+        self.linha = linha
+
+
+def normalizar(texto: str) -> str:
+    # Minúsculas e sem acentos, para comparar nomes de colunas e categorias
+    texto = unicodedata.normalize("NFKD", texto.strip().lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+_DIGITOS = re.compile(r"[0-9]*")
+_MILHARES = {",": re.compile(r"[0-9]{1,3}(,[0-9]{3})*"), ".": re.compile(r"[0-9]{1,3}(\.[0-9]{3})*")}
+
+
+def converter_valor(texto: str, milhares: bool = True) -> float:
+    """Converte "1.234,56", "1,234.56", "1234.5" ou "-10" em float.
+
+    O último separador presente é o decimal; o outro só pode agrupar milhares.
+    Um separador repetido ("1.234.567") agrupa milhares, e um único separador
+    seguido de três dígitos ("1,234") é ambíguo: ValueError. Com
+    `milhares=False` (OFX) o valor não tem agrupamento e o separador é decimal.
+    """
+    limpo = texto.replace("R$", "").replace(" ", "").strip()
+    sinal = ""
+    if limpo[:1] in ("-", "+"):
+        sinal, limpo = limpo[0], limpo[1:]
+
+    inteiro, fracao = limpo, ""
+    separadores = [c for c in limpo if c in ",."]
+    if separadores:
+        decimal = separadores[-1]
+        if milhares and len(separadores) > 1 and len(set(separadores)) == 1:
+            decimal = None
+        elif milhares and len(separadores) == 1 and len(limpo) - limpo.index(decimal) == 4:
+            raise ValueError(f"valor ambíguo, separador de milhar ou decimal? '{texto.strip()}'")
+        if decimal:
+            inteiro, _, fracao = limpo.rpartition(decimal)
+
+        agrupamento = {c for c in inteiro if c in ",."}
+        if agrupamento:
+            milhar = agrupamento.pop()
+            if not milhares or agrupamento or not _MILHARES[milhar].fullmatch(inteiro):
+                raise ValueError(f"valor inválido: '{texto.strip()}'")
+            inteiro = inteiro.replace(milhar, "")
+
+    if not (inteiro or fracao) or not _DIGITOS.fullmatch(inteiro) or not _DIGITOS.fullmatch(fracao):
+        raise ValueError(f"valor inválido: '{texto.strip()}'")
+    return float(f"{sinal}{inteiro or 0}.{fracao or 0}")
+
+
+def converter_data(texto: str) -> date:
+    texto = texto.strip()
+    if "/" in texto:
+        dia, mes, ano = texto.split("/")
+        ano = int(ano)
+        return date(ano + 2000 if ano < 100 else ano, int(mes), int(dia))
+    if len(texto) >= 8 and texto[:8].isdigit():
+        # OFX: AAAAMMDD[HHMMSS[.XXX][fuso]]
+        return date(int(texto[:4]), int(texto[4:6]), int(texto[6:8]))
+    return date.fromisoformat(texto[:10])
+
+
+COLUNAS_CSV = {
+    "data": {"data", "date", "dt", "data lancamento", "data do lancamento"},
+    "descricao": {"descricao", "historico", "description", "memo", "lancamento"},
+    "valor": {"valor", "value", "amount", "quantia", "valor (r$)"},
+    "categoria": {"categoria", "category"},
+}
+
+
+def _indices_colunas(cabecalho: list) -> dict:
+    normalizado = [normalizar(c) for c in cabecalho]
+    indices = {}
+    for campo, nomes in COLUNAS_CSV.items():
+        for i, nome in enumerate(normalizado):
+            if nome in nomes:
+                indices[campo] = i
+                break
+
+    faltando = [c for c in ("data", "descricao", "valor") if c not in indices]
+    if faltando:
+        raise ErroExtrato(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+    return indices
+
+
+def ler_csv(arquivo) -> Iterator:
+    """Lê um CSV com cabeçalho (data, descricao, valor e, opcionalmente, categoria).
+
+    Aceita `,` ou `;` como separador; o separador é detectado no cabeçalho.
+    Produz Lancamento ou ErroLinha para cada linha de dados.
+    """
+    primeira = arquivo.readline()
+    if not primeira:
+        raise ErroExtrato("Arquivo vazio")
+    separador = ";" if primeira.count(";") > primeira.count(",") else ","
+    indices = _indices_colunas(next(csv.reader([primeira], delimiter=separador)))
+    i_data, i_descricao, i_valor = indices["data"], indices["descricao"], indices["valor"]
+    i_categoria = indices.get("categoria")
+
+    for numero, campos in enumerate(csv.reader(arquivo, delimiter=separador), start=2):
+        if not campos or not any(campos):
+            continue
+        try:
+            categoria = None
+            if i_categoria is not None and i_categoria < len(campos):
+                categoria = campos[i_categoria].strip() or None
+            yield Lancamento(
+                numero,
+                converter_data(campos[i_data]),
+                campos[i_descricao].strip(),
+                converter_valor(campos[i_valor]),
+                categoria,
+            )
+        except (ValueError, IndexError) as e:
+            yield ErroLinha(numero, f"Linha inválida: {e}")
+
+
+_TAG_OFX = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _tags_ofx(arquivo, tamanho_bloco: int = 65536):
+    # Lê em blocos; o trecho a partir do último "<" volta para o próximo bloco,
+    # assim nenhuma tag é cortada ao meio
+    resto = ""
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            break
+        texto = resto + bloco
+        corte = texto.rfind("<")
+        if corte <= 0:
+            resto = texto
+            continue
+        texto, resto = texto[:corte], texto[corte:]
+        for m in _TAG_OFX.finditer(texto):
+            yield m.group(1) == "/", m.group(2).upper(), m.group(3).strip()
+    for m in _TAG_OFX.finditer(resto):
+        yield m.group(1) == "/", m.group(2).upper(), m.group(3).strip()
+
+
+def ler_ofx(arquivo) -> Iterator:
+    """Lê as transações (<STMTTRN>) de um OFX 1.x (SGML) ou 2.x (XML).
+
+    A descrição vem de MEMO ou, na falta, de NAME. Produz Lancamento ou ErroLinha;
+    `linha` é a posição da transação no arquivo.
+    """
+    atual = None
+    numero = 0
+    for fechamento, tag, valor in _tags_ofx(arquivo):
+        if tag == "STMTTRN":
+            if fechamento and atual is not None:
+                numero += 1
+                yield _transacao_ofx(numero, atual)
+                atual = None
+            elif not fechamento:
+                atual = {}
+        elif atual is not None and not fechamento and valor:
+            atual[tag] = valor
+
+
+def _transacao_ofx(numero: int, campos: dict):
+    try:
+        descricao = html.unescape(campos.get("MEMO") or campos.get("NAME") or "")
+        # O OFX não agrupa milhares: o único separador de TRNAMT é o decimal
+        valor = converter_valor(campos["TRNAMT"], milhares=False)
+        return Lancamento(numero, converter_data(campos["DTPOSTED"]), descricao, valor, None)
+    except (KeyError, ValueError) as e:
+        return ErroLinha(numero, f"Transação inválida: {e}")
+
+
+LEITORES = {"csv": ler_csv, "ofx": ler_ofx}
@@ -0,0 +1,231 @@
+import os
+import io
+import csv
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.models.categoria import Categoria
+from app.models.despesas import Despesas
+from app.models.receitas import Receitas
+from app.utils import extrato
+from app.utils.snapshot import marcar_alterados
+
+logger = logging.getLogger(__name__)
+
+# Linhas gravadas por COPY/executemany
+IMPORTACAO_LOTE = int(os.getenv("IMPORTACAO_LOTE", "5000"))
+
+# Tamanho máximo do arquivo enviado (bytes)
+IMPORTACAO_TAMANHO_MAX = int(os.getenv("IMPORTACAO_TAMANHO_MAX", str(50 * 1024 * 1024)))
+
+# Categoria usada quando nada casa; precisa existir na tabela (migrations/007)
+CATEGORIA_PADRAO = "Outros"
+
+MAX_ERROS_REPORTADOS = 50
+MAX_JOBS = 200
+
+
+@dataclass
+class JobImportacao:
+    id: str
+    id_login: int
+    formato: str
+    status: str = "pendente"
+    linhas_lidas: int = 0
+    receitas: int = 0
+    despesas: int = 0
+    ignoradas: int = 0
+    erros: list = field(default_factory=list)
+    mensagem: Optional[str] = None
+    criado_em: float = field(default_factory=time.time)
+    concluido_em: Optional[float] = None
+
+    def registrar_erro(self, linha: int, mensagem: str):
+        self.ignoradas += 1
+        if len(self.erros) < MAX_ERROS_REPORTADOS:
+            self.erros.append({"linha": linha, "erro": mensagem})
+
+    def como_dict(self) -> dict:
+        fim = self.concluido_em or time.time()
+        duracao = fim - self.criado_em
+        return {
+            "job_id": self.id,
+            "id_login": self.id_login,
+            "formato": self.formato,
+            "status": self.status,
+            "linhas_lidas": self.linhas_lidas,
+            "receitas": self.receitas,
+            "despesas": self.despesas,
+            "ignoradas": self.ignoradas,
+            "erros": self.erros,
+            "mensagem": self.mensagem,
+            "duracao_s": round(duracao, 3),
+            "linhas_por_segundo": round(self.linhas_lidas / duracao) if duracao > 0 else None,
+        }
+
+
+# Jobs ficam em memória no worker que recebeu o upload
+_jobs = OrderedDict()
+_tarefas = set()
+
+
+def criar_job(id_login: int, formato: str) -> JobImportacao:
+    job = JobImportacao(id=uuid.uuid4().hex, id_login=id_login, formato=formato)
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS:
+        _jobs.popitem(last=False)
+    return job
+
+
+def obter_job(job_id: str) -> Optional[JobImportacao]:
+    return _jobs.get(job_id)
+
+
+class CasadorCategorias:
+    """Escolhe o id_categoria de cada despesa importada.
+
+    Usa a coluna de categoria do extrato quando houver; senão procura o nome de
+    alguma categoria dentro da descrição; senão cai em CATEGORIA_PADRAO.
+    """
+
+    def __init__(self, categorias):
+        self.por_nome = {extrato.normalizar(nome): id for id, nome in categorias}
+        # Nomes mais longos primeiro: "cartao de credito" antes de "credito"
+        self.nomes = sorted(self.por_nome, key=len, reverse=True)
+        self.padrao = self.por_nome.get(extrato.normalizar(CATEGORIA_PADRAO))
+        if self.padrao is None:
+            raise extrato.ErroExtrato(f"Categoria '{CATEGORIA_PADRAO}' não cadastrada")
+        self._cache = {}
+
+    def __call__(self, descricao: str, categoria: Optional[str]) -> int:
+        if categoria:
+            id_categoria = self.por_nome.get(extrato.normalizar(categoria))
+            if id_categoria is not None:
+                return id_categoria
+
+        chave = extrato.normalizar(descricao)
+        id_categoria = self._cache.get(chave)
+        if id_categoria is None:
+            id_categoria = next((self.por_nome[n] for n in self.nomes if n in chave), self.padrao)
+            if len(self._cache) < 100_000:
+                self._cache[chave] = id_categoria
+        return id_categoria
+
+
+def _copy(db: Session, modelo, colunas: tuple, linhas: list) -> bool:
+    # COPY ... FROM STDIN pelo psycopg2; devolve False se o driver não suportar
+    conexao = db.connection().connection.dbapi_connection
+    cursor = conexao.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        return False
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        escritor.writerow(["" if linha[c] is None else linha[c] for c in colunas])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {modelo.__tablename__} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+    return True
+
+
+def _gravar(db: Session, modelo, linhas: list):
+    if not linhas:
+        return
+    colunas = tuple(linhas[0])
+    if db.get_bind().dialect.name == "postgresql" and _copy(db, modelo, colunas, linhas):
+        return
+    db.execute(insert(modelo), linhas)
+
+
+def importar(job: JobImportacao, caminho: str, encoding: str = "utf-8"):
+    """Lê o arquivo em `caminho` e grava tudo em uma única transação.
+
+    Roda em thread (parse e COPY são bloqueantes). Linhas inválidas são
+    contadas e reportadas no job; qualquer outro erro desfaz a importação.
+    """
+    job.status = "processando"
+    try:
+        with SessionLocal() as db, open(caminho, encoding=encoding, newline="") as arquivo:
+            categorias = db.execute(select(Categoria.id, Categoria.nome)).all()
+            casar_categoria = CasadorCategorias(categorias)
+
+            receitas, despesas = [], []
+            for item in extrato.LEITORES[job.formato](arquivo):
+                job.linhas_lidas += 1
+                if isinstance(item, extrato.ErroLinha):
+                    job.registrar_erro(item.linha, str(item))
+                    continue
+                if item.valor == 0:
+                    job.registrar_erro(item.linha, "Valor zero")
+                    continue
+
+                descricao = item.descricao or "Importado do extrato"
+                if item.valor > 0:
+                    receitas.append({
+                        "id_login": job.id_login,
+                        "descricao": descricao,
+                        "valor": item.valor,
+                        "data_recebimento": item.data,
+                        "recorrencia": False,
+                    })
+                else:
+                    despesas.append({
+                        "id_login": job.id_login,
+                        "descricao": descricao,
+                        "valor": -item.valor,
+                        "data_vencimento": item.data,
+                        "recorrencia": False,
+                        "id_categoria": casar_categoria(descricao, item.categoria),
+                    })
+
+                if len(receitas) >= IMPORTACAO_LOTE:
+                    _descarregar(db, job, receitas, [])
+                    receitas = []
+                if len(despesas) >= IMPORTACAO_LOTE:
+                    _descarregar(db, job, [], despesas)
+                    despesas = []
+
+            _descarregar(db, job, receitas, despesas)
+            db.commit()
+        job.status = "concluido"
+    except Exception as e:
+        # Nada foi gravado: a transação inteira é desfeita ao fechar a sessão
+        if not isinstance(e, (extrato.ErroExtrato, UnicodeError)):
+            logger.exception("Falha na importação %s", job.id)
+        job.status = "erro"
+        job.mensagem = str(e)
+        if isinstance(e, UnicodeError):
+            job.mensagem = f"Arquivo não está em {encoding}; informe o parâmetro encoding (ex.: latin-1)"
+        job.receitas = job.despesas = 0
+    finally:
+        job.concluido_em = time.time()
+
+
+def _descarregar(db: Session, job: JobImportacao, receitas: list, despesas: list):
+    _gravar(db, Receitas, receitas)
+    _gravar(db, Despesas, despesas)
+    marcar_alterados(db, {linha["id_login"] for linha in (*receitas, *despesas)})
+    job.receitas += len(receitas)
+    job.despesas += len(despesas)
+
+
+def iniciar(job: JobImportacao, caminho: str, encoding: str):
+    async def executar():
+        try:
+            await asyncio.to_thread(importar, job, caminho, encoding)
+        finally:
+            os.remove(caminho)
+
+    tarefa = asyncio.create_task(executar())
+    # Mantém referência até o fim, senão a tarefa pode ser coletada
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
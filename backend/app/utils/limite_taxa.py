@@ -0,0 +1,141 @@
+import os
+import math
+import time
+import logging
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+from fastapi import HTTPException, Request
+from app.utils import metricas
+
+logger = logging.getLogger(__name__)
+
+# Token bucket para as rotas que rodam bcrypt (/login, /cadastro, /resetar-senha):
+# um balde por IP e outro por e-mail, verificados antes de qualquer hash ou
+# acesso ao banco. Cada balde comporta RAJADA fichas e recebe POR_MINUTO fichas
+# por minuto; sem ficha, a resposta é 429 com Retry-After.
+LIMITE_TAXA = os.getenv("LIMITE_TAXA", "1") == "1"
+LIMITE_IP_RAJADA = float(os.getenv("LIMITE_IP_RAJADA", "20"))
+LIMITE_IP_POR_MINUTO = float(os.getenv("LIMITE_IP_POR_MINUTO", "30"))
+LIMITE_EMAIL_RAJADA = float(os.getenv("LIMITE_EMAIL_RAJADA", "5"))
+LIMITE_EMAIL_POR_MINUTO = float(os.getenv("LIMITE_EMAIL_POR_MINUTO", "5"))
+
+# Baldes mantidos em memória por worker (os menos usados saem primeiro)
+LIMITE_TAXA_CHAVES = int(os.getenv("LIMITE_TAXA_CHAVES", "100000"))
+
+# "modulo:Classe" de um ArmazenamentoBaldes compartilhado entre workers; vazio usa a memória do worker
+LIMITE_TAXA_ARMAZENAMENTO = os.getenv("LIMITE_TAXA_ARMAZENAMENTO", "")
+
+
+class ArmazenamentoBaldes(ABC):
+    """Onde ficam os baldes.
+
+    `consumir` precisa ser atômico por chave; uma implementação compartilhada
+    entre workers (ex.: Redis, com um script Lua que recalcula e grava as
+    fichas) deve usar timeouts curtos. Se ela falhar, a requisição passa.
+    """
+
+    @abstractmethod
+    def consumir(self, chave: str, rajada: float, por_segundo: float) -> float:
+        """Tira uma ficha do balde; devolve 0 se conseguiu ou os segundos até a próxima ficha."""
+
+    @abstractmethod
+    def limpar(self):
+        ...
+
+
+class ArmazenamentoBaldesMemoria(ArmazenamentoBaldes):
+    def __init__(self, chaves_max: int = LIMITE_TAXA_CHAVES):
+        self.chaves_max = chaves_max
+        self._baldes = OrderedDict()
+
+    def consumir(self, chave: str, rajada: float, por_segundo: float) -> float:
+        agora = time.monotonic()
+        fichas, ultimo = self._baldes.get(chave, (rajada, agora))
+        fichas = min(rajada, fichas + (agora - ultimo) * por_segundo)
+
+        espera = 0.0
+        if fichas >= 1:
+            fichas -= 1
+        else:
+            espera = (1 - fichas) / por_segundo
+
+        self._baldes[chave] = (fichas, agora)
+        self._baldes.move_to_end(chave)
+        while len(self._baldes) > self.chaves_max:
+            self._baldes.popitem(last=False)
+        return espera
+
+    def limpar(self):
+        self._baldes.clear()
+
+
+class LimitadorTaxa:
+    def __init__(
+        self,
+        armazenamento: ArmazenamentoBaldes,
+        ativo: bool = LIMITE_TAXA,
+        ip: tuple = (LIMITE_IP_RAJADA, LIMITE_IP_POR_MINUTO),
+        email: tuple = (LIMITE_EMAIL_RAJADA, LIMITE_EMAIL_POR_MINUTO),
+    ):
+        self.armazenamento = armazenamento
+        self.ativo = ativo
+        self.regras = {"ip": ip, "email": email}
+
+    def _consumir(self, tipo: str, valor: str) -> float:
+        rajada, por_minuto = self.regras[tipo]
+        try:
+            return self.armazenamento.consumir(f"{tipo}:{valor}", rajada, por_minuto / 60)
+        except Exception:
+            logger.exception("Falha no armazenamento do limite de taxa")
+            return 0.0
+
+    def verificar(self, rota: str, ip: str, email: Optional[str] = None):
+        """Levanta 429 se o IP ou o e-mail estourou o limite.
+
+        O IP é verificado primeiro: uma origem já bloqueada não gasta as fichas
+        do e-mail, o que dificulta travar a conta de outra pessoa.
+        """
+        if not self.ativo:
+            return
+
+        for tipo, valor in (("ip", ip), ("email", email.strip().lower() if email else None)):
+            if valor is None:
+                continue
+            espera = self._consumir(tipo, valor)
+            if espera > 0:
+                metricas.limite_taxa_rejeicoes.inc(rota, tipo)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Muitas tentativas, tente novamente mais tarde",
+                    headers={"Retry-After": str(math.ceil(espera))},
+                )
+
+
+def _criar_armazenamento() -> ArmazenamentoBaldes:
+    if LIMITE_TAXA_ARMAZENAMENTO:
+        modulo, _, nome = LIMITE_TAXA_ARMAZENAMENTO.partition(":")
+        return getattr(importlib.import_module(modulo), nome)()
+    return ArmazenamentoBaldesMemoria()
+
+
+limitador = LimitadorTaxa(_criar_armazenamento())
+
+
+def por_ip_e_email(extrair_email: Callable[[dict], Optional[str]]):
+    """Dependência para `dependencies=[...]` da rota.
+
+    As dependências do decorator rodam antes das do endpoint (get_db incluso),
+    então a recusa acontece antes de abrir conexão ou rodar bcrypt. O corpo já
+    foi lido pelo FastAPI; aqui só é decodificado de novo para achar o e-mail.
+    """
+    async def limitar(request: Request):
+        try:
+            corpo = await request.json()
+        except ValueError:
+            corpo = None
+        email = extrair_email(corpo) if isinstance(corpo, dict) else None
+        ip = request.client.host if request.client else "desconhecido"
+        limitador.verificar(request.scope["route"].path, ip, email if isinstance(email, str) else None)
+    return limitar
@@ -0,0 +1,47 @@
+import os
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+
+# Máximo de itens aceitos por chamada em /inserir-*/lote
+LOTE_MAXIMO = int(os.getenv("LOTE_MAXIMO", "500"))
+
+
+def validar(itens: list, schema: type[BaseModel]):
+    """Valida cada item com `schema`.
+
+    Devolve (dados, erros): `dados` só é útil quando `erros` está vazio; cada
+    erro indica a posição do item no lote e as mensagens do Pydantic.
+    """
+    dados, erros = [], []
+    for indice, item in enumerate(itens):
+        try:
+            dados.append(schema.model_validate(item))
+        except ValidationError as e:
+            erros.append({
+                "indice": indice,
+                "erros": e.errors(include_url=False, include_context=False, include_input=False),
+            })
+    return dados, erros
+
+
+async def verificar_referencias(db, dados: list, referencias: dict):
+    """Confere se os ids referenciados existem; `referencias` mapeia campo -> modelo.
+
+    Uma consulta por campo com todos os ids do lote. Os erros saem no mesmo
+    formato de `validar`, um por item que aponta para id inexistente.
+    """
+    inexistentes = {}
+    for campo, modelo in referencias.items():
+        ids = {getattr(d, campo) for d in dados}
+        existentes = set((await db.scalars(select(modelo.id).where(modelo.id.in_(ids)))).all())
+        inexistentes[campo] = ids - existentes
+
+    erros = []
+    for indice, d in enumerate(dados):
+        erros_item = [
+            {"type": "referencia_inexistente", "loc": (campo,), "msg": f"{campo} não encontrado"}
+            for campo in referencias if getattr(d, campo) in inexistentes[campo]
+        ]
+        if erros_item:
+            erros.append({"indice": indice, "erros": erros_item})
+    return erros
@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+import contextvars
+from collections import defaultdict
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Requisições que passam deste número de comandos SQL geram um warning (provável N+1)
+SQL_ORCAMENTO_CONSULTAS = int(os.getenv("SQL_ORCAMENTO_CONSULTAS", "20"))
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, rotulos
+        self.valores = defaultdict(float)
+
+    def inc(self, *rotulos, valor: float = 1):
+        self.valores[rotulos] += valor
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for rotulos, valor in sorted(self.valores.items()):
+            linhas.append(f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        self.nome, self.ajuda, self.rotulos, self.buckets = nome, ajuda, rotulos, buckets
+        # rotulos -> [contagem por bucket (não acumulada) + 1 para +Inf, soma]
+        self.series = {}
+
+    def observar(self, valor: float, *rotulos):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0]
+        i = 0
+        while i < len(self.buckets) and valor > self.buckets[i]:
+            i += 1
+        serie[0][i] += 1
+        serie[1] += valor
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for rotulos, (contagens, soma) in sorted(self.series.items()):
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, "+Inf"), contagens):
+                acumulado += contagem
+                le = f'le="{limite}"'
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}")
+        return linhas
+
+
+requisicoes = Contador("http_requisicoes_total", "Requisições atendidas.", ("metodo", "rota", "status"))
+latencia = Histograma("http_duracao_segundos", "Latência das requisições.", ("metodo", "rota"))
+consultas = Histograma(
+    "sql_consultas_por_requisicao", "Comandos SQL emitidos por requisição.", ("rota",), BUCKETS_CONSULTAS
+)
+tempo_sql = Contador("sql_duracao_segundos_total", "Tempo gasto em comandos SQL.", ("rota",))
+orcamento_excedido = Contador(
+    "sql_orcamento_excedido_total", "Requisições acima de SQL_ORCAMENTO_CONSULTAS comandos.", ("rota",)
+)
+cache_respostas = Contador(
+    "cache_respostas_total", "Consultas ao cache de respostas (acerto ou falta).", ("rota", "resultado")
+)
+limite_taxa_rejeicoes = Contador(
+    "limite_taxa_rejeicoes_total", "Requisições recusadas com 429 pelo limite de taxa.", ("rota", "chave")
+)
+METRICAS = [requisicoes, latencia, consultas, tempo_sql, orcamento_excedido, cache_respostas, limite_taxa_rejeicoes]
+
+
+class ConsultasRequisicao:
+    __slots__ = ("quantidade", "tempo")
+
+    def __init__(self):
+        self.quantidade = 0
+        self.tempo = 0.0
+
+
+# Preenchido pelos eventos do engine enquanto a requisição está ativa
+_consultas_atual = contextvars.ContextVar("consultas_requisicao", default=None)
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    # Uma conexão executa um comando por vez, então basta um valor por conexão
+    conn.info["inicio_consulta"] = time.perf_counter()
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    atual = _consultas_atual.get()
+    if atual is not None:
+        atual.quantidade += 1
+        atual.tempo += time.perf_counter() - conn.info["inicio_consulta"]
+
+
+def instrumentar_engine(engine):
+    # Para AsyncEngine os eventos ficam no engine síncrono interno
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _antes):
+        event.listen(engine, "before_cursor_execute", _antes)
+        event.listen(engine, "after_cursor_execute", _depois)
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mede latência, status e comandos SQL por rota.
+
+    A rota é o template (ex.: /unica-receita/{id}), não o caminho, para que o
+    número de séries não cresça com os ids; caminhos sem rota viram "sem_rota".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        atual = ConsultasRequisicao()
+        token = _consultas_atual.set(atual)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _consultas_atual.reset(token)
+            rota = getattr(scope.get("route"), "path", "sem_rota")
+            metodo = scope["method"]
+
+            requisicoes.inc(metodo, rota, str(status))
+            latencia.observar(duracao, metodo, rota)
+            consultas.observar(atual.quantidade, rota)
+            tempo_sql.inc(rota, valor=atual.tempo)
+            if atual.quantidade > SQL_ORCAMENTO_CONSULTAS:
+                orcamento_excedido.inc(rota)
+                logger.warning(
+                    "%s %s emitiu %d comandos SQL (orçamento %d, %.1f ms no banco)",
+                    metodo, rota, atual.quantidade, SQL_ORCAMENTO_CONSULTAS, atual.tempo * 1000,
+                )
+
+
+def exportar(extras: list = ()) -> str:
+    linhas = []
+    for metrica in METRICAS:
+        linhas += metrica.exportar()
+    linhas += extras
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,54 @@
+import os
+import json
+import base64
+from datetime import date
+from sqlalchemy import tuple_
+from app.db import AsyncSessionLocal
+
+# Paginação por chave (data, id): cada página continua de onde a anterior parou,
+# sem OFFSET, então o custo não cresce com o número da página.
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+# Linhas buscadas por ida ao banco no modo NDJSON
+STREAM_YIELD_PER = int(os.getenv("STREAM_YIELD_PER", "500"))
+
+
+def codificar_cursor(data: date, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{data.isoformat()}|{id}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str):
+    # ValueError para cursores malformados
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data, id = bruto.split("|")
+        return date.fromisoformat(data), int(id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+async def pagina(db, consulta, coluna_data, posicao, limite: int, formatar):
+    """Executa `consulta` depois de `posicao` (data, id) e devolve no máximo `limite` itens.
+
+    Busca uma linha a mais para saber se existe próxima página sem um COUNT.
+    """
+    if posicao is not None:
+        consulta = consulta.where(tuple_(coluna_data, coluna_data.class_.id) > tuple_(*posicao))
+    linhas = (await db.scalars(consulta.limit(limite + 1))).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo_cursor = codificar_cursor(getattr(ultima, coluna_data.key), ultima.id)
+
+    return {"itens": [formatar(linha) for linha in linhas], "proximo_cursor": proximo_cursor}
+
+
+async def ndjson(consulta, formatar):
+    # Sessão própria: o gerador roda enquanto a resposta é enviada, depois do endpoint retornar
+    async with AsyncSessionLocal() as db:
+        linhas = await db.stream_scalars(consulta.execution_options(yield_per=STREAM_YIELD_PER))
+        async for linha in linhas:
+            yield json.dumps(formatar(linha), default=str) + "\n"
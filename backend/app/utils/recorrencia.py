@@ -0,0 +1,158 @@
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+from sqlalchemy import and_, or_
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+
+# Motor de recorrência. Cada lançamento vira uma Regra:
+#   - normal (recorrencia falso): uma ocorrência, na própria data
+#   - recorrente: a partir da data, a cada `intervalo` semanas, meses ou anos
+#     (frequencia semanal, mensal ou anual); o recorrente antigo, só com o
+#     booleano, é mensal com intervalo 1
+# fim_recorrencia vale por mês, como sempre valeu: ocorrências até o último
+# dia do mês do fim. Nas regras mensais e anuais, dias 29-31 viram o último
+# dia dos meses mais curtos.
+#
+# Para consultas por mês, um lançamento está "ativo" em um mês quando o mês
+# da data é <= mês consultado e (recorrentes) o mês do fim é >= mês consultado.
+# Isso é só um pré-filtro para regras com intervalo > 1 ou semanais (que podem
+# pular meses ou ocorrer várias vezes no mesmo mês); a contagem exata sai da
+# própria regra (ver app.utils.snapshot).
+# Como data_consulta é sempre o dia 1, comparar o mês das datas equivale a
+# comparar as próprias datas com o primeiro e o último dia do mês, o que
+# mantém o predicado indexável (sem funções sobre as colunas).
+
+UNICA = "unica"
+SEMANAL = "semanal"
+MENSAL = "mensal"
+ANUAL = "anual"
+FREQUENCIAS = (SEMANAL, MENSAL, ANUAL)
+
+
+def coluna_data(modelo):
+    if modelo is Receitas:
+        return Receitas.data_recebimento
+    return Despesas.data_vencimento
+
+
+def ativo_entre(modelo, inicio: date, fim: date):
+    # Lançamentos ativos em pelo menos um mês do intervalo [inicio, fim]
+    data = coluna_data(modelo)
+    # Último dia do mês de fim; o primeiro do mês seguinte não existe em dezembro de 9999
+    fim_do_mes = data_no_mes(31, indice_mes(fim))
+
+    return and_(
+        data <= fim_do_mes,
+        or_(
+            and_(~modelo.recorrencia, data >= inicio),
+            and_(
+                modelo.recorrencia,
+                or_(modelo.fim_recorrencia.is_(None), modelo.fim_recorrencia >= inicio),
+            ),
+        ),
+    )
+
+
+def ativo_no_mes(modelo, data_consulta: date):
+    return ativo_entre(modelo, data_consulta, data_consulta)
+
+
+def regra_simples(modelo):
+    # Lançamentos que ocorrem exatamente uma vez em cada mês em que estão ativos
+    return or_(~modelo.recorrencia, and_(modelo.frequencia == MENSAL, modelo.intervalo == 1))
+
+
+def filtro_usuario_mes(modelo, id_login, data_consulta: date, ids_outras_regras=()):
+    # ids_outras_regras: regras não simples que de fato ocorrem no mês (vêm do snapshot)
+    return and_(
+        modelo.id_login == id_login,
+        ativo_no_mes(modelo, data_consulta),
+        or_(regra_simples(modelo), modelo.id.in_(ids_outras_regras)),
+    )
+
+
+# Índice de mês (ano * 12 + mes - 1): cada regra ocupa um intervalo de meses
+# [primeiro, ultimo ou infinito), o que permite somar séries com vetor de
+# diferenças + soma de prefixos em O(N + M).
+
+def indice_mes(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def data_do_indice(indice: int) -> date:
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def data_no_mes(dia: int, indice: int) -> date:
+    # Mesmo dia em outro mês; 29-31 viram o último dia quando o mês é mais curto
+    ano, mes = indice // 12, indice % 12 + 1
+    return date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+
+
+@dataclass(frozen=True)
+class Regra:
+    data: date
+    frequencia: str = UNICA
+    intervalo: int = 1
+    fim: Optional[date] = None
+
+    @classmethod
+    def da_linha(cls, data: date, recorrente: bool, fim_recorrencia: Optional[date],
+                 frequencia: str = MENSAL, intervalo: int = 1) -> "Regra":
+        if not recorrente:
+            return cls(data)
+        return cls(data, frequencia or MENSAL, intervalo or 1, fim_recorrencia)
+
+    @property
+    def simples(self) -> bool:
+        return self.frequencia == UNICA or (self.frequencia == MENSAL and self.intervalo == 1)
+
+    @property
+    def passo_meses(self) -> int:
+        # Meses entre ocorrências; 0 nas semanais, que andam em dias
+        if self.frequencia == SEMANAL:
+            return 0
+        if self.frequencia == ANUAL:
+            return 12 * self.intervalo
+        return self.intervalo
+
+    @property
+    def passo_dias(self) -> int:
+        return 7 * self.intervalo if self.frequencia == SEMANAL else 0
+
+    def meses(self):
+        # (primeiro, ultimo) índice de mês em que pode ocorrer; ultimo None = sem fim
+        primeiro = indice_mes(self.data)
+        if self.frequencia == UNICA:
+            return primeiro, primeiro
+        return primeiro, (indice_mes(self.fim) if self.fim else None)
+
+    def ocorrencias(self, inicio: date, fim: date):
+        """Datas das ocorrências dentro de [inicio, fim], geradas sob demanda."""
+        primeiro, ultimo = self.meses()
+        ultimo = indice_mes(fim) if ultimo is None else min(ultimo, indice_mes(fim))
+
+        if self.frequencia == SEMANAL:
+            # Em ordinais: perto de date.max, somar o passo à data estouraria
+            passo = self.passo_dias
+            atual = self.data.toordinal()
+            if atual < inicio.toordinal():
+                atual += passo * -(-(inicio.toordinal() - atual) // passo)
+            limite = min(fim.toordinal(), data_no_mes(31, ultimo).toordinal())
+            while atual <= limite:
+                yield date.fromordinal(atual)
+                atual += passo
+            return
+
+        passo = self.passo_meses
+        indice = primeiro
+        if indice < indice_mes(inicio):
+            indice += passo * -(-(indice_mes(inicio) - indice) // passo)
+        while indice <= ultimo:
+            ocorrencia = data_no_mes(self.data.day, indice)
+            if inicio <= ocorrencia <= fim:
+                yield ocorrencia
+            indice += passo
+
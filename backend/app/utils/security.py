@@ -1,9 +1,70 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Custo do bcrypt; hashes gravados com outro custo são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Processos dedicados ao bcrypt (0 = usa o threadpool padrão) e limite de operações
+# pendentes antes de recusar novas com 503
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_FILA_MAX = int(os.getenv("HASH_FILA_MAX", str(max(HASH_WORKERS, 1) * 8)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_senha(senha: str) -> str:
     return pwd_context.hash(senha)
 
 def verificar_senha(senha_clara: str, senha_hash: str) -> bool:
-    return pwd_context.verify(senha_clara, senha_hash)
\ No newline at end of file
+    return pwd_context.verify(senha_clara, senha_hash)
+
+def verificar_e_atualizar(senha_clara: str, senha_hash: str):
+    # (senha_confere, novo_hash ou None se o hash gravado já está no custo atual)
+    return pwd_context.verify_and_update(senha_clara, senha_hash)
+
+
+class FilaHashCheia(Exception):
+    """Há mais operações de hash pendentes do que HASH_FILA_MAX."""
+
+
+_executor = None
+_pendentes = 0
+
+def _obter_executor():
+    global _executor
+    if _executor is None and HASH_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _executor
+
+async def _executar(fn, *args):
+    global _pendentes
+    if _pendentes >= HASH_FILA_MAX:
+        raise FilaHashCheia()
+
+    _pendentes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_obter_executor(), fn, *args)
+    finally:
+        _pendentes -= 1
+
+async def hash_senha_async(senha: str) -> str:
+    return await _executar(hash_senha, senha)
+
+async def verificar_senha_async(senha_clara: str, senha_hash: str) -> bool:
+    return await _executar(verificar_senha, senha_clara, senha_hash)
+
+async def verificar_e_atualizar_async(senha_clara: str, senha_hash: str):
+    return await _executar(verificar_e_atualizar, senha_clara, senha_hash)
+
+def encerrar_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
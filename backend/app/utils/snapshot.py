@@ -0,0 +1,335 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import NamedTuple, Optional
+import numpy as np
+from sqlalchemy import event, select, literal
+from sqlalchemy.orm import Session
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+from app.utils.recorrencia import Regra, data_do_indice, data_no_mes
+from app.utils.cache_respostas import cache_respostas
+
+# Retrato colunar dos lançamentos de um usuário: cada linha vira uma regra de
+# recorrência (ver recorrencia.Regra) ocupando um intervalo [inicio, fim] de
+# índices de mês, e as consultas do dashboard passam a ser máscaras e bincounts
+# sobre os arrays, sem voltar ao banco enquanto a versão do usuário não mudar.
+#
+# A versão é incrementada no commit de qualquer escrita que chame
+# marcar_alterados e é a mesma do cache de respostas: com um
+# CACHE_RESPOSTAS_ARMAZENAMENTO compartilhado, uma escrita em um worker invalida
+# o snapshot de todos. Com o armazenamento padrão, por worker, SNAPSHOT_TTL
+# limita quanto tempo uma escrita feita em outro worker pode demorar a aparecer.
+SNAPSHOT_CACHE_TAMANHO = int(os.getenv("SNAPSHOT_CACHE_TAMANHO", "1000"))
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "60"))
+
+# Recorrente sem fim_recorrencia: ativo em todos os meses a partir do início
+SEM_FIM = np.iinfo(np.int32).max
+
+# date.toordinal() de 1970-01-01, a origem do datetime64
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+_ORDINAL_MAXIMO = date.max.toordinal()
+
+
+class Ocorrencias(NamedTuple):
+    """Uma posição por ocorrência (uma regra semanal aparece várias vezes no mês)."""
+    id: np.ndarray
+    centavos: np.ndarray
+    dia: np.ndarray
+    categoria: np.ndarray
+    recorrente: np.ndarray
+    simples: np.ndarray
+
+    @classmethod
+    def juntar(cls, partes) -> "Ocorrencias":
+        return cls(*(np.concatenate(coluna) for coluna in zip(*partes)))
+
+
+@dataclass(frozen=True)
+class Colunas:
+    """Regras ordenadas pelo mês inicial, com o índice de intervalos embutido.
+
+    Uma consulta a [primeiro, ultimo] só olha as linhas cujo início está entre
+    primeiro - duracao_max e ultimo (dois searchsorted); para lançamentos
+    normais, em que a duração é zero, isso já é exatamente o que se sobrepõe.
+    Com recorrentes sem fim no bloco a duração não tem limite (duracao_max
+    None) e basta o início <= ultimo; por isso eles ficam num bloco próprio
+    (ver Lancamentos), para não alargar a busca dos que têm fim.
+    """
+    id: np.ndarray           # int64
+    inicio: np.ndarray       # int32, índice do mês da data
+    fim: np.ndarray          # int32, último mês em que pode ocorrer (inclusivo)
+    passo: np.ndarray        # int32, meses entre ocorrências; 0 nas semanais
+    passo_dias: np.ndarray   # int32, dias entre ocorrências das semanais
+    ordinal: np.ndarray      # int32, date.toordinal() da data
+    dia: np.ndarray          # int8, dia do mês da data
+    centavos: np.ndarray     # int64
+    categoria: np.ndarray    # int32 (0 em receitas)
+    recorrente: np.ndarray   # bool
+    simples: np.ndarray      # bool, uma ocorrência em cada mês de [inicio, fim]
+    duracao_max: Optional[int]
+
+    @classmethod
+    def montar(cls, linhas) -> "Colunas":
+        # linhas: (id, data, valor, recorrencia, fim_recorrencia, frequencia, intervalo, id_categoria)
+        colunas = [[] for _ in range(11)]
+        for id, data, valor, recorrente, fim_recorrencia, frequencia, intervalo, id_categoria in linhas:
+            regra = Regra.da_linha(data, recorrente, fim_recorrencia, frequencia, intervalo)
+            primeiro, ultimo = regra.meses()
+            if ultimo is not None and ultimo < primeiro:
+                # Recorrência encerrada antes de começar: nunca ocorre
+                continue
+            for coluna, valor_coluna in zip(colunas, (
+                id, primeiro, SEM_FIM if ultimo is None else ultimo, regra.passo_meses, regra.passo_dias,
+                data.toordinal(), data.day, round(valor * 100), id_categoria, recorrente, regra.simples,
+            )):
+                coluna.append(valor_coluna)
+
+        tipos = (np.int64, np.int32, np.int32, np.int32, np.int32, np.int32, np.int8, np.int64, np.int32, bool, bool)
+        arrays = [np.array(coluna, dtype=tipo) for coluna, tipo in zip(colunas, tipos)]
+        ordem = np.argsort(arrays[1], kind="stable")
+        arrays = [a[ordem] for a in arrays]
+        inicio, fim = arrays[1], arrays[2]
+        if (fim == SEM_FIM).any():
+            duracao_max = None
+        else:
+            duracao_max = int((fim - inicio).max()) if len(inicio) else 0
+        return cls(*arrays, duracao_max)
+
+    def sobrepostas(self, primeiro: int, ultimo: int) -> np.ndarray:
+        # Posições das regras com algum mês em [primeiro, ultimo]
+        de = 0
+        if self.duracao_max is not None:
+            de = int(np.searchsorted(self.inicio, primeiro - self.duracao_max, side="left"))
+        ate = int(np.searchsorted(self.inicio, ultimo, side="right"))
+        return de + np.flatnonzero(self.fim[de:ate] >= primeiro)
+
+    def _expandir(self, linhas: np.ndarray, primeiro: int, ultimo: int):
+        """Ocorrências das regras em `linhas` dentro dos meses [primeiro, ultimo].
+
+        Devolve (linha, mes, dia) por ocorrência. Cada regra é expandida com um
+        arange, então o custo é proporcional ao número de ocorrências.
+        """
+        partes = []
+        for i in linhas.tolist():
+            de = max(primeiro, int(self.inicio[i]))
+            ate = min(ultimo, int(self.fim[i]))
+            passo = int(self.passo[i])
+            if passo:
+                inicio = int(self.inicio[i])
+                meses = np.arange(inicio + -(-(de - inicio) // passo) * passo, ate + 1, passo)
+                dias = np.full(len(meses), self.dia[i], dtype=np.int64)
+            else:
+                passo = int(self.passo_dias[i])
+                origem = int(self.ordinal[i])
+                limite = max(data_do_indice(de).toordinal(), origem)
+                # Último dia do mês `ate` + 1, sem montar a data do mês seguinte
+                # (que não existe depois de dezembro de 9999)
+                depois = min(data_no_mes(31, ate).toordinal() + 1, _ORDINAL_MAXIMO + 1)
+                ordinais = np.arange(origem + -(-(limite - origem) // passo) * passo, depois, passo)
+                datas = (ordinais - _ORDINAL_EPOCA).astype("datetime64[D]")
+                meses_64 = datas.astype("datetime64[M]")
+                meses = meses_64.astype(np.int64) + 1970 * 12
+                dias = (datas - meses_64.astype("datetime64[D]")).astype(np.int64) + 1
+            partes.append((np.full(len(meses), i), meses, dias))
+
+        if not partes:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio, vazio
+        return tuple(np.concatenate(coluna) for coluna in zip(*partes))
+
+    def no_mes(self, mes: int) -> Ocorrencias:
+        linhas = self.sobrepostas(mes, mes)
+        simples = self.simples[linhas]
+        outras, _, dias_outras = self._expandir(linhas[~simples], mes, mes)
+        todas = np.concatenate([linhas[simples], outras])
+        return Ocorrencias(
+            self.id[todas], self.centavos[todas], np.concatenate([self.dia[linhas[simples]], dias_outras]),
+            self.categoria[todas], self.recorrente[todas], self.simples[todas],
+        )
+
+    def serie(self, primeiro: int, ultimo: int) -> np.ndarray:
+        # Centavos de cada mês em [primeiro, ultimo]. Regras simples: +valor no
+        # primeiro mês ativo, -valor depois do último e soma acumulada; as demais
+        # são expandidas ocorrência a ocorrência
+        linhas = self.sobrepostas(primeiro, ultimo)
+        simples = linhas[self.simples[linhas]]
+        tamanho = ultimo - primeiro + 2
+        centavos = self.centavos[simples]
+        diferencas = (
+            np.bincount(np.maximum(self.inicio[simples], primeiro) - primeiro, weights=centavos, minlength=tamanho)
+            - np.bincount(np.minimum(self.fim[simples], ultimo) - primeiro + 1, weights=centavos, minlength=tamanho)
+        )
+        # float64 mesmo sem regras simples (bincount de vazio devolve inteiros)
+        totais = np.cumsum(diferencas[:-1], dtype=np.float64)
+
+        outras, meses, _ = self._expandir(linhas[~self.simples[linhas]], primeiro, ultimo)
+        if len(outras):
+            totais += np.bincount(meses - primeiro, weights=self.centavos[outras], minlength=tamanho - 1)
+        return totais
+
+
+@dataclass(frozen=True)
+class Lancamentos:
+    # Normais, recorrentes com fim e recorrentes sem fim em blocos separados:
+    # no bloco dos normais a duração máxima é zero e a busca no índice é exata;
+    # a dos recorrentes com fim não é alargada pelos sem fim, que casam só
+    # pelo início
+    unicos: Colunas
+    recorrentes: Colunas
+    sem_fim: Colunas
+
+    @classmethod
+    def montar(cls, linhas) -> "Lancamentos":
+        unicos, recorrentes, sem_fim = [], [], []
+        for linha in linhas:
+            if not linha[3]:
+                unicos.append(linha)
+            elif linha[4] is None:
+                sem_fim.append(linha)
+            else:
+                recorrentes.append(linha)
+        return cls(Colunas.montar(unicos), Colunas.montar(recorrentes), Colunas.montar(sem_fim))
+
+    @property
+    def blocos(self):
+        return (self.unicos, self.recorrentes, self.sem_fim)
+
+    def no_mes(self, mes: int) -> Ocorrencias:
+        return Ocorrencias.juntar([bloco.no_mes(mes) for bloco in self.blocos])
+
+    def total(self, mes: int) -> float:
+        return int(self.no_mes(mes).centavos.sum()) / 100
+
+    def contagem_recorrencia(self, mes: int) -> dict:
+        recorrente = self.no_mes(mes).recorrente
+        recorrentes = int(np.count_nonzero(recorrente))
+        return {"recorrentes": recorrentes, "nao_recorrentes": len(recorrente) - recorrentes}
+
+    def contagem_por_dia(self, mes: int) -> list:
+        contagem = np.bincount(self.no_mes(mes).dia, minlength=32)
+        return [(int(dia), int(contagem[dia])) for dia in np.flatnonzero(contagem)]
+
+    def contagem_por_categoria(self, mes: int) -> list:
+        ids, contagem = np.unique(self.no_mes(mes).categoria, return_counts=True)
+        return [(int(i), int(qtd)) for i, qtd in zip(ids, contagem)]
+
+    def ocorrencias_outras_regras(self, mes: int) -> dict:
+        # Regras não simples com ao menos uma ocorrência no mês -> quantas ocorrências
+        ocorrencias = self.no_mes(mes)
+        ids, contagem = np.unique(ocorrencias.id[~ocorrencias.simples], return_counts=True)
+        return dict(zip(ids.tolist(), contagem.tolist()))
+
+    def centavos_por_mes(self, primeiro: int, ultimo: int) -> np.ndarray:
+        return sum(bloco.serie(primeiro, ultimo) for bloco in self.blocos).round()
+
+    def serie(self, primeiro: int, ultimo: int) -> list:
+        return (self.centavos_por_mes(primeiro, ultimo) / 100).tolist()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    versao: int
+    receitas: Lancamentos
+    despesas: Lancamentos
+
+    def projecao(self, primeiro: int, ultimo: int, saldo_inicial_centavos: int = 0):
+        """(receitas, despesas, saldo, saldo_acumulado) de cada mês em [primeiro, ultimo], em reais.
+
+        Os totais mensais saem das séries (um bincount por bloco) e o saldo
+        acumulado é a soma de prefixos deles, então o custo quase não depende
+        do número de meses.
+        """
+        receitas = self.receitas.centavos_por_mes(primeiro, ultimo)
+        despesas = self.despesas.centavos_por_mes(primeiro, ultimo)
+        saldo = receitas - despesas
+        acumulado = saldo_inicial_centavos + np.cumsum(saldo)
+        return tuple((coluna / 100).tolist() for coluna in (receitas, despesas, saldo, acumulado))
+
+
+def _carregar(db: Session, id_login: int, versao: int) -> Snapshot:
+    receitas = db.execute(
+        select(
+            Receitas.id, Receitas.data_recebimento, Receitas.valor, Receitas.recorrencia, Receitas.fim_recorrencia,
+            Receitas.frequencia, Receitas.intervalo, literal(0),
+        ).where(Receitas.id_login == id_login)
+    )
+    despesas = db.execute(
+        select(
+            Despesas.id, Despesas.data_vencimento, Despesas.valor, Despesas.recorrencia, Despesas.fim_recorrencia,
+            Despesas.frequencia, Despesas.intervalo, Despesas.id_categoria,
+        ).where(Despesas.id_login == id_login)
+    )
+    return Snapshot(versao, Lancamentos.montar(receitas), Lancamentos.montar(despesas))
+
+
+async def aquecer(db):
+    # Consulta de um usuário inexistente: compila o SQL do snapshot e faz o banco
+    # planejar as consultas às tabelas quentes, sem guardar nada no cache
+    await db.run_sync(_carregar, 0, 0)
+
+
+class CacheSnapshots:
+    """LRU de snapshots por usuário, válidos enquanto a versão do usuário não muda.
+
+    As versões vêm do cache de respostas (`versoes`), que as guarda no mesmo
+    armazenamento das respostas.
+    """
+
+    def __init__(self, versoes=cache_respostas, tamanho_max: int = SNAPSHOT_CACHE_TAMANHO, ttl: float = SNAPSHOT_TTL):
+        self.versoes = versoes
+        self.tamanho_max = tamanho_max
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+
+    def descartar(self, id_login: int):
+        # Só libera a memória; quem invalida é a versão
+        self._entradas.pop(id_login, None)
+
+    async def obter(self, db, id_login: int) -> Snapshot:
+        entrada = self._entradas.get(id_login)
+        versao = self.versoes.versao(id_login)
+        if versao is None:
+            # Armazenamento das versões fora do ar: lê do banco sem guardar
+            return await db.run_sync(_carregar, id_login, -1)
+        if entrada is not None:
+            snapshot, expira_em = entrada
+            if snapshot.versao == versao and expira_em > time.monotonic():
+                self._entradas.move_to_end(id_login)
+                return snapshot
+
+        # A versão é lida antes da consulta: se um commit acontecer no meio, o
+        # snapshot já nasce desatualizado e é descartado na próxima leitura
+        snapshot = await db.run_sync(_carregar, id_login, versao)
+        self._entradas[id_login] = (snapshot, time.monotonic() + self.ttl)
+        self._entradas.move_to_end(id_login)
+        while len(self._entradas) > self.tamanho_max:
+            self._entradas.popitem(last=False)
+        return snapshot
+
+    def limpar(self):
+        self._entradas.clear()
+
+
+cache_snapshots = CacheSnapshots()
+
+
+def marcar_alterados(db: Session, ids_login):
+    # Toda escrita em receitas/despesas chama isto antes do commit, na mesma
+    # sessão; a versão dos usuários só muda se o commit acontecer
+    db.info.setdefault("snapshot_alterados", set()).update(ids_login)
+
+
+@event.listens_for(Session, "after_commit")
+def _apos_commit(db: Session):
+    alterados = db.info.pop("snapshot_alterados", ())
+    for id_login in alterados:
+        cache_snapshots.descartar(id_login)
+    cache_respostas.incrementar(alterados)
+
+
+@event.listens_for(Session, "after_rollback")
+def _apos_rollback(db: Session):
+    db.info.pop("snapshot_alterados", None)
@@ -1,30 +1,50 @@
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from typing import Optional
 
 SECRET_KEY = "sua_chave_secreta_muito_segura"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def gerar_token_acesso(email: str, expira_em_minutos: int = ACCESS_TOKEN_EXPIRE_MINUTES):
+# Tokens de acesso e de reset usam a mesma chave; o claim "typ" impede que um
+# sirva no lugar do outro
+TIPO_ACESSO = "acesso"
+TIPO_RESET = "reset"
+
+def gerar_token_acesso(
+    email: str,
+    id_login: int,
+    versao_senha: int,
+    expira_em_minutos: int = ACCESS_TOKEN_EXPIRE_MINUTES
+):
+    # sv = Login.versao_senha: tokens emitidos antes de um reset deixam de valer
     expira = datetime.utcnow() + timedelta(minutes=expira_em_minutos)
-    payload = {"sub": email, "exp": expira}
+    payload = {"sub": email, "exp": expira, "typ": TIPO_ACESSO, "id": id_login, "sv": versao_senha}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-def validar_token_acesso(token: str):
+def decodificar_token_acesso(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")  # Retorna o e-mail do usuário
     except JWTError:
         return None
+    if payload.get("typ") != TIPO_ACESSO or not all(payload.get(claim) is not None for claim in ("sub", "id", "sv")):
+        return None
+    return payload
+
+def validar_token_acesso(token: str):
+    payload = decodificar_token_acesso(token)
+    return payload.get("sub") if payload else None  # Retorna o e-mail do usuário
 
 def gerar_token_reset(email: str, expira_em_minutos: int = 120):
     expira = datetime.utcnow() + timedelta(minutes=expira_em_minutos)
-    payload = {"sub": email, "exp": expira}
+    payload = {"sub": email, "exp": expira, "typ": TIPO_RESET}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 def validar_token_reset(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")  # retorna o e-mail
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    if payload.get("typ") != TIPO_RESET:
+        return None
+    return payload.get("sub")  # retorna o e-mail
\ No newline at end of file
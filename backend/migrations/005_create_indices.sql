@@ -0,0 +1,9 @@
+CREATE INDEX ix_receitas_login_recebimento ON public.receitas (id_login, data_recebimento);
+
+CREATE INDEX ix_receitas_login_fim_recorrente ON public.receitas (id_login, fim_recorrencia)
+    WHERE recorrencia;
+
+CREATE INDEX ix_despesas_login_vencimento ON public.despesas (id_login, data_vencimento);
+
+CREATE INDEX ix_despesas_login_fim_recorrente ON public.despesas (id_login, fim_recorrencia)
+    WHERE recorrencia;
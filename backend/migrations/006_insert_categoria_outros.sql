@@ -0,0 +1,4 @@
+-- Categoria padrão para despesas importadas de extrato sem categoria reconhecida
+INSERT INTO public.categoria (nome)
+SELECT 'Outros'
+WHERE NOT EXISTS (SELECT 1 FROM public.categoria WHERE nome = 'Outros');
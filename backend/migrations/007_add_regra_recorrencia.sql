@@ -0,0 +1,14 @@
+-- Regra de recorrência: a cada `intervalo` semanas, meses ou anos a partir da
+-- data. Linhas existentes ficam mensais com intervalo 1, que é o que o
+-- booleano recorrencia sempre significou.
+ALTER TABLE public.receitas
+    ADD COLUMN frequencia VARCHAR(7) NOT NULL DEFAULT 'mensal',
+    ADD COLUMN intervalo INTEGER NOT NULL DEFAULT 1,
+    ADD CONSTRAINT ck_receitas_frequencia CHECK (frequencia IN ('semanal', 'mensal', 'anual')),
+    ADD CONSTRAINT ck_receitas_intervalo CHECK (intervalo >= 1);
+
+ALTER TABLE public.despesas
+    ADD COLUMN frequencia VARCHAR(7) NOT NULL DEFAULT 'mensal',
+    ADD COLUMN intervalo INTEGER NOT NULL DEFAULT 1,
+    ADD CONSTRAINT ck_despesas_frequencia CHECK (frequencia IN ('semanal', 'mensal', 'anual')),
+    ADD CONSTRAINT ck_despesas_intervalo CHECK (intervalo >= 1);
@@ -0,0 +1,5 @@
+-- Versão da senha, levada no claim "sv" dos tokens de acesso. Só muda quando
+-- a senha é redefinida: refazer o hash com outro custo de bcrypt no login não
+-- derruba as sessões abertas em outros aparelhos.
+ALTER TABLE public.login
+    ADD COLUMN versao_senha INTEGER NOT NULL DEFAULT 0;
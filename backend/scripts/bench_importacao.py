@@ -0,0 +1,114 @@
+"""Vazão da importação de extratos (parse + gravação em lotes).
+
+Gera um CSV ou OFX sintético, roda `importacao.importar` direto (sem HTTP) e
+imprime linhas por segundo. Com DATABASE_URL apontando para o Postgres, a
+gravação usa COPY; sem DATABASE_URL usa um SQLite temporário (executemany).
+
+Uso (a partir de backend/):
+    python -m scripts.bench_importacao --linhas 100000 --formato csv
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def preparar_ambiente():
+    if not os.getenv("DATABASE_URL"):
+        caminho = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{caminho}"
+    os.environ.setdefault("SMTP_PORT", "587")
+
+
+DESCRICOES = [
+    "SUPERMERCADO MERCADO BOM", "POSTO GASOLINA BR", "PAGAMENTO ALUGUEL", "NETFLIX.COM",
+    "FARMACIA SAUDE", "UBER TRANSPORTE", "CONTA DE LUZ", "PIX RECEBIDO", "SALARIO", "RESTAURANTES DIVERSOS",
+]
+
+
+def gerar_arquivo(formato: str, linhas: int, semente: int) -> str:
+    aleatorio = random.Random(semente)
+    inicio = date(2015, 1, 1)
+    descritor, caminho = tempfile.mkstemp(suffix=f".{formato}")
+    with os.fdopen(descritor, "w", encoding="utf-8", newline="") as arquivo:
+        if formato == "csv":
+            arquivo.write("Data;Histórico;Valor\n")
+        else:
+            arquivo.write("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n")
+
+        for i in range(linhas):
+            dia = inicio + timedelta(days=aleatorio.randrange(3650))
+            valor = round(aleatorio.uniform(-500, 300), 2) or 1.0
+            descricao = aleatorio.choice(DESCRICOES)
+            if formato == "csv":
+                valor_texto = f"{valor:.2f}".replace(".", ",")
+                arquivo.write(f"{dia:%d/%m/%Y};{descricao} {i};{valor_texto}\n")
+            else:
+                arquivo.write(
+                    f"<STMTTRN>\n<TRNTYPE>{'CREDIT' if valor > 0 else 'DEBIT'}\n<DTPOSTED>{dia:%Y%m%d}120000[-3:BRT]\n"
+                    f"<TRNAMT>{valor:.2f}\n<FITID>{i}\n<MEMO>{descricao} {i}\n</STMTTRN>\n"
+                )
+
+        if formato == "ofx":
+            arquivo.write("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return caminho
+
+
+def popular():
+    from sqlalchemy.orm import Session
+    import app.main  # registra todos os modelos no metadata
+    from app.db import Base, engine
+    from app.models.categoria import Categoria
+    from app.models.login import Login
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        if db.query(Categoria).count() == 0:
+            for nome in ("Mercado", "Gasolina", "Aluguel", "Assinaturas", "Saúde", "Transporte", "Luz", "Restaurantes", "Outros"):
+                db.add(Categoria(nome=nome))
+        login = Login(email=f"bench-importacao-{time.time_ns()}@mywallet.com", senha="x")
+        db.add(login)
+        db.commit()
+        return login.id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da importação de extratos")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--formato", choices=("csv", "ofx"), default="csv")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    preparar_ambiente()
+    id_login = popular()
+
+    from app.db import engine
+    from app.utils import importacao
+
+    caminho = gerar_arquivo(args.formato, args.linhas, args.semente)
+    try:
+        job = importacao.criar_job(id_login, args.formato)
+        inicio = time.perf_counter()
+        importacao.importar(job, caminho)
+        segundos = time.perf_counter() - inicio
+    finally:
+        os.remove(caminho)
+
+    resultado = job.como_dict()
+    resultado.pop("erros")
+    resultado.update({
+        "banco": engine.dialect.name,
+        "lote": importacao.IMPORTACAO_LOTE,
+        "segundos": round(segundos, 3),
+        "linhas_por_segundo": round(args.linhas / segundos),
+    })
+    json.dump(resultado, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Latência do dashboard durante uma enxurrada de logins (credential stuffing).
+
+Três cenários, cada um com um servidor uvicorn novo:
+
+- sem_ataque:         só os clientes do dashboard
+- ataque_sem_limite:  dashboard + logins com senha errada, LIMITE_TAXA=0
+- ataque_com_limite:  o mesmo ataque com o limite de taxa ligado
+
+Servidor, atacante e clientes do dashboard rodam em processos separados e
+conversam por HTTP local, para que o custo de gerar o ataque não caia no loop
+do servidor. O ataque tem taxa fixa (--taxa-ataque requisições/s) nos dois
+cenários com ataque; vem todo de 127.0.0.1, então o balde por IP é o que corta.
+
+Uso (a partir de backend/):
+    python -m scripts.bench_limite --segundos 10 --taxa-ataque 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+CENARIOS = {
+    "sem_ataque": {"ataque": False, "LIMITE_TAXA": "1"},
+    "ataque_sem_limite": {"ataque": True, "LIMITE_TAXA": "0"},
+    "ataque_com_limite": {"ataque": True, "LIMITE_TAXA": "1"},
+}
+
+
+async def atacar(args) -> dict:
+    import httpx
+
+    logins = {}
+    intervalo = args.atacantes / args.taxa_ataque
+    fim = time.perf_counter() + args.segundos
+
+    async def atacante(n: int, cliente):
+        proximo = time.perf_counter() + n * intervalo / args.atacantes
+        i = 0
+        while proximo < fim:
+            await asyncio.sleep(max(0.0, proximo - time.perf_counter()))
+            r = await cliente.post("/login", json={"email": f"alvo{n}-{i}@mywallet.com", "senha": "errada"})
+            logins[r.status_code] = logins.get(r.status_code, 0) + 1
+            proximo += intervalo
+            i += 1
+
+    limites = httpx.Limits(max_connections=args.atacantes)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=60) as cliente:
+        await asyncio.gather(*(atacante(n, cliente) for n in range(args.atacantes)))
+    return {str(k): v for k, v in sorted(logins.items())}
+
+
+async def ler_dashboard(url: str, id_login: int, segundos: float, dashboards: int) -> dict:
+    import httpx
+    from scripts.bench_login import percentil
+
+    latencias = []
+    fim = time.perf_counter() + segundos
+
+    async def leitor(cliente):
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            (await cliente.get("/dashboard/resumo", params={"id_login": id_login, "mes": 6, "ano": 2024})).raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as cliente:
+        await asyncio.gather(*(leitor(cliente) for _ in range(dashboards)))
+    return {
+        "dashboard_requisicoes": len(latencias),
+        "dashboard_p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "dashboard_p99_ms": round(percentil(latencias, 0.99) * 1000, 2),
+    }
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(url: str, servidor: subprocess.Popen, limite: float = 30):
+    import httpx
+
+    fim = time.perf_counter() + limite
+    while time.perf_counter() < fim:
+        if servidor.poll() is not None:
+            raise SystemExit("O servidor terminou antes de ficar pronto")
+        try:
+            httpx.get(f"{url}/hello").raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise SystemExit("O servidor não ficou pronto a tempo")
+
+
+def rodar_cenario(nome: str, args, id_login: int) -> dict:
+    cenario = CENARIOS[nome]
+    porta = porta_livre()
+    url = f"http://127.0.0.1:{porta}"
+    servidor = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "--factory", "app.main:criar_app",
+            "--port", str(porta), "--no-access-log", "--log-level", "warning",
+        ],
+        env=dict(os.environ, LIMITE_TAXA=cenario["LIMITE_TAXA"]),
+    )
+    try:
+        esperar_servidor(url, servidor)
+        atacante = None
+        if cenario["ataque"]:
+            atacante = subprocess.Popen(
+                [
+                    sys.executable, "-m", "scripts.bench_limite", "--atacar", url,
+                    "--segundos", str(args.segundos), "--atacantes", str(args.atacantes),
+                    "--taxa-ataque", str(args.taxa_ataque),
+                ],
+                stdout=subprocess.PIPE, text=True,
+            )
+        resultado = asyncio.run(ler_dashboard(url, id_login, args.segundos, args.dashboards))
+        if atacante is not None:
+            saida, _ = atacante.communicate()
+            if atacante.returncode != 0:
+                raise SystemExit(f"Atacante do cenário {nome} falhou")
+            resultado["logins_por_status"] = json.loads(saida)
+        return resultado
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard sob enxurrada de logins, com e sem limite de taxa")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--taxa-ataque", type=float, default=200, help="tentativas de login por segundo")
+    parser.add_argument("--atacantes", type=int, default=32, help="conexões concorrentes do atacante")
+    parser.add_argument("--dashboards", type=int, default=4, help="clientes concorrentes no dashboard")
+    parser.add_argument("--atacar", metavar="URL", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.atacar:
+        args.url = args.atacar
+        json.dump(asyncio.run(atacar(args)), sys.stdout)
+        return
+
+    from scripts.bench_login import preparar_ambiente, popular
+
+    # Os servidores herdam o DATABASE_URL populado aqui
+    preparar_ambiente()
+    id_login = popular()
+    relatorio = {
+        "taxa_ataque": args.taxa_ataque,
+        "cenarios": {nome: rodar_cenario(nome, args, id_login) for nome in CENARIOS},
+    }
+    json.dump(relatorio, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
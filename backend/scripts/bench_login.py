@@ -0,0 +1,121 @@
+"""Carga mista: logins concorrentes + leituras do dashboard.
+
+Mede a vazão de /login e a latência (p50/p99) de /dashboard/resumo enquanto os
+logins disputam CPU. Rode com HASH_WORKERS=0 (bcrypt no threadpool) e com
+HASH_WORKERS=N (processos dedicados) para comparar.
+
+Uso (a partir de backend/):
+    HASH_WORKERS=4 python -m scripts.bench_login --segundos 10 --logins 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def preparar_ambiente():
+    if not os.getenv("DATABASE_URL"):
+        caminho = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{caminho}"
+    # Leituras repetidas do dashboard seriam todas acertos do cache de respostas
+    os.environ.setdefault("CACHE_RESPOSTAS_TAMANHO", "0")
+
+
+def popular():
+    from datetime import date
+    from sqlalchemy.orm import Session
+    import app.main  # registra todos os modelos no metadata
+    from app.db import Base, engine
+    from app.models.login import Login
+    from app.models.despesas import Despesas
+    from app.models.receitas import Receitas
+    from app.utils import security
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        login = Login(email="bench@mywallet.com", senha=security.hash_senha("senha-bench"))
+        db.add(login)
+        db.flush()
+        for i in range(500):
+            despesa = Despesas(
+                id_login=login.id, descricao=f"d{i}", valor=10.0 + i % 50,
+                data_vencimento=date(2024, i % 12 + 1, i % 28 + 1),
+                recorrencia=i % 5 == 0, id_categoria=i % 14 + 1,
+            )
+            receita = Receitas(
+                id_login=login.id, descricao=f"r{i}", valor=20.0 + i % 30,
+                data_recebimento=date(2024, i % 12 + 1, i % 28 + 1), recorrencia=i % 7 == 0,
+            )
+            db.add_all([despesa, receita])
+        db.commit()
+        return login.id
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def executar(args, id_login):
+    import httpx
+    from app.main import criar_app
+    from app.utils import security
+
+    transporte = httpx.ASGITransport(app=criar_app())
+    fim = time.perf_counter() + args.segundos
+    logins = {"ok": 0, "503": 0, "outros": 0}
+    latencias_dashboard = []
+
+    async def loop_login(cliente):
+        while time.perf_counter() < fim:
+            r = await cliente.post("/login", json={"email": "bench@mywallet.com", "senha": "senha-bench"})
+            chave = "ok" if r.status_code == 200 else "503" if r.status_code == 503 else "outros"
+            logins[chave] += 1
+
+    async def loop_dashboard(cliente):
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            await cliente.get("/dashboard/resumo", params={"id_login": id_login, "mes": 6, "ano": 2024})
+            latencias_dashboard.append(time.perf_counter() - inicio)
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        await asyncio.gather(
+            *(loop_login(cliente) for _ in range(args.logins)),
+            *(loop_dashboard(cliente) for _ in range(args.dashboards)),
+        )
+    security.encerrar_executor()
+
+    return {
+        "hash_workers": security.HASH_WORKERS,
+        "bcrypt_rounds": security.BCRYPT_ROUNDS,
+        "segundos": args.segundos,
+        "logins_por_segundo": round(logins["ok"] / args.segundos, 2),
+        "logins": logins,
+        "dashboard_requisicoes": len(latencias_dashboard),
+        "dashboard_p50_ms": round(statistics.median(latencias_dashboard) * 1000, 2) if latencias_dashboard else None,
+        "dashboard_p99_ms": round(percentil(latencias_dashboard, 0.99) * 1000, 2) if latencias_dashboard else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de /login sob carga mista")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=32, help="clientes concorrentes em /login")
+    parser.add_argument("--dashboards", type=int, default=4, help="clientes concorrentes no dashboard")
+    args = parser.parse_args(argv)
+
+    preparar_ambiente()
+    id_login = popular()
+    resultado = asyncio.run(executar(args, id_login))
+    json.dump(resultado, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Vazão (bytes/s) da serialização de respostas grandes.
+
+Compara, sobre a mesma lista de despesas, as formas de responder que o
+FastAPI oferece:
+
+- dict:     sem response_model, dicts passam pelo jsonable_encoder + json.dumps
+- orjson:   sem response_model, ORJSONResponse (só se o orjson estiver instalado)
+- modelo:   response_model com a resposta padrão (o pydantic-core gera o JSON)
+- modelo+orjson: response_model com ORJSONResponse como classe padrão do app
+
+As requisições passam pelo app via ASGI, sem rede e sem banco, então o número
+medido é só o custo de validar e serializar.
+
+Uso (a partir de backend/):
+    python -m scripts.bench_serializacao --itens 20000
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import random
+import statistics
+import sys
+import time
+import warnings
+from datetime import date, timedelta
+from typing import List
+
+ORJSON_DISPONIVEL = importlib.util.find_spec("orjson") is not None
+
+
+def gerar_itens(quantidade: int, semente: int) -> list:
+    aleatorio = random.Random(semente)
+    inicio = date(2020, 1, 1)
+    itens = []
+    for i in range(quantidade):
+        recorrente = aleatorio.random() < 0.2
+        data = inicio + timedelta(days=aleatorio.randrange(1095))
+        itens.append({
+            "id": i + 1,
+            "descricao": f"despesa sintética {i}",
+            "valor": round(aleatorio.uniform(5, 2000), 2),
+            "data_vencimento": data,
+            "recorrencia": recorrente,
+            "fim_recorrencia": data + timedelta(days=365) if recorrente else None,
+            "id_categoria": aleatorio.randrange(1, 16),
+        })
+    return itens
+
+
+def montar_apps(itens: list) -> list:
+    from fastapi import FastAPI
+    from app.schemas.despesas import DespesaResponse
+
+    app = FastAPI()
+
+    @app.get("/dict")
+    async def como_dict():
+        return itens
+
+    @app.get("/modelo", response_model=List[DespesaResponse])
+    async def com_modelo():
+        return itens
+
+    variantes = [("dict", app, "/dict"), ("modelo", app, "/modelo")]
+
+    if ORJSON_DISPONIVEL:
+        from fastapi.responses import ORJSONResponse
+
+        @app.get("/orjson", response_class=ORJSONResponse)
+        async def com_orjson():
+            return itens
+
+        app_orjson = FastAPI(default_response_class=ORJSONResponse)
+
+        @app_orjson.get("/modelo", response_model=List[DespesaResponse])
+        async def com_modelo_orjson():
+            return itens
+
+        variantes[1:1] = [("orjson", app, "/orjson")]
+        variantes.append(("modelo+orjson", app_orjson, "/modelo"))
+    return variantes
+
+
+async def medir(app, caminho: str, repeticoes: int, aquecimento: int) -> dict:
+    import httpx
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for _ in range(aquecimento):
+            (await cliente.get(caminho)).raise_for_status()
+
+        tempos, tamanho = [], 0
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resposta = await cliente.get(caminho)
+            tempos.append(time.perf_counter() - inicio)
+            resposta.raise_for_status()
+            tamanho = len(resposta.content)
+
+    mediana = statistics.median(tempos)
+    return {
+        "bytes": tamanho,
+        "mediana_ms": round(mediana * 1000, 3),
+        "min_ms": round(min(tempos) * 1000, 3),
+        "mb_por_segundo": round(tamanho / mediana / 1e6, 2),
+    }
+
+
+async def executar(args) -> list:
+    itens = gerar_itens(args.itens, args.semente)
+    resultados = []
+    for nome, app, caminho in montar_apps(itens):
+        resultado = await medir(app, caminho, args.repeticoes, args.aquecimento)
+        resultados.append({"variante": nome, "itens": args.itens, **resultado})
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da serialização de respostas")
+    parser.add_argument("--itens", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--aquecimento", type=int, default=2)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    # ORJSONResponse é marcada como obsoleta nas versões recentes do FastAPI
+    warnings.filterwarnings("ignore", message="ORJSONResponse is deprecated")
+    if not ORJSON_DISPONIVEL:
+        print("orjson não instalado; variantes orjson omitidas", file=sys.stderr)
+
+    json.dump(asyncio.run(executar(args)), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
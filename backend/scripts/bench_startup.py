@@ -0,0 +1,124 @@
+"""Tempo até um worker ficar pronto e latência da primeira requisição.
+
+Cada repetição é um processo novo (como um worker recém-criado pelo uvicorn),
+que mede:
+
+- importacao_ms: import de app.main (routers, modelos, engine)
+- criacao_ms:    criar_app()
+- startup_ms:    lifespan até o yield (com AQUECER_STARTUP=1, o aquecimento)
+- pronto_ms:     do início do processo Python até o app pronto
+- primeira_ms / segunda_ms: primeira e segunda requisição de cada rota
+
+Roda com e sem aquecimento, sobre um SQLite temporário populado pelo
+gerar_dados ou sobre `--postgres URL` (já populado, com --id-login).
+
+Uso (a partir de backend/):
+    python -m scripts.bench_startup --repeticoes 5
+"""
+import time
+
+_INICIO_PROCESSO = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROTAS = ("/dashboard/resumo", "/detalhes-despesas", "/total-receitas")
+MES, ANO = 6, 2021
+
+
+async def medir_interno(id_login: int) -> dict:
+    import httpx
+
+    inicio = time.perf_counter()
+    import app.main
+    importado = time.perf_counter()
+    aplicacao = app.main.criar_app()
+    criado = time.perf_counter()
+
+    resultado = {
+        "importacao_ms": (importado - inicio) * 1000,
+        "criacao_ms": (criado - importado) * 1000,
+    }
+    async with aplicacao.router.lifespan_context(aplicacao):
+        pronto = time.perf_counter()
+        resultado["startup_ms"] = (pronto - criado) * 1000
+        resultado["pronto_ms"] = (pronto - _INICIO_PROCESSO) * 1000
+
+        transporte = httpx.ASGITransport(app=aplicacao)
+        params = {"id_login": id_login, "mes": MES, "ano": ANO}
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for rota in ROTAS:
+                for vez in ("primeira", "segunda"):
+                    antes = time.perf_counter()
+                    (await cliente.get(rota, params=params)).raise_for_status()
+                    resultado[f"{rota} {vez}_ms"] = (time.perf_counter() - antes) * 1000
+    return resultado
+
+
+def rodar_processo(url: str, id_login: int, aquecer: bool) -> dict:
+    ambiente = dict(os.environ, DATABASE_URL=url, AQUECER_STARTUP="1" if aquecer else "0")
+    # A segunda requisição não deve vir do cache de respostas
+    ambiente.setdefault("CACHE_RESPOSTAS_TAMANHO", "0")
+    inicio = time.perf_counter()
+    saida = subprocess.run(
+        [sys.executable, "-m", "scripts.bench_startup", "--interno", "--id-login", str(id_login)],
+        env=ambiente, capture_output=True, text=True,
+    )
+    if saida.returncode != 0:
+        sys.stderr.write(saida.stderr)
+        raise SystemExit("Processo do benchmark falhou")
+    resultado = json.loads(saida.stdout)
+    resultado["processo_ms"] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+
+def popular(url: str, linhas: int) -> int:
+    saida = subprocess.run(
+        [sys.executable, "-m", "scripts.gerar_dados", "--usuarios", "3", "--linhas", str(linhas), "--criar-tabelas"],
+        env=dict(os.environ, DATABASE_URL=url), capture_output=True, text=True,
+    )
+    if saida.returncode != 0:
+        sys.stderr.write(saida.stderr)
+        raise SystemExit("Falha ao gerar os dados")
+    return json.loads(saida.stdout)["ids_login"][0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do startup do worker e da primeira requisição")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--linhas", type=int, default=1000, help="lançamentos por usuário no SQLite gerado")
+    parser.add_argument("--postgres", help="URL de um Postgres já populado (use com --id-login)")
+    parser.add_argument("--id-login", type=int)
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        json.dump(asyncio.run(medir_interno(args.id_login)), sys.stdout)
+        return
+
+    if args.postgres:
+        if args.id_login is None:
+            parser.error("--postgres requer --id-login")
+        url, id_login = args.postgres, args.id_login
+    else:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+        id_login = popular(url, args.linhas)
+
+    relatorio = {"banco": url.split(":")[0], "repeticoes": args.repeticoes, "variantes": {}}
+    for aquecer in (False, True):
+        execucoes = [rodar_processo(url, id_login, aquecer) for _ in range(args.repeticoes)]
+        relatorio["variantes"]["com_aquecimento" if aquecer else "sem_aquecimento"] = {
+            medida: round(statistics.median(e[medida] for e in execucoes), 2) for medida in execucoes[0]
+        }
+    json.dump(relatorio, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Confere, via EXPLAIN, se as consultas de mês usam os índices da migration 005.
+
+Uso (a partir de backend/):  python -m scripts.explain_indices [id_login] [mes] [ano]
+"""
+import sys
+from datetime import date
+from sqlalchemy import select, func, text
+from app.db import engine
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+from app.utils import recorrencia
+
+
+def consultas(id_login, data_consulta):
+    for modelo in (Receitas, Despesas):
+        filtro = recorrencia.filtro_usuario_mes(modelo, id_login, data_consulta)
+        yield modelo.__tablename__, "total", select(func.sum(modelo.valor)).where(filtro)
+        yield modelo.__tablename__, "detalhes", select(modelo).where(filtro)
+
+
+def compilar(consulta):
+    return str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def plano(conn, sql):
+    if engine.dialect.name == "postgresql":
+        # Com tabelas pequenas o planner prefere Seq Scan; desligar mostra se o índice é utilizável
+        conn.execute(text("SET enable_seqscan = off"))
+        linhas = conn.execute(text("EXPLAIN " + sql)).scalars().all()
+        return "\n".join(linhas)
+    linhas = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+    return "\n".join(str(l[-1]) for l in linhas)
+
+
+def usa_indice(tabela, texto_plano):
+    if engine.dialect.name == "postgresql":
+        return f"Seq Scan on {tabela}" not in texto_plano
+    return f"SEARCH {tabela} USING" in texto_plano
+
+
+def main(argv):
+    id_login = int(argv[1]) if len(argv) > 1 else 1
+    hoje = date.today()
+    data_consulta = date(int(argv[3]) if len(argv) > 3 else hoje.year, int(argv[2]) if len(argv) > 2 else hoje.month, 1)
+
+    falhas = 0
+    with engine.connect() as conn:
+        for tabela, nome, consulta in consultas(id_login, data_consulta):
+            texto_plano = plano(conn, compilar(consulta))
+            ok = usa_indice(tabela, texto_plano)
+            falhas += not ok
+            print(f"== {tabela}/{nome}: {'OK' if ok else 'SEM ÍNDICE'}")
+            print(texto_plano)
+            print()
+        conn.rollback()
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,134 @@
+"""Gera usuários, receitas e despesas sintéticos (determinísticos pela semente).
+
+Usado pelos benchmarks, mas também serve para popular um banco de
+desenvolvimento.
+
+Uso (a partir de backend/):
+    python -m scripts.gerar_dados --usuarios 10 --linhas 1000 --recorrentes 0.2 --anos 3
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from sqlalchemy import insert, select, func
+from sqlalchemy.orm import Session
+
+CATEGORIAS_PADRAO = (
+    "Mercado", "Cartão de Crédito", "Gasolina", "Aluguel", "Transporte", "Educação", "Saúde",
+    "Lazer", "Assinaturas", "Restaurantes", "Internet", "Luz", "Água", "Celular", "Outros",
+)
+
+
+@dataclass
+class Parametros:
+    usuarios: int = 1
+    linhas: int = 1000              # receitas e despesas por usuário (cada tabela)
+    recorrentes: float = 0.2        # fração de lançamentos recorrentes
+    com_fim: float = 0.5            # fração dos recorrentes que têm fim_recorrencia
+    outras_regras: float = 0.0      # fração dos recorrentes semanais, anuais ou a cada N meses
+    inicio: date = date(2020, 1, 1)
+    anos: float = 3.0               # espalhamento das datas a partir de `inicio`
+    semente: int = 42
+
+
+def garantir_categorias(db: Session) -> list:
+    from app.models.categoria import Categoria
+
+    if not db.scalar(select(func.count()).select_from(Categoria)):
+        db.execute(insert(Categoria), [{"nome": nome} for nome in CATEGORIAS_PADRAO])
+    return list(db.scalars(select(Categoria.id)))
+
+
+def _lancamentos(aleatorio: random.Random, p: Parametros, id_login: int, categorias: list):
+    dias = max(1, int(p.anos * 365))
+    for _ in range(p.linhas):
+        for tipo in ("receita", "despesa"):
+            data = p.inicio + timedelta(days=aleatorio.randrange(dias))
+            recorrente = aleatorio.random() < p.recorrentes
+            fim = None
+            if recorrente and aleatorio.random() < p.com_fim:
+                fim = data + timedelta(days=aleatorio.randrange(30, dias + 31))
+            frequencia, intervalo = "mensal", 1
+            if recorrente and p.outras_regras and aleatorio.random() < p.outras_regras:
+                frequencia, intervalo = aleatorio.choice((("semanal", 1), ("semanal", 2), ("mensal", 3), ("anual", 1)))
+            linha = {
+                "id_login": id_login,
+                "descricao": f"{tipo} sintética",
+                "valor": round(aleatorio.uniform(5, 2000), 2),
+                "recorrencia": recorrente,
+                "fim_recorrencia": fim,
+                "frequencia": frequencia,
+                "intervalo": intervalo,
+            }
+            if tipo == "receita":
+                linha["data_recebimento"] = data
+            else:
+                linha["data_vencimento"] = data
+                linha["id_categoria"] = aleatorio.choice(categorias)
+            yield tipo, linha
+
+
+def gerar(db: Session, p: Parametros) -> list:
+    """Cria `p.usuarios` logins com seus lançamentos e devolve os ids criados."""
+    from app.models.login import Login
+    from app.models.receitas import Receitas
+    from app.models.despesas import Despesas
+    from app.utils.snapshot import marcar_alterados
+
+    aleatorio = random.Random(p.semente)
+    categorias = garantir_categorias(db)
+    prefixo = f"sintetico-{p.semente}-{time.time_ns()}"
+    ids = []
+
+    for u in range(p.usuarios):
+        login = Login(email=f"{prefixo}-{u}@mywallet.com", senha="-")
+        db.add(login)
+        db.flush()
+        ids.append(login.id)
+
+        receitas, despesas = [], []
+        for tipo, linha in _lancamentos(aleatorio, p, login.id, categorias):
+            (receitas if tipo == "receita" else despesas).append(linha)
+
+        db.execute(insert(Receitas), receitas)
+        db.execute(insert(Despesas), despesas)
+
+    marcar_alterados(db, ids)
+    db.commit()
+    return ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no DATABASE_URL")
+    padrao = Parametros()
+    parser.add_argument("--usuarios", type=int, default=padrao.usuarios)
+    parser.add_argument("--linhas", type=int, default=padrao.linhas, help="receitas e despesas por usuário")
+    parser.add_argument("--recorrentes", type=float, default=padrao.recorrentes)
+    parser.add_argument("--com-fim", type=float, default=padrao.com_fim)
+    parser.add_argument("--outras-regras", type=float, default=padrao.outras_regras)
+    parser.add_argument("--inicio", type=date.fromisoformat, default=padrao.inicio)
+    parser.add_argument("--anos", type=float, default=padrao.anos)
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    parser.add_argument("--criar-tabelas", action="store_true", help="create_all antes de gerar (bancos vazios)")
+    args = parser.parse_args(argv)
+
+    import app.main  # registra todos os modelos no metadata
+    from app.db import Base, engine
+
+    if args.criar_tabelas:
+        Base.metadata.create_all(engine)
+    parametros = Parametros(
+        usuarios=args.usuarios, linhas=args.linhas, recorrentes=args.recorrentes, com_fim=args.com_fim,
+        outras_regras=args.outras_regras, inicio=args.inicio, anos=args.anos, semente=args.semente,
+    )
+    with Session(engine) as db:
+        ids = gerar(db, parametros)
+    json.dump({"parametros": asdict(parametros), "ids_login": ids}, sys.stdout, default=str, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+# Antes de importar o app: app.db cria o engine a partir do DATABASE_URL no import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'testes.db')}")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("HASH_WORKERS", "0")
+os.environ.setdefault("AQUECER_STARTUP", "0")
+os.environ.setdefault("CACHE_RESPOSTAS_TAMANHO", "0")
+os.environ.setdefault("LIMITE_TAXA", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.main import criar_app
+from app.db import Base, engine
+from app.models.categoria import Categoria
+from app.models.estados import Estados
+from app.utils.cache_respostas import cache_respostas, ArmazenamentoMemoria
+from app.utils.snapshot import cache_snapshots
+
+# "Outros" vem da migrations/006_insert_categoria_outros.sql (usada pela importação)
+CATEGORIAS = ("Alimentação", "Transporte", "Moradia", "Lazer", "Saúde", "Outros")
+
+
+@pytest.fixture(scope="session")
+def banco():
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([Categoria(id=i, nome=nome) for i, nome in enumerate(CATEGORIAS, start=1)])
+        db.add(Estados(id=1, nome="São Paulo", sigla="SP"))
+        db.commit()
+    yield engine
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture(scope="session")
+def cliente(banco):
+    with TestClient(criar_app()) as c:
+        yield c
+
+
+@pytest.fixture
+def cache_ligado(monkeypatch):
+    # Os testes rodam com o cache de respostas desligado; as versões do
+    # armazenamento novo não valem para os snapshots já em memória
+    monkeypatch.setattr(cache_respostas, "ativo", True)
+    monkeypatch.setattr(cache_respostas, "armazenamento", ArmazenamentoMemoria(tamanho_max=100))
+    cache_snapshots.limpar()
+    yield cache_respostas
+    cache_snapshots.limpar()
@@ -0,0 +1,163 @@
+"""Agregações mensais comparadas com o laço em Python que existia antes.
+
+Os lançamentos são sorteados (normais, recorrentes sem fim, recorrentes com
+fim, inclusive com fim antes do início) e cada endpoint é comparado, mês a
+mês, com a regra original: um normal conta no mês da data; um recorrente
+conta de mês da data até o mês do fim, inclusive.
+"""
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+import pytest
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import Session
+from app.models.login import Login
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+from app.utils import recorrencia
+from app.utils.snapshot import Lancamentos, marcar_alterados
+from conftest import CATEGORIAS
+
+SEMENTES = (1, 7, 2024)
+MESES = [date(2021, 1, 1) + relativedelta(months=i) for i in range(72)]
+
+
+def _data(aleatorio) -> date:
+    return date(2021, 1, 1) + timedelta(days=aleatorio.randrange(6 * 365))
+
+
+def _sortear(aleatorio, id_login: int, n: int):
+    receitas, despesas = [], []
+    for i in range(n):
+        data = _data(aleatorio)
+        recorrente = aleatorio.random() < 0.3
+        fim = None
+        if recorrente and aleatorio.random() < 0.5:
+            # Às vezes antes da data: recorrência que nunca fica ativa
+            fim = data + timedelta(days=aleatorio.randrange(-60, 900))
+        comum = dict(
+            id_login=id_login, descricao=f"l{i}", valor=round(aleatorio.uniform(1, 500), 2),
+            recorrencia=recorrente, fim_recorrencia=fim,
+        )
+        if aleatorio.random() < 0.5:
+            receitas.append(Receitas(data_recebimento=data, **comum))
+        else:
+            despesas.append(Despesas(data_vencimento=data, id_categoria=aleatorio.randint(1, len(CATEGORIAS)), **comum))
+    return receitas, despesas
+
+
+def _ativo(data: date, recorrente: bool, fim, mes: date) -> bool:
+    # Laço original dos endpoints
+    data_base = data.replace(day=1)
+    fim = fim.replace(day=1) if fim else None
+    if not recorrente:
+        return data_base == mes
+    return mes >= data_base and (fim is None or mes <= fim)
+
+
+def _receitas_no_mes(receitas, mes):
+    return [r for r in receitas if _ativo(r.data_recebimento, r.recorrencia, r.fim_recorrencia, mes)]
+
+
+def _despesas_no_mes(despesas, mes):
+    return [d for d in despesas if _ativo(d.data_vencimento, d.recorrencia, d.fim_recorrencia, mes)]
+
+
+@pytest.fixture(scope="module", params=SEMENTES)
+def usuario(request, banco):
+    aleatorio = random.Random(request.param)
+    with Session(banco) as db:
+        login = Login(email=f"agregacoes-{request.param}@mywallet.com", senha="-")
+        db.add(login)
+        db.flush()
+        id_login = login.id
+        receitas, despesas = _sortear(aleatorio, id_login, 400)
+        db.add_all(receitas + despesas)
+        marcar_alterados(db, [id_login])
+        db.commit()
+        for linha in receitas + despesas:
+            db.refresh(linha)
+        db.expunge_all()
+    return id_login, receitas, despesas
+
+
+def _params(id_login, mes):
+    return {"id_login": id_login, "mes": mes.month, "ano": mes.year}
+
+
+def test_totais_do_mes(cliente, usuario):
+    id_login, receitas, despesas = usuario
+    for mes in MESES:
+        esperado_r = sum(r.valor for r in _receitas_no_mes(receitas, mes))
+        esperado_d = sum(d.valor for d in _despesas_no_mes(despesas, mes))
+        assert cliente.get("/total-receitas", params=_params(id_login, mes)).json()["total"] == pytest.approx(esperado_r)
+        assert cliente.get("/total-despesas", params=_params(id_login, mes)).json()["total"] == pytest.approx(esperado_d)
+
+
+def test_detalhes_do_mes(cliente, usuario):
+    id_login, receitas, despesas = usuario
+    for mes in MESES:
+        ids_r = sorted(r.id for r in _receitas_no_mes(receitas, mes))
+        ids_d = sorted(d.id for d in _despesas_no_mes(despesas, mes))
+        assert sorted(r["id"] for r in cliente.get("/detalhes-receitas", params=_params(id_login, mes)).json()) == ids_r
+        assert sorted(d["id"] for d in cliente.get("/detalhes-despesas", params=_params(id_login, mes)).json()) == ids_d
+
+
+def test_contagens_de_despesas(cliente, usuario):
+    id_login, _, despesas = usuario
+    for mes in MESES:
+        ativas = _despesas_no_mes(despesas, mes)
+
+        por_dia = defaultdict(int)
+        por_categoria = defaultdict(int)
+        for d in ativas:
+            por_dia[d.data_vencimento.day] += 1
+            por_categoria[CATEGORIAS[d.id_categoria - 1]] += 1
+
+        resposta = cliente.get("/contagem-despesas-por-dia-vencimento", params=_params(id_login, mes)).json()
+        assert resposta == [{"dia": dia, "quantidade": qtd} for dia, qtd in sorted(por_dia.items())]
+
+        resposta = cliente.get("/contagem-despesas-por-categoria", params=_params(id_login, mes)).json()
+        assert {c["categoria"]: c["quantidade"] for c in resposta} == por_categoria
+
+
+def test_contagem_por_recorrencia(cliente, usuario):
+    id_login, receitas, despesas = usuario
+    for mes in MESES:
+        for rota, ativos in (
+            ("/total-receitas-recorrencia", _receitas_no_mes(receitas, mes)),
+            ("/total-despesas-recorrencia", _despesas_no_mes(despesas, mes)),
+        ):
+            resposta = cliente.get(rota, params=_params(id_login, mes)).json()
+            assert resposta["recorrentes"] == sum(1 for l in ativos if l.recorrencia)
+            assert resposta["nao_recorrentes"] == sum(1 for l in ativos if not l.recorrencia)
+
+
+def test_periodo_de_seis_meses(cliente, usuario):
+    id_login, receitas, despesas = usuario
+    for mes in MESES[3:-2]:
+        meses = [mes + relativedelta(months=i) for i in range(-3, 3)]
+        esperado = [
+            {"mes": m.month, "ano": m.year, "valor": pytest.approx(sum(r.valor for r in _receitas_no_mes(receitas, m)))}
+            for m in meses
+        ]
+        assert cliente.get("/total-receitas-periodo", params=_params(id_login, mes)).json() == esperado
+
+        esperado = [
+            {"mes": m.month, "ano": m.year, "valor": pytest.approx(sum(d.valor for d in _despesas_no_mes(despesas, m)))}
+            for m in meses
+        ]
+        assert cliente.get("/total-despesas-periodo", params=_params(id_login, mes)).json() == esperado
+
+
+def test_indice_ignora_recorrentes_encerrados():
+    # Um recorrente sem fim não pode alargar a busca dos que têm fim
+    linhas = [(1, date(2021, 1, 5), 10, True, None, "mensal", 1, 1)]
+    linhas += [(i, date(2021, 1, 5), 1, True, date(2021, 3, 1), "mensal", 1, 1) for i in range(2, 102)]
+    linhas.append((200, date(2024, 5, 5), 2, True, date(2024, 8, 1), "mensal", 1, 1))
+    lancamentos = Lancamentos.montar(linhas)
+
+    assert lancamentos.recorrentes.duracao_max == 3
+    mes = recorrencia.indice_mes(date(2024, 6, 1))
+    assert len(lancamentos.recorrentes.sobrepostas(mes, mes)) == 1
+    assert lancamentos.total(mes) == 12
@@ -0,0 +1,121 @@
+"""Custo por requisição dos endpoints de agregação em 100, 1k e 10k linhas por usuário.
+
+Casos do pytest-benchmark, fora da execução padrão (marcador `bench`):
+
+    pytest -m bench --benchmark-json bench.json
+    pytest -m bench --benchmark-compare       # contra a última execução salva com --benchmark-autosave
+
+Sempre no SQLite dos testes e, se BENCH_POSTGRES_URL responder, também no
+Postgres (as rotas recebem sessões desse banco via dependency_overrides). O
+cache de respostas fica desligado (conftest): mede-se o cálculo da resposta.
+"""
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from app import db as app_db
+from app.db import Base, SessaoSincrona, get_db
+from app.utils.snapshot import cache_snapshots
+from scripts.gerar_dados import Parametros, gerar
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.bench
+
+TAMANHOS = (100, 1000, 10000)
+BANCOS = ("sqlite", "postgresql")
+
+MES, ANO = 6, 2021
+
+ENDPOINTS = (
+    "/total-receitas",
+    "/total-despesas",
+    "/detalhes-receitas",
+    "/detalhes-despesas",
+    "/contagem-despesas-por-dia-vencimento",
+    "/contagem-despesas-por-categoria",
+    "/total-receitas-periodo",
+    "/total-despesas-periodo",
+    "/total-receitas-recorrencia",
+    "/total-despesas-recorrencia",
+    "/serie-receitas",
+    "/serie-despesas",
+    "/dashboard/resumo",
+    # A projeção deve custar quase o mesmo para 1 e para 120 meses
+    "/projecao-saldo?meses=1",
+    "/projecao-saldo?meses=120",
+)
+
+
+def _postgres():
+    url = os.getenv("BENCH_POSTGRES_URL")
+    if not url:
+        pytest.skip("defina BENCH_POSTGRES_URL para medir também no Postgres")
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+    except Exception as e:
+        engine.dispose()
+        pytest.skip(f"Postgres indisponível ({e.__class__.__name__})")
+    return engine
+
+
+def _get_db_de(engine):
+    url_async = app_db._url_assincrona(engine.url.render_as_string(hide_password=False))
+    if url_async is not None:
+        fabrica = async_sessionmaker(
+            create_async_engine(url_async), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    else:
+        fabrica_sincrona = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        class fabrica(SessaoSincrona):
+            def __init__(self):
+                self.sync_session = fabrica_sincrona()
+
+    async def get_db_bench():
+        async with fabrica() as sessao:
+            yield sessao
+    return get_db_bench
+
+
+@pytest.fixture(scope="module", params=BANCOS)
+def banco_bench(request, banco, cliente):
+    if request.param == "sqlite":
+        engine = banco
+    else:
+        engine = _postgres()
+        Base.metadata.create_all(engine)
+        cliente.app.dependency_overrides[get_db] = _get_db_de(engine)
+
+    # Os ids de usuário se repetem entre os bancos
+    cache_snapshots.limpar()
+    yield engine
+
+    cliente.app.dependency_overrides.pop(get_db, None)
+    cache_snapshots.limpar()
+    if engine is not banco:
+        engine.dispose()
+
+
+@pytest.fixture(scope="module", params=TAMANHOS)
+def usuario_bench(request, banco_bench):
+    # Alguns usuários vizinhos, para os índices trabalharem como em produção
+    parametros = Parametros(usuarios=3, linhas=request.param, recorrentes=0.2, anos=3.0, semente=42)
+    with Session(banco_bench) as db:
+        return gerar(db, parametros)[0], request.param
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_endpoint(benchmark, cliente, banco_bench, usuario_bench, endpoint):
+    id_login, linhas = usuario_bench
+    benchmark.group = f"{banco_bench.dialect.name}-{linhas}"
+    benchmark.extra_info.update(banco=banco_bench.dialect.name, linhas_por_usuario=linhas)
+
+    caminho, _, extra = endpoint.partition("?")
+    params = {"id_login": id_login, "mes": MES, "ano": ANO, **dict(p.split("=") for p in extra.split("&") if p)}
+
+    resposta = benchmark(cliente.get, caminho, params=params)
+    assert resposta.status_code == 200
@@ -0,0 +1,98 @@
+"""Com o cache de respostas ligado, uma escrita nunca deixa servir a resposta antiga.
+
+Cada escrita incrementa a versão do usuário no commit (snapshot._apos_commit);
+as respostas guardadas com a versão anterior deixam de ser lidas.
+"""
+import time
+import pytest
+from sqlalchemy.orm import Session
+from app.models.login import Login
+from app.utils.metricas import cache_respostas as metrica_cache
+
+PARAMS = {"mes": 6, "ano": 2024}
+
+
+@pytest.fixture
+def id_login(banco):
+    with Session(banco) as db:
+        login = Login(email=f"cache-{time.monotonic_ns()}@mywallet.com", senha="-")
+        db.add(login)
+        db.commit()
+        return login.id
+
+
+def _get(cliente, rota, id_login):
+    resposta = cliente.get(rota, params={**PARAMS, "id_login": id_login})
+    assert resposta.status_code == 200
+    return resposta.json()
+
+
+def _total(cliente, rota, id_login):
+    # A segunda leitura tem de vir do cache, senão o teste não prova nada
+    acertos = metrica_cache.valores.get((rota, "acerto"), 0)
+    primeira = _get(cliente, rota, id_login)
+    assert _get(cliente, rota, id_login) == primeira
+    assert metrica_cache.valores.get((rota, "acerto"), 0) == acertos + 1
+    return primeira["total"]
+
+
+def test_escritas_de_receita(cliente, cache_ligado, id_login):
+    assert _total(cliente, "/total-receitas", id_login) == 0
+
+    receita = {
+        "id_login": id_login, "descricao": "salário", "valor": 10,
+        "data_recebimento": "2024-06-05", "recorrencia": False,
+    }
+    id_receita = cliente.post("/inserir-receita", json=receita).json()["receita_id"]
+    assert _total(cliente, "/total-receitas", id_login) == 10
+
+    cliente.put(f"/update-receita/{id_receita}", json={**receita, "valor": 25, "recorrencia": True})
+    assert _total(cliente, "/total-receitas", id_login) == 25
+
+    cliente.put(f"/fim-recorrencia-receita/{id_receita}", json={"fim_recorrencia": "2024-05-31"})
+    assert _total(cliente, "/total-receitas", id_login) == 0
+
+    cliente.post("/inserir-receitas/lote", json=[{**receita, "valor": 1}, {**receita, "valor": 2}])
+    assert _total(cliente, "/total-receitas", id_login) == 3
+
+    cliente.delete(f"/delete-receita/{id_receita}")
+    assert _total(cliente, "/total-receitas", id_login) == 3
+
+
+def test_escritas_de_despesa_no_resumo(cliente, cache_ligado, id_login):
+    vazio = _get(cliente, "/dashboard/resumo", id_login)
+    assert vazio["despesas_por_categoria"] == []
+    assert _total(cliente, "/total-despesas", id_login) == 0
+
+    despesa = {
+        "id_login": id_login, "descricao": "aluguel", "valor": 40,
+        "data_vencimento": "2024-06-10", "recorrencia": False, "id_categoria": 3,
+    }
+    id_despesa = cliente.post("/inserir-despesa", json=despesa).json()["despesa_id"]
+    resumo = _get(cliente, "/dashboard/resumo", id_login)
+    assert resumo["despesas_por_dia_vencimento"] == [{"dia": 10, "quantidade": 1}]
+    assert resumo["despesas_periodo"][3]["valor"] == 40
+    assert _total(cliente, "/total-despesas", id_login) == 40
+
+    cliente.delete(f"/delete-despesa/{id_despesa}")
+    assert _get(cliente, "/dashboard/resumo", id_login) == vazio
+    assert _total(cliente, "/total-despesas", id_login) == 0
+
+
+def test_importacao_em_thread(cliente, cache_ligado, id_login):
+    assert _total(cliente, "/total-receitas", id_login) == 0
+    assert _total(cliente, "/total-despesas", id_login) == 0
+
+    extrato = "data;descricao;valor\n05/06/2024;PIX recebido;150,00\n07/06/2024;Mercado;-42,50\n"
+    job = cliente.post(
+        "/importar-extrato", params={"id_login": id_login, "formato": "csv"}, content=extrato.encode()
+    ).json()
+    limite = time.monotonic() + 10
+    while job["status"] in ("pendente", "processando") and time.monotonic() < limite:
+        time.sleep(0.02)
+        job = cliente.get(f"/importar-extrato/{job['job_id']}").json()
+    assert job["status"] == "concluido", job["mensagem"]
+
+    # O after_commit da importação roda na thread do job e incrementa a mesma versão
+    assert _total(cliente, "/total-receitas", id_login) == 150
+    assert _total(cliente, "/total-despesas", id_login) == 42.5
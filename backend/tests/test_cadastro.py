@@ -0,0 +1,33 @@
+"""Cadastro com e-mail repetido responde sem rodar o bcrypt."""
+from app.utils import security
+
+CADASTRO = {
+    "email": "cadastro@mywallet.com",
+    "senha": "abcdef",
+    "confirmar_senha": "abcdef",
+    "nome": "Ana",
+    "sobrenome": "Souza",
+    "data_nascimento": "2000-01-01",
+    "endereco": {"cep": "01001000", "id_estado": 1, "bairro": "Sé", "rua": "Praça da Sé", "numero": "1", "complemento": "-"},
+}
+
+
+def test_email_repetido_nao_faz_hash(cliente, monkeypatch):
+    hashes = []
+    original = security.hash_senha_async
+
+    async def contar(senha):
+        hashes.append(senha)
+        return await original(senha)
+
+    monkeypatch.setattr(security, "hash_senha_async", contar)
+
+    resposta = cliente.post("/cadastro", json=CADASTRO)
+    assert resposta.status_code == 200
+    assert resposta.json()["access_token"]
+    assert len(hashes) == 1
+
+    resposta = cliente.post("/cadastro", json=CADASTRO)
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == "E-mail já cadastrado."
+    assert len(hashes) == 1
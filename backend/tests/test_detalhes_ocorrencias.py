@@ -0,0 +1,64 @@
+"""Detalhes do mês com regras que ocorrem mais de uma vez no mês.
+
+Cada lançamento aparece uma vez nos detalhes, com quantas vezes ocorre no mês
+e o valor correspondente; a soma de total_no_mes bate com o total do mês.
+"""
+import json
+from datetime import date
+import pytest
+from sqlalchemy.orm import Session
+from app.models.login import Login
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+from app.utils.snapshot import marcar_alterados
+
+# Julho de 2024 tem cinco segundas-feiras (1, 8, 15, 22 e 29)
+PARAMS = {"mes": 7, "ano": 2024}
+
+
+@pytest.fixture(scope="module")
+def id_login(banco):
+    with Session(banco) as db:
+        login = Login(email="ocorrencias@mywallet.com", senha="-")
+        db.add(login)
+        db.flush()
+        regras = dict(recorrencia=True, frequencia="semanal", intervalo=1)
+        db.add_all([
+            Receitas(id_login=login.id, descricao="semanal", valor=5, data_recebimento=date(2024, 7, 1), **regras),
+            Receitas(id_login=login.id, descricao="salário", valor=100, data_recebimento=date(2024, 7, 5), recorrencia=False),
+            Despesas(
+                id_login=login.id, descricao="semanal", valor=5, data_vencimento=date(2024, 7, 1),
+                id_categoria=1, **regras,
+            ),
+            # A cada duas semanas: 1, 15 e 29
+            Despesas(
+                id_login=login.id, descricao="quinzenal", valor=10, data_vencimento=date(2024, 7, 1),
+                id_categoria=2, recorrencia=True, frequencia="semanal", intervalo=2,
+            ),
+        ])
+        marcar_alterados(db, [login.id])
+        db.commit()
+        return login.id
+
+
+@pytest.mark.parametrize("tipo", ["receitas", "despesas"])
+def test_detalhes_trazem_ocorrencias(cliente, id_login, tipo):
+    params = {**PARAMS, "id_login": id_login}
+    total = cliente.get(f"/total-{tipo}", params=params).json()["total"]
+
+    lista = cliente.get(f"/detalhes-{tipo}", params=params).json()
+    pagina = cliente.get(f"/detalhes-{tipo}/pagina", params={**params, "limit": 10}).json()["itens"]
+    stream = [json.loads(linha) for linha in cliente.get(f"/detalhes-{tipo}/stream", params=params).text.splitlines()]
+
+    for itens in (lista, pagina, stream):
+        por_descricao = {i["descricao"]: (i["ocorrencias"], i["total_no_mes"]) for i in itens}
+        assert len(itens) == len(por_descricao)
+        assert por_descricao["semanal"] == (5, 25)
+        assert sum(i["total_no_mes"] for i in itens) == pytest.approx(total)
+
+    if tipo == "receitas":
+        assert total == 125
+        assert {i["descricao"]: i["ocorrencias"] for i in lista}["salário"] == 1
+    else:
+        assert total == 55
+        assert {i["descricao"]: i["ocorrencias"] for i in lista}["quinzenal"] == 3
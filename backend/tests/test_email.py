@@ -0,0 +1,117 @@
+"""Caixa de saída contra um servidor SMTP local (aiosmtpd)."""
+import asyncio
+import socket
+import pytest
+from app.utils.email import CaixaSaida
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class Servidor:
+    """Guarda os destinatários recebidos e a conexão (porta do cliente) de cada um."""
+
+    def __init__(self):
+        self.recebidos = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recebidos.append((session.peer, envelope.rcpt_tos[0]))
+        return "250 OK"
+
+    @property
+    def destinatarios(self):
+        return [destinatario for _, destinatario in self.recebidos]
+
+    @property
+    def conexoes(self):
+        return {peer for peer, _ in self.recebidos}
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    servidor = Servidor()
+    c = controller.Controller(servidor, hostname="127.0.0.1", port=_porta_livre())
+    c.start()
+    yield servidor, c.port
+    c.stop()
+
+
+def _caixa(porta, **kwargs):
+    return CaixaSaida("127.0.0.1", porta, None, None, starttls=False, **kwargs)
+
+
+def _destinatarios(n):
+    return [f"usuario{i}@mywallet.com" for i in range(n)]
+
+
+def test_lotes_na_mesma_conexao(smtp):
+    servidor, porta = smtp
+
+    async def rodar():
+        caixa = _caixa(porta, tamanho_lote=2)
+        for destinatario in _destinatarios(5):
+            assert caixa.enfileirar(destinatario, "Assunto", "Corpo")
+        caixa.iniciar()
+        await asyncio.wait_for(caixa.fila.join(), timeout=5)
+        # Três lotes (2 + 2 + 1) e a conexão continua aberta entre eles
+        assert caixa._smtp is not None
+        await caixa.encerrar()
+
+    asyncio.run(rodar())
+    assert servidor.destinatarios == _destinatarios(5)
+    assert len(servidor.conexoes) == 1
+
+
+def test_nova_tentativa_depois_de_conexao_recusada():
+    porta = _porta_livre()
+    servidor = Servidor()
+
+    async def rodar():
+        caixa = _caixa(porta, backoff_inicial=0.2)
+        conexoes = []
+        conectar = caixa._conectar
+
+        def contar():
+            conexoes.append(porta)
+            return conectar()
+
+        caixa._conectar = contar
+        caixa.enfileirar("atrasado@mywallet.com", "Assunto", "Corpo")
+        caixa.iniciar()
+
+        # Ninguém escuta na porta: a primeira tentativa é recusada
+        while not conexoes:
+            await asyncio.sleep(0.01)
+        c = controller.Controller(servidor, hostname="127.0.0.1", port=porta)
+        await asyncio.to_thread(c.start)
+        try:
+            await asyncio.wait_for(caixa.fila.join(), timeout=5)
+            await caixa.encerrar()
+        finally:
+            await asyncio.to_thread(c.stop)
+        return len(conexoes)
+
+    assert asyncio.run(rodar()) == 2
+    assert servidor.destinatarios == ["atrasado@mywallet.com"]
+
+
+def test_encerrar_esvazia_a_fila(smtp):
+    servidor, porta = smtp
+
+    async def rodar():
+        caixa = _caixa(porta, tamanho_lote=3)
+        caixa.iniciar()
+        for destinatario in _destinatarios(10):
+            caixa.enfileirar(destinatario, "Assunto", "Corpo")
+        # Encerra logo depois de enfileirar: nada pode ficar para trás
+        await caixa.encerrar(prazo=5)
+        assert caixa.fila.empty()
+        assert caixa._smtp is None
+
+    asyncio.run(rodar())
+    assert servidor.destinatarios == _destinatarios(10)
@@ -0,0 +1,61 @@
+"""Valores do extrato: o último separador é o decimal; os ambíguos viram erro de linha."""
+import io
+import pytest
+from app.utils import extrato
+
+
+@pytest.mark.parametrize("texto, valor", [
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("1234.56", 1234.56),
+    ("1234,5", 1234.5),
+    ("R$ -1.234,56", -1234.56),
+    ("1.234.567", 1234567),
+    ("1,234,567.89", 1234567.89),
+    ("0,50", 0.5),
+    ("-10", -10),
+])
+def test_converter_valor(texto, valor):
+    assert extrato.converter_valor(texto) == valor
+
+
+@pytest.mark.parametrize("texto", ["1,234", "1.234", "1.234.56", "12,34.567", "1.234,5,6", "1e5", "nan", "-", ""])
+def test_converter_valor_rejeita(texto):
+    with pytest.raises(ValueError):
+        extrato.converter_valor(texto)
+
+
+def test_csv():
+    arquivo = io.StringIO(
+        "data;descricao;valor\n"
+        "05/06/2024;salário;1.234,56\n"
+        "06/06/2024;mercado;-1,234.56\n"
+        "07/06/2024;ambíguo;1,234\n"
+        "08/06/2024;padaria;-12,5\n"
+    )
+    itens = list(extrato.ler_csv(arquivo))
+
+    assert [(i.linha, i.valor) for i in itens if isinstance(i, extrato.Lancamento)] == [
+        (2, 1234.56), (3, -1234.56), (5, -12.5),
+    ]
+    erros = [i for i in itens if isinstance(i, extrato.ErroLinha)]
+    assert [e.linha for e in erros] == [4]
+    assert "ambíguo" in str(erros[0])
+
+
+def _ofx(*valores):
+    transacoes = "".join(
+        f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240605<TRNAMT>{v}<MEMO>item {i}</STMTTRN>"
+        for i, v in enumerate(valores)
+    )
+    return io.StringIO(f"OFXHEADER:100\n<OFX><BANKTRANLIST>{transacoes}</BANKTRANLIST></OFX>")
+
+
+def test_ofx():
+    # No OFX o separador é sempre decimal, mesmo com três casas
+    itens = list(extrato.ler_ofx(_ofx("-50.00", "-50,25", "1.234", "1.234,56")))
+
+    assert [(i.linha, i.valor) for i in itens if isinstance(i, extrato.Lancamento)] == [
+        (1, -50.0), (2, -50.25), (3, 1.234),
+    ]
+    assert [i.linha for i in itens if isinstance(i, extrato.ErroLinha)] == [4]
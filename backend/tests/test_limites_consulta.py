@@ -0,0 +1,132 @@
+"""Parâmetros fora do intervalo de datas respondem 4xx, não 500.
+
+O usuário tem regras semanais sem fim, que são expandidas até dezembro de 9999.
+"""
+from datetime import date
+import pytest
+from sqlalchemy.orm import Session
+from app.models.login import Login
+from app.models.receitas import Receitas
+from app.models.despesas import Despesas
+from app.utils import recorrencia
+from app.utils.snapshot import marcar_alterados
+
+BASE = {"mes": 6, "ano": 2024}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def usuario(banco):
+    with Session(banco) as db:
+        login = Login(email="limites@mywallet.com", senha="-")
+        db.add(login)
+        db.flush()
+        semanal = dict(recorrencia=True, frequencia="semanal", intervalo=1)
+        db.add_all([
+            Receitas(id_login=login.id, descricao="semanal", valor=5, data_recebimento=date(2024, 1, 1), **semanal),
+            Despesas(
+                id_login=login.id, descricao="semanal", valor=3, data_vencimento=date(2024, 1, 2),
+                id_categoria=1, **semanal,
+            ),
+            Despesas(
+                id_login=login.id, descricao="mensal", valor=7, data_vencimento=date(2024, 1, 3),
+                id_categoria=2, recorrencia=True,
+            ),
+        ])
+        marcar_alterados(db, [login.id])
+        db.commit()
+        BASE["id_login"] = login.id
+
+
+@pytest.mark.parametrize("rota", ["/serie-receitas", "/serie-despesas"])
+@pytest.mark.parametrize("params, status", [
+    ({"inicio": -30000}, 422),
+    ({"fim": 30000}, 422),
+    ({"ano": 10000}, 422),
+    ({"ano": 9999, "mes": 12, "inicio": 0, "fim": 1}, 400),
+    ({"ano": 9999, "mes": 12, "inicio": -2, "fim": 0}, 200),
+])
+def test_serie(cliente, rota, params, status):
+    assert cliente.get(rota, params={**BASE, **params}).status_code == status
+
+
+@pytest.mark.parametrize("rota, status", [
+    ("/total-receitas", 200),
+    ("/total-despesas", 200),
+    # A janela vai até dois meses depois da referência
+    ("/total-receitas-periodo", 400),
+    ("/total-despesas-periodo", 400),
+    ("/dashboard/resumo", 400),
+])
+def test_fim_do_calendario(cliente, rota, status):
+    assert cliente.get(rota, params={**BASE, "ano": 10000}).status_code == 422
+    assert cliente.get(rota, params={**BASE, "ano": 9999, "mes": 12}).status_code == status
+
+
+@pytest.mark.parametrize("rota", [
+    "/detalhes-receitas",
+    "/detalhes-receitas/pagina",
+    "/detalhes-receitas/stream",
+    "/detalhes-despesas",
+    "/detalhes-despesas/pagina",
+    "/detalhes-despesas/stream",
+    "/contagem-despesas-por-categoria",
+])
+@pytest.mark.parametrize("params, status", [
+    ({"mes": 13}, 422),
+    ({"mes": 0}, 422),
+    ({"ano": 0}, 422),
+    ({"ano": 10000}, 422),
+    ({"ano": 9999, "mes": 12}, 200),
+])
+def test_detalhes_e_contagens(cliente, rota, params, status):
+    assert cliente.get(rota, params={**BASE, **params}).status_code == status
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"saldo_inicial": "inf"}, 422),
+    ({"saldo_inicial": "-inf"}, 422),
+    ({"saldo_inicial": "nan"}, 422),
+    ({"saldo_inicial": "1e300"}, 422),
+    ({"saldo_inicial": "1500.25"}, 200),
+    ({"ano": 10000}, 422),
+    ({"ano": 9999, "mes": 12, "meses": 120}, 400),
+    ({"ano": 9999, "mes": 12, "meses": 1}, 200),
+])
+def test_projecao(cliente, params, status):
+    assert cliente.get("/projecao-saldo", params={**BASE, **params}).status_code == status
+
+
+def test_semanais_em_dezembro_de_9999(cliente):
+    params = {**BASE, "ano": 9999, "mes": 12}
+    # Dezembro de 9999 tem quatro segundas e quatro terças (os dias das semanais)
+    assert cliente.get("/total-receitas", params=params).json()["total"] == 4 * 5
+    assert cliente.get("/total-despesas", params=params).json()["total"] == 4 * 3 + 7
+    assert cliente.get("/serie-receitas", params={**params, "inicio": -1, "fim": 0}).json()[-1]["valor"] == 4 * 5
+    projecao = cliente.get("/projecao-saldo", params={**params, "meses": 1})
+    assert projecao.status_code == 200
+    detalhes = cliente.get("/detalhes-despesas", params=params).json()
+    assert sorted((d["descricao"], d["ocorrencias"]) for d in detalhes) == [("mensal", 1), ("semanal", 4)]
+
+
+def test_exportacao_ate_o_fim_do_calendario(cliente):
+    resposta = cliente.get("/exportar", params={"id_login": BASE["id_login"], "inicio": "9999-01-01", "fim": "9999-12-31"})
+    assert resposta.status_code == 200
+    linhas = resposta.text.splitlines()
+    # Cabeçalho, 52 segundas e 52 terças de 9999 e uma mensal por mês
+    assert len(linhas) == 1 + 52 + 52 + 12
+    assert max(linha.split(",")[4] for linha in linhas[1:]) == "9999-12-28"
+
+
+@pytest.mark.parametrize("inicio, fim, status", [
+    ("1899-12-31", "1900-02-01", 400),
+    ("9999-01-01", "10000-01-01", 422),
+    ("2024-02-01", "2024-01-01", 400),
+])
+def test_exportacao_fora_do_intervalo(cliente, inicio, fim, status):
+    params = {"id_login": BASE["id_login"], "inicio": inicio, "fim": fim}
+    assert cliente.get("/exportar", params=params).status_code == status
+
+
+def test_regra_semanal_ate_date_max():
+    regra = recorrencia.Regra(date(9999, 12, 20), recorrencia.SEMANAL)
+    assert list(regra.ocorrencias(date(9999, 12, 1), date.max)) == [date(9999, 12, 20), date(9999, 12, 27)]
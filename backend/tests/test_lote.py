@@ -0,0 +1,90 @@
+"""Lote com referência inexistente responde 422 com os índices, sem gravar nada."""
+import time
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.despesas import Despesas
+from app.models.login import Login
+from app.models.receitas import Receitas
+
+ID_INEXISTENTE = 999_999
+
+
+@pytest.fixture
+def id_login(banco):
+    with Session(banco) as db:
+        login = Login(email=f"lote-{time.monotonic_ns()}@mywallet.com", senha="-")
+        db.add(login)
+        db.commit()
+        return login.id
+
+
+def _quantidade(banco, modelo, id_login):
+    with Session(banco) as db:
+        return db.scalar(select(func.count()).select_from(modelo).filter_by(id_login=id_login))
+
+
+def _receita(id_login, descricao="salário"):
+    return {
+        "id_login": id_login, "descricao": descricao, "valor": 10,
+        "data_recebimento": "2024-06-05", "recorrencia": False,
+    }
+
+
+def _despesa(id_login, id_categoria=1, descricao="mercado"):
+    return {
+        "id_login": id_login, "descricao": descricao, "valor": 10,
+        "data_vencimento": "2024-06-05", "recorrencia": False, "id_categoria": id_categoria,
+    }
+
+
+def _campos_com_erro(detalhe):
+    return {e["indice"]: [erro["loc"][0] for erro in e["erros"]] for e in detalhe}
+
+
+def test_receitas_em_lote(cliente, banco, id_login):
+    resposta = cliente.post("/inserir-receitas/lote", json=[_receita(id_login, "a"), _receita(id_login, "b")])
+    assert resposta.status_code == 200
+    ids = resposta.json()["receita_ids"]
+    assert len(ids) == 2
+
+    with Session(banco) as db:
+        assert [db.get(Receitas, i).descricao for i in ids] == ["a", "b"]
+
+
+def test_receitas_em_lote_com_login_inexistente(cliente, banco, id_login):
+    resposta = cliente.post("/inserir-receitas/lote", json=[
+        _receita(id_login), _receita(ID_INEXISTENTE), _receita(id_login), _receita(ID_INEXISTENTE),
+    ])
+    assert resposta.status_code == 422
+    assert _campos_com_erro(resposta.json()["detail"]) == {1: ["id_login"], 3: ["id_login"]}
+    assert _quantidade(banco, Receitas, id_login) == 0
+
+
+def test_despesas_em_lote(cliente, banco, id_login):
+    resposta = cliente.post("/inserir-despesas/lote", json=[_despesa(id_login, 1, "a"), _despesa(id_login, 2, "b")])
+    assert resposta.status_code == 200
+    ids = resposta.json()["despesa_ids"]
+
+    with Session(banco) as db:
+        assert [(db.get(Despesas, i).descricao, db.get(Despesas, i).id_categoria) for i in ids] == [("a", 1), ("b", 2)]
+
+
+def test_despesas_em_lote_com_referencias_inexistentes(cliente, banco, id_login):
+    resposta = cliente.post("/inserir-despesas/lote", json=[
+        _despesa(id_login),
+        _despesa(id_login, ID_INEXISTENTE),
+        _despesa(ID_INEXISTENTE),
+        _despesa(ID_INEXISTENTE, ID_INEXISTENTE),
+    ])
+    assert resposta.status_code == 422
+    assert _campos_com_erro(resposta.json()["detail"]) == {
+        1: ["id_categoria"], 2: ["id_login"], 3: ["id_login", "id_categoria"],
+    }
+    assert _quantidade(banco, Despesas, id_login) == 0
+
+
+def test_erro_de_schema_vem_antes_da_consulta(cliente, id_login):
+    resposta = cliente.post("/inserir-despesas/lote", json=[_despesa(id_login), {"id_login": id_login}])
+    assert resposta.status_code == 422
+    assert [e["indice"] for e in resposta.json()["detail"]] == [1]
@@ -0,0 +1,46 @@
+"""Conexões do pool: só saem quando a requisição consulta o banco."""
+import pytest
+from sqlalchemy import create_engine, event, text
+from app.db import engine, async_engine, espera_pool, PoolMedido
+from app.utils.metricas import cache_respostas as metrica_cache
+
+PARAMS = {"id_login": 1, "mes": 6, "ano": 2024}
+
+
+@pytest.fixture
+def checkouts():
+    pool = (async_engine.sync_engine if async_engine is not None else engine).pool
+    contagem = []
+
+    def contar(*args):
+        contagem.append(1)
+
+    event.listen(pool, "checkout", contar)
+    yield contagem
+    event.remove(pool, "checkout", contar)
+
+
+def test_snapshot_em_memoria_nao_usa_conexao(cliente, checkouts):
+    assert cliente.get("/total-receitas", params=PARAMS).status_code == 200
+    checkouts.clear()
+    assert cliente.get("/total-despesas", params=PARAMS).status_code == 200
+    assert checkouts == []
+
+
+def test_acerto_do_cache_de_respostas_nao_usa_conexao(cliente, checkouts, cache_ligado):
+    assert cliente.get("/serie-receitas", params=PARAMS).status_code == 200
+    acertos = metrica_cache.valores.get(("/serie-receitas", "acerto"), 0)
+    checkouts.clear()
+    assert cliente.get("/serie-receitas", params=PARAMS).status_code == 200
+    assert metrica_cache.valores.get(("/serie-receitas", "acerto"), 0) == acertos + 1
+    assert checkouts == []
+
+
+def test_pool_medido_registra_a_espera(tmp_path):
+    medido = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PoolMedido, pool_size=1, max_overflow=0)
+    antes = espera_pool.quantidade
+    for _ in range(3):
+        with medido.connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+    medido.dispose()
+    assert espera_pool.quantidade == antes + 3
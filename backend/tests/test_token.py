@@ -0,0 +1,76 @@
+"""Tokens de acesso valem até a senha ser redefinida, não até o hash mudar."""
+from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.login import Login
+from app.utils import security, token
+from app.utils.cache_tokens import cache_tokens
+
+EMAIL = "token@mywallet.com"
+CADASTRO = {
+    "email": EMAIL,
+    "senha": "abcdef",
+    "confirmar_senha": "abcdef",
+    "nome": "Bia",
+    "sobrenome": "Lima",
+    "data_nascimento": "1990-05-10",
+    "endereco": {"cep": "20040020", "id_estado": 1, "bairro": "Centro", "rua": "Rua da Assembleia", "numero": "10", "complemento": "-"},
+}
+
+
+def _me(cliente, acesso):
+    return cliente.get("/me", headers={"Authorization": f"Bearer {acesso}"}).status_code
+
+
+def _hash(banco):
+    with Session(banco) as db:
+        return db.scalar(select(Login.senha).filter_by(email=EMAIL))
+
+
+def test_rehash_no_login_mantem_sessoes_e_reset_derruba(cliente, banco, monkeypatch):
+    do_cadastro = cliente.post("/cadastro", json=CADASTRO).json()["access_token"]
+
+    # Outro custo de bcrypt: o login seguinte refaz o hash com a mesma senha
+    custo = security.BCRYPT_ROUNDS + 1
+    monkeypatch.setattr(security, "pwd_context", CryptContext(
+        schemes=["bcrypt"], deprecated="auto",
+        bcrypt__default_rounds=custo, bcrypt__min_rounds=custo, bcrypt__max_rounds=custo,
+    ))
+    hash_antes = _hash(banco)
+    do_login = cliente.post("/login", json={"email": EMAIL, "senha": "abcdef"}).json()["access_token"]
+    assert _hash(banco) != hash_antes
+    assert _me(cliente, do_cadastro) == 200
+    assert _me(cliente, do_login) == 200
+
+    reset = token.gerar_token_reset(EMAIL)
+    assert _me(cliente, reset) == 401
+    resposta = cliente.post("/resetar-senha", json={"token": reset, "nova_senha": "ghijkl", "confirmar_senha": "ghijkl"})
+    assert resposta.status_code == 200
+    assert _me(cliente, do_cadastro) == 401
+    assert _me(cliente, do_login) == 401
+
+    novo = cliente.post("/login", json={"email": EMAIL, "senha": "ghijkl"}).json()["access_token"]
+    assert _me(cliente, novo) == 200
+
+
+def test_troca_de_email_invalida_o_cache_depois_do_commit(cliente, banco, monkeypatch):
+    email = "troca@mywallet.com"
+    acesso = cliente.post("/cadastro", json={**CADASTRO, "email": email}).json()["access_token"]
+    # Guarda o token no cache
+    assert _me(cliente, acesso) == 200
+    id_login = cliente.get("/me", headers={"Authorization": f"Bearer {acesso}"}).json()["id"]
+
+    emails_no_banco = []
+    invalidar = cache_tokens.invalidar_email
+
+    def registrar(email_antigo):
+        with Session(banco) as db:
+            emails_no_banco.append(db.scalar(select(Login.email).filter_by(id=id_login)))
+        invalidar(email_antigo)
+
+    monkeypatch.setattr(cache_tokens, "invalidar_email", registrar)
+    assert cliente.put(f"/atualizar-email/{id_login}", json={"email": "trocado@mywallet.com"}).status_code == 200
+
+    # Quando o cache é limpo, o banco já tem o e-mail novo
+    assert emails_no_banco == ["trocado@mywallet.com"]
+    assert _me(cliente, acesso) == 401